@@ -0,0 +1,552 @@
+"""
+End-to-end benchmark of generating presentations over a fixed set of topics.
+
+It measures the phases marked by `phase_util` (getting the schema, seed generation, slide generation, rendering to
+powerpoint and saving) separately, reports p50/p95/max of every phase, the peak RSS of the process and of every
+deck, and the entries and approximate size of all registered caches, and writes the results as JSON such that runs
+of different commits can be compared.
+
+By default, it generates with the default schema against the local stub servers of `tests/stub_servers.py`,
+such that the real source clients, parsing and caching are benchmarked without any external API influencing the
+timings. The stub servers answer with a configurable latency and error rate. The offline schema only uses local
+text templates and images, and runs without the stub servers. Usage, from the root of the repository:
+
+    python -m benchmarks.benchmark_generation --results results.json
+    python -m benchmarks.benchmark_generation --compare results.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from pptx.chart.data import ChartData
+from pptx.enum.chart import XL_CHART_TYPE
+
+from talkgenerator import generator
+from talkgenerator.datastructures.slide_generator_data import (
+    ConstantWeightFunction,
+    PeakedWeight,
+    SlideGeneratorData,
+)
+from talkgenerator.schema import presentation_schema_types
+from talkgenerator.schema.presentation_schema import PresentationSchema
+from talkgenerator.schema.slide_topic_generators import IdentityTopicGenerator
+from talkgenerator.slide import powerpoint_slide_creator
+from talkgenerator.slide import slide_generator_types
+from talkgenerator.sources import chart
+from talkgenerator.sources import text_generator
+from talkgenerator.util import cache_util
+from talkgenerator.util import generator_util
+from talkgenerator.util import os_util
+from talkgenerator.util import phase_util
+from tests.stub_servers import StubServerConfig
+from tests.stub_servers import StubServerFleet
+from tests.stub_servers import lognormal_latency
+
+logger = logging.getLogger("talkgenerator")
+
+DEFAULT_SCHEMA = "default"
+OFFLINE_SCHEMA = "offline_benchmark"
+# Credentials for the sources that need one, as the stub servers accept any
+_STUB_CREDENTIALS = {
+    "REDDIT_CLIENT_ID": "benchmark",
+    "REDDIT_CLIENT_SECRET": "benchmark",
+    "REDDIT_USER_AGENT": "talkgenerator-benchmark",
+    "UNSPLASH_ACCESS_KEY": "benchmark",
+    "PIXABAY_KEY": "benchmark",
+    "PEXELS_KEY": "benchmark",
+}
+BENCHMARK_TOPICS = (
+    "cat",
+    "peanut butter",
+    "bicycle",
+    "volcano",
+    "coffee",
+    "democracy",
+    "octopus",
+    "jazz",
+)
+TOTAL = "total"
+RESULTS_VERSION = 1
+
+# = OFFLINE SCHEMA =
+
+
+def _templated(file_name):
+    return text_generator.TemplatedTextGenerator(
+        os_util.to_actual_file("data/text-templates/" + file_name)
+    ).generate
+
+
+def _get_talk_title(presentation_context):
+    return presentation_context["title"]
+
+
+def _generate_yes_no_chart_data(presentation_context):
+    chart_data = ChartData()
+    chart_data.categories = ["Yes", "No", "Only on " + presentation_context["seed"]]
+    chart_data.add_series(
+        "", chart.normalise_data(chart.create_equal_data_with_outlier_end(3, 0.2, 1, 2.5, 1, 20))
+    )
+    return chart_data
+
+
+def create_offline_schema() -> PresentationSchema:
+    """ A schema similar to the default one, but only using local text templates and images """
+    local_image_generator = generator_util.StaticGenerator(
+        os_util.to_actual_file("data/images/black-transparent.png")
+    )
+    return PresentationSchema(
+        powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
+        seed_generator=IdentityTopicGenerator,
+        title_generator=_templated("inspiration.txt"),
+        slide_generators=[
+            SlideGeneratorData(
+                slide_generator_types.TitleSlideGenerator.of(
+                    _get_talk_title,
+                    text_generator.TraceryTextGenerator(
+                        os_util.to_actual_file("data/text-templates/talk_subtitle.json"),
+                        "job",
+                    ).generate,
+                ),
+                weight_function=PeakedWeight((0,), 100000, 0),
+                allowed_repeated_elements=100,
+                tags=["title"],
+                name="Offline title slide",
+            ),
+            SlideGeneratorData(
+                slide_generator_types.ImageSlideGenerator.of(
+                    _templated("about_me_title.txt"), local_image_generator
+                ),
+                weight_function=PeakedWeight((1,), 10, 0),
+                allowed_repeated_elements=100,
+                tags=["about_me"],
+                name="Offline about me",
+            ),
+            SlideGeneratorData(
+                slide_generator_types.ImageSlideGenerator.of(
+                    _templated("history.txt"), local_image_generator
+                ),
+                allowed_repeated_elements=100,
+                tags=["history"],
+                name="Offline history",
+            ),
+            SlideGeneratorData(
+                slide_generator_types.FullImageSlideGenerator.of(
+                    _templated("anecdote_title.txt"), local_image_generator
+                ),
+                allowed_repeated_elements=100,
+                tags=["full_image"],
+                name="Offline anecdote",
+            ),
+            SlideGeneratorData(
+                slide_generator_types.LarqeQuoteSlideGenerator.of(
+                    generator_util.NoneGenerator(),
+                    _templated("deep_abstract.txt"),
+                    local_image_generator,
+                ),
+                allowed_repeated_elements=100,
+                tags=["deep"],
+                name="Offline deep abstract",
+            ),
+            SlideGeneratorData(
+                slide_generator_types.ChartSlideGenerator.of(
+                    generator_util.StaticGenerator("Is this about you?"),
+                    generator_util.StaticGenerator(XL_CHART_TYPE.PIE),
+                    _generate_yes_no_chart_data,
+                    chart.set_pie_properties,
+                ),
+                weight_function=ConstantWeightFunction(0.5),
+                allowed_repeated_elements=100,
+                tags=["chart"],
+                name="Offline chart",
+            ),
+            SlideGeneratorData(
+                slide_generator_types.ImageSlideGenerator.of(
+                    _templated("conclusion_title.txt"), local_image_generator
+                ),
+                weight_function=PeakedWeight((-1,), 10000, 0),
+                allowed_repeated_elements=100,
+                tags=["conclusion"],
+                name="Offline conclusion",
+            ),
+        ],
+        max_allowed_tags={"title": 1, "about_me": 1, "conclusion": 1, "chart": 1},
+    )
+
+
+# = MEASURING =
+
+
+class PhaseRecorder(object):
+    """ Collects the durations of all phases, also when they are run in other threads """
+
+    def __init__(self):
+        self._durations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, phase_name: str, duration: float):
+        with self._lock:
+            self._durations.setdefault(phase_name, []).append(duration)
+
+    def get_durations(self) -> Dict[str, List[float]]:
+        with self._lock:
+            return {name: list(durations) for name, durations in self._durations.items()}
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """ Nearest-rank percentile of the given values """
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(percent / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarise(durations: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(durations),
+        "mean": sum(durations) / len(durations),
+        "p50": percentile(durations, 50),
+        "p95": percentile(durations, 95),
+        "max": max(durations),
+    }
+
+
+def get_peak_rss_kb() -> Optional[int]:
+    """ Peak resident set size of this process so far, in kilobytes """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes instead of kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def get_rss_kb() -> Optional[int]:
+    """ Current resident set size of this process in kilobytes, only available on Linux """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+class PeakMemorySampler(object):
+    """ Samples the RSS in a background thread, to find the peak RSS while generating a single deck """
+
+    def __init__(self, interval: float = 0.005):
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self.peak_rss_kb: Optional[int] = None
+
+    def _sample(self):
+        rss = get_rss_kb()
+        if rss is not None and (self.peak_rss_kb is None or rss > self.peak_rss_kb):
+            self.peak_rss_kb = rss
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        if self.peak_rss_kb is not None:
+            self._thread = threading.Thread(
+                target=self._run, name="benchmark-memory", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+
+
+def _get_commit() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def using_stub_servers(
+    latency: float = 0.05, error_rate: float = 0.0, seed: Optional[int] = None
+):
+    """ Points all sources to local stub servers answering after a long-tailed latency with the given median,
+    and provides credentials for the sources that need one if these are not set """
+    missing_credentials = [
+        name for name in _STUB_CREDENTIALS if not os.environ.get(name)
+    ]
+    for name in missing_credentials:
+        os.environ[name] = _STUB_CREDENTIALS[name]
+    try:
+        with StubServerFleet(
+            default_config=StubServerConfig(
+                latency=lognormal_latency(latency), error_rate=error_rate
+            ),
+            seed=seed,
+        ) as fleet:
+            yield fleet
+    finally:
+        for name in missing_credentials:
+            del os.environ[name]
+
+
+def run_benchmark(
+    schema: str = DEFAULT_SCHEMA,
+    topics=BENCHMARK_TOPICS,
+    runs: int = 1,
+    num_slides: int = 7,
+    parallel: bool = False,
+    output_format: str = "pptx",
+    output_folder: str = None,
+    int_seed: int = 1,
+    stub_servers: bool = True,
+    stub_latency: float = 0.05,
+    stub_error_rate: float = 0.0,
+) -> dict:
+    """ Generates and saves a presentation for every topic, `runs` times, and returns the timing statistics.
+    Unless stub_servers is false, all sources use local stub servers instead of the real services """
+    presentation_schema_types.register_schema(OFFLINE_SCHEMA, create_offline_schema)
+
+    recorder = PhaseRecorder()
+    deck_peak_rss_kb = []
+    stub_requests = None
+    phase_util.add_phase_listener(recorder)
+    try:
+        with tempfile.TemporaryDirectory() as temporary_folder, (
+            using_stub_servers(stub_latency, stub_error_rate, int_seed)
+            if stub_servers
+            else nullcontext()
+        ) as fleet:
+            for run in range(runs):
+                for i, topic in enumerate(topics):
+                    start = time.perf_counter()
+                    with PeakMemorySampler() as memory_sampler:
+                        generator.generate_presentation(
+                            schema=schema,
+                            slides=num_slides,
+                            topic=topic,
+                            presenter="Bench Marker",
+                            parallel=parallel,
+                            int_seed=int_seed + run * len(topics) + i,
+                            save_ppt=True,
+                            output_folder=output_folder or temporary_folder,
+                            output_format=output_format,
+                            open_ppt=False,
+                        )
+                    recorder(TOTAL, time.perf_counter() - start)
+                    if memory_sampler.peak_rss_kb is not None:
+                        deck_peak_rss_kb.append(memory_sampler.peak_rss_kb)
+            if fleet is not None:
+                stub_requests = fleet.get_request_counts()
+    finally:
+        phase_util.remove_phase_listener(recorder)
+
+    return {
+        "version": RESULTS_VERSION,
+        "commit": _get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "configuration": {
+            "schema": schema,
+            "topics": list(topics),
+            "runs": runs,
+            "num_slides": num_slides,
+            "parallel": parallel,
+            "format": output_format,
+            "stub_servers": stub_servers,
+            "stub_latency": stub_latency,
+            "stub_error_rate": stub_error_rate,
+        },
+        "stub_requests": stub_requests,
+        "phases": {
+            name: summarise(durations)
+            for name, durations in recorder.get_durations().items()
+        },
+        "peak_rss_kb": get_peak_rss_kb(),
+        "deck_peak_rss_kb": summarise(deck_peak_rss_kb) if deck_peak_rss_kb else None,
+        "caches": cache_util.get_cache_report(),
+    }
+
+
+# = REPORTING =
+
+
+def format_results(results: dict) -> str:
+    lines = [
+        "{:<20} {:>6} {:>10} {:>10} {:>10}".format("phase", "count", "p50", "p95", "max")
+    ]
+    for name in phase_util.PHASES + (TOTAL,):
+        if name in results["phases"]:
+            stats = results["phases"][name]
+            lines.append(
+                "{:<20} {:>6} {:>9.1f}ms {:>9.1f}ms {:>9.1f}ms".format(
+                    name,
+                    stats["count"],
+                    1000 * stats["p50"],
+                    1000 * stats["p95"],
+                    1000 * stats["max"],
+                )
+            )
+    lines.append("peak RSS: {} kB".format(results["peak_rss_kb"]))
+    deck_peak_rss = results.get("deck_peak_rss_kb")
+    if deck_peak_rss:
+        lines.append(
+            "peak RSS per deck: p50 {:.0f} kB, p95 {:.0f} kB, max {:.0f} kB".format(
+                deck_peak_rss["p50"], deck_peak_rss["p95"], deck_peak_rss["max"]
+            )
+        )
+    stub_requests = {
+        service: count
+        for service, count in (results.get("stub_requests") or {}).items()
+        if count
+    }
+    if stub_requests:
+        lines.append(
+            "stub server requests: "
+            + ", ".join(
+                "{} {}".format(service, count)
+                for service, count in sorted(stub_requests.items())
+            )
+        )
+    for cache in results.get("caches", []):
+        if cache["entries"]:
+            lines.append(
+                "cache {}: {} entries, ~{} kB".format(
+                    cache["name"], cache["entries"], cache["approximate_bytes"] // 1024
+                )
+            )
+    return "\n".join(lines)
+
+
+def compare_results(baseline: dict, results: dict, statistic: str = "p50") -> Dict[str, float]:
+    """ Relative change of the given statistic of every phase in both results, e.g. 0.1 means 10% slower """
+    changes = {}
+    for name, stats in results["phases"].items():
+        baseline_stats = baseline["phases"].get(name)
+        if baseline_stats and baseline_stats[statistic] > 0:
+            changes[name] = stats[statistic] / baseline_stats[statistic] - 1
+    return changes
+
+
+def format_comparison(baseline: dict, changes: Dict[str, float], statistic: str) -> str:
+    lines = [
+        "{} compared to baseline of commit {}:".format(statistic, baseline.get("commit"))
+    ]
+    for name, change in sorted(changes.items()):
+        lines.append("{:<20} {:>+8.1%}".format(name, change))
+    return "\n".join(lines)
+
+
+def get_argument_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--schema",
+        default=DEFAULT_SCHEMA,
+        help="Schema to benchmark, e.g. {} for an offline schema only using local templates and images.".format(
+            OFFLINE_SCHEMA
+        ),
+    )
+    parser.add_argument(
+        "--topics",
+        default=",".join(BENCHMARK_TOPICS),
+        help="Comma separated topics to generate a presentation for.",
+    )
+    parser.add_argument("--runs", default=3, type=int, help="Presentations per topic.")
+    parser.add_argument("--num_slides", default=7, type=int)
+    parser.add_argument("--parallel", default=False, type=generator.str2bool)
+    parser.add_argument("--format", default="pptx", choices=generator.OUTPUT_FORMATS)
+    parser.add_argument(
+        "--output_folder",
+        default=None,
+        help="Folder to save the presentations in, a temporary folder by default.",
+    )
+    parser.add_argument("--int_seed", default=1, type=int)
+    parser.add_argument(
+        "--real_sources",
+        action="store_true",
+        help="Use the real external services instead of local stub servers.",
+    )
+    parser.add_argument(
+        "--stub_latency",
+        default=0.05,
+        type=float,
+        help="Median seconds before a stub server answers, with a long-tailed distribution.",
+    )
+    parser.add_argument(
+        "--stub_error_rate",
+        default=0.0,
+        type=float,
+        help="Chance of a stub server answering with an error.",
+    )
+    parser.add_argument("--results", default=None, help="File to write the JSON results to.")
+    parser.add_argument(
+        "--compare", default=None, help="JSON results of an earlier run to compare with."
+    )
+    parser.add_argument("--statistic", default="p50", choices=("p50", "p95", "max"))
+    parser.add_argument(
+        "--max_regression",
+        default=None,
+        type=float,
+        help="Exit with an error if a phase got slower than this ratio compared to the baseline, e.g. 0.2",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = get_argument_parser().parse_args(argv)
+    results = run_benchmark(
+        schema=args.schema,
+        topics=[topic.strip() for topic in args.topics.split(",")],
+        runs=args.runs,
+        num_slides=args.num_slides,
+        parallel=args.parallel,
+        output_format=args.format,
+        output_folder=args.output_folder,
+        int_seed=args.int_seed,
+        stub_servers=not args.real_sources,
+        stub_latency=args.stub_latency,
+        stub_error_rate=args.stub_error_rate,
+    )
+    print(format_results(results))
+
+    if args.results:
+        with open(args.results, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        changes = compare_results(baseline, results, args.statistic)
+        print(format_comparison(baseline, changes, args.statistic))
+        if args.max_regression is not None and any(
+            change > args.max_regression for change in changes.values()
+        ):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Benchmark of the import time and cold start of the generator, each measured in a fresh interpreter.
+
+It measures the import time of `talkgenerator`, `talkgenerator.generator` and `presentation_schema_types` as
+reported by `python -X importtime`, and the time to the first generated slide of a fresh interpreter, split in
+importing the generator, getting the schema and generating a single slide. The first slide uses the default schema,
+of which the sources call local stub servers (see tests/stub_servers.py) unless --real_sources is given. The phases
+are timed in a normal interpreter, as `-X importtime` slows down importing. A separate cold start with
+`-X importtime` reports the import time of the heavy libraries (pptx, nltk, praw, bs4, inflect, tracery, PIL),
+including the dependencies they import. The results can be written as JSON, and compared with the results of
+another commit:
+
+    python -m benchmarks.benchmark_startup --results startup.json
+    python -m benchmarks.benchmark_startup --compare startup.json --max_regression 0.2 --budget 2
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.benchmark_generation import DEFAULT_SCHEMA
+from benchmarks.benchmark_generation import OFFLINE_SCHEMA
+from benchmarks.benchmark_generation import _get_commit
+from benchmarks.benchmark_generation import summarise
+from benchmarks.benchmark_generation import using_stub_servers
+
+IMPORTED_MODULES = (
+    "talkgenerator",
+    "talkgenerator.generator",
+    "talkgenerator.schema.presentation_schema_types",
+)
+LIBRARIES = ("pptx", "nltk", "praw", "bs4", "inflect", "tracery", "PIL")
+RESULTS_VERSION = 2
+# Lines of the error output to show when a fresh interpreter fails
+_ERROR_LINES = 5
+
+_ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_IMPORT_TIME_REGEX = re.compile(r"^import time:\s*(\d+) \|\s*(\d+) \|( *)(\S+)\s*$")
+
+# Run in a fresh interpreter, printing the duration of every phase of the cold start as JSON
+_COLD_START_CODE = """
+import json, sys, time
+schema = sys.argv[1]
+start = time.perf_counter()
+from talkgenerator import generator
+imported = time.perf_counter()
+from talkgenerator.schema import presentation_schema_types
+if schema == {offline_schema!r}:
+    from benchmarks.benchmark_generation import create_offline_schema
+    presentation_schema_types.register_schema(schema, create_offline_schema)
+presentation_schema_types.get_schema(schema)
+got_schema = time.perf_counter()
+generator.generate_slide_deck(
+    schema=schema, slides=1, topic="cat", presenter="Bench Marker", parallel=False, int_seed=1
+)
+generated = time.perf_counter()
+print(json.dumps({{
+    "import": imported - start,
+    "get_schema": got_schema - imported,
+    "first_slide": generated - got_schema,
+}}))
+""".format(
+    offline_schema=OFFLINE_SCHEMA
+)
+
+
+# = IMPORT TIMES =
+
+
+def parse_import_times(stderr: str) -> List[Tuple[int, str, float]]:
+    """ Returns the nesting level, module name and cumulative import time in seconds of every line printed by
+    `-X importtime`, in the printed order (every module after the modules it imported) """
+    imports = []
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME_REGEX.match(line)
+        if match:
+            imports.append(
+                (len(match.group(3)) // 2, match.group(4), int(match.group(2)) / 1e6)
+            )
+    return imports
+
+
+def get_library_import_times(
+    imports: List[Tuple[int, str, float]], libraries=LIBRARIES
+) -> Dict[str, float]:
+    """ Sums the cumulative import time of every top-level import of a module of each library. Modules of a
+    library imported by another library count for both, e.g. PIL imported by pptx """
+    import_times = {library: 0.0 for library in libraries}
+    # Modules that were imported by a module of the same library are already counted
+    children: List[Tuple[int, str]] = []
+    for level, name, cumulative in reversed(imports):
+        while children and children[-1][0] >= level:
+            children.pop()
+        library = name.split(".")[0]
+        if library in import_times and all(
+            parent_name.split(".")[0] != library for _, parent_name in children
+        ):
+            import_times[library] += cumulative
+        children.append((level, name))
+    return import_times
+
+
+def _run_python(
+    arguments: List[str],
+    environment: Optional[Dict[str, str]] = None,
+    import_times: bool = False,
+) -> Tuple[float, subprocess.CompletedProcess]:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable] + (["-X", "importtime"] if import_times else []) + arguments,
+        cwd=_ROOT_FOLDER,
+        env=environment,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if process.returncode != 0:
+        errors = [
+            line
+            for line in process.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        raise RuntimeError(
+            "Fresh interpreter failed:\n" + "\n".join(errors[-_ERROR_LINES:])
+        )
+    return time.perf_counter() - start, process
+
+
+def measure_import(module: str, environment: Optional[Dict[str, str]] = None) -> float:
+    """ Cumulative import time of the module in a fresh interpreter, in seconds """
+    _, process = _run_python(
+        ["-c", "import " + module], environment, import_times=True
+    )
+    for level, name, cumulative in parse_import_times(process.stderr):
+        if level == 0 and name == module:
+            return cumulative
+    raise ValueError("No import time reported for " + module)
+
+
+def measure_cold_start(
+    schema: str, environment: Optional[Dict[str, str]] = None
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """ Durations of the phases up to the first generated slide of a fresh interpreter, including the startup
+    of the interpreter itself, and the import time of every library during a second cold start """
+    process_duration, process = _run_python(["-c", _COLD_START_CODE, schema], environment)
+    durations = json.loads(process.stdout.strip().splitlines()[-1])
+    durations["process"] = process_duration
+    _, process = _run_python(
+        ["-c", _COLD_START_CODE, schema], environment, import_times=True
+    )
+    return (
+        durations,
+        get_library_import_times(parse_import_times(process.stderr)),
+    )
+
+
+def _get_stub_environment(fleet) -> Dict[str, str]:
+    """ Environment pointing the sources of a fresh interpreter to the stub servers, including their credentials """
+    environment = dict(os.environ)
+    for service in fleet.servers:
+        environment["TALKGENERATOR_{}_URL".format(service.upper())] = fleet.get_url(
+            service
+        )
+    return environment
+
+
+def run_benchmark(
+    schema: str = DEFAULT_SCHEMA,
+    runs: int = 5,
+    stub_servers: bool = True,
+    stub_latency: float = 0.0,
+) -> dict:
+    """ Measures the imports and the cold start `runs` times, each in a fresh interpreter.
+    Unless stub_servers is false, all sources use local stub servers instead of the real services """
+    measurements: Dict[str, List[float]] = {}
+    with (
+        using_stub_servers(latency=stub_latency) if stub_servers else nullcontext()
+    ) as fleet:
+        environment = _get_stub_environment(fleet) if fleet is not None else None
+        for _ in range(runs):
+            for module in IMPORTED_MODULES:
+                measurements.setdefault("import " + module, []).append(
+                    measure_import(module, environment)
+                )
+            durations, library_import_times = measure_cold_start(schema, environment)
+            for name, duration in durations.items():
+                measurements.setdefault("cold start " + name, []).append(duration)
+            for library, import_time in library_import_times.items():
+                measurements.setdefault("library " + library, []).append(import_time)
+
+    return {
+        "version": RESULTS_VERSION,
+        "commit": _get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "configuration": {
+            "schema": schema,
+            "runs": runs,
+            "stub_servers": stub_servers,
+            "stub_latency": stub_latency if stub_servers else None,
+        },
+        "measurements": {
+            name: summarise(durations) for name, durations in measurements.items()
+        },
+    }
+
+
+# = REPORTING =
+
+
+def format_results(results: dict) -> str:
+    lines = [
+        "{:<56} {:>10} {:>10} {:>10}".format("measurement", "p50", "p95", "max")
+    ]
+    for name, stats in results["measurements"].items():
+        lines.append(
+            "{:<56} {:>9.1f}ms {:>9.1f}ms {:>9.1f}ms".format(
+                name, 1000 * stats["p50"], 1000 * stats["p95"], 1000 * stats["max"]
+            )
+        )
+    return "\n".join(lines)
+
+
+def compare_results(baseline: dict, results: dict, statistic: str = "p50") -> Dict[str, float]:
+    """ Relative change of the given statistic of every measurement in both results, e.g. 0.1 means 10% slower """
+    changes = {}
+    for name, stats in results["measurements"].items():
+        baseline_stats = baseline["measurements"].get(name)
+        if not baseline_stats:
+            continue
+        if baseline_stats[statistic] > 0:
+            changes[name] = stats[statistic] / baseline_stats[statistic] - 1
+        elif stats[statistic] > 0:
+            # e.g. a library that is now imported before the first slide, while it was not imported before
+            changes[name] = float("inf")
+    return changes
+
+
+def format_comparison(baseline: dict, changes: Dict[str, float], statistic: str) -> str:
+    lines = [
+        "{} compared to baseline of commit {}:".format(statistic, baseline.get("commit"))
+    ]
+    for name, change in sorted(changes.items()):
+        lines.append("{:<56} {:>+8.1%}".format(name, change))
+    return "\n".join(lines)
+
+
+def get_time_to_first_slide(results: dict, statistic: str = "p50") -> float:
+    """ Time from starting the interpreter until the first slide is generated """
+    return results["measurements"]["cold start process"][statistic]
+
+
+def get_argument_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--schema",
+        default=DEFAULT_SCHEMA,
+        help="Schema to generate the first slide with, e.g. {} to not use any sources at all.".format(
+            OFFLINE_SCHEMA
+        ),
+    )
+    parser.add_argument(
+        "--real_sources",
+        action="store_true",
+        help="Call the real external services instead of local stub servers.",
+    )
+    parser.add_argument(
+        "--stub_latency",
+        default=0.0,
+        type=float,
+        help="Median seconds before a stub server answers, with a long-tailed distribution.",
+    )
+    parser.add_argument(
+        "--runs", default=5, type=int, help="Fresh interpreters per measurement."
+    )
+    parser.add_argument("--results", default=None, help="File to write the JSON results to.")
+    parser.add_argument(
+        "--compare", default=None, help="JSON results of an earlier run to compare with."
+    )
+    parser.add_argument("--statistic", default="p50", choices=("p50", "p95", "max"))
+    parser.add_argument(
+        "--max_regression",
+        default=None,
+        type=float,
+        help="Exit with an error if a measurement got slower than this ratio compared to the baseline, e.g. 0.2",
+    )
+    parser.add_argument(
+        "--budget",
+        default=None,
+        type=float,
+        help="Exit with an error if the time to the first slide of a fresh interpreter exceeds this many seconds.",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = get_argument_parser().parse_args(argv)
+    results = run_benchmark(
+        schema=args.schema,
+        runs=args.runs,
+        stub_servers=not args.real_sources,
+        stub_latency=args.stub_latency,
+    )
+    print(format_results(results))
+
+    if args.results:
+        with open(args.results, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        changes = compare_results(baseline, results, args.statistic)
+        print(format_comparison(baseline, changes, args.statistic))
+        if args.max_regression is not None and any(
+            change > args.max_regression for change in changes.values()
+        ):
+            exit_code = 1
+
+    if args.budget is not None:
+        time_to_first_slide = get_time_to_first_slide(results, args.statistic)
+        if time_to_first_slide > args.budget:
+            print(
+                "Time to the first slide of {:.2f}s exceeds the budget of {:.2f}s".format(
+                    time_to_first_slide, args.budget
+                )
+            )
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
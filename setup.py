@@ -48,6 +48,9 @@ setup(
         ("text-templates", all_text_templates),
     ],
     include_package_data=True,
+    # The POS lexicon is optional, as building it needs the NLTK tagger data: without it, all words are tagged
+    # with NLTK. It is built with "python -m talkgenerator.util.pos_lexicon"
+    package_data={"talkgenerator": ["data/pos_lexicon.tsv"]},
     install_requires=required,
     entry_points={"console_scripts": ["talkgenerator = talkgenerator.run:main_cli"]},
 )
@@ -9,6 +9,9 @@ class ImageData:
     def get_source(self) -> str:
         return self._source
 
+    def to_dictionary(self) -> dict:
+        return {"image_url": self._image_url, "source": self._source}
+
     def __str__(self):
         return (
             "ImageData("
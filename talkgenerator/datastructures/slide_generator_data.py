@@ -1,11 +1,15 @@
 import logging
-from functools import lru_cache
-from typing import Collection, Union, Set, Callable, Tuple
+import time
+from typing import Callable, Collection, Dict, FrozenSet, Set, Tuple, Union
 
 from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.util import log_util
+from talkgenerator.util import metrics_util
+from talkgenerator.util import trace_util
 
 
 logger = logging.getLogger("talkgenerator")
+_debug = log_util.DebugLogger(__name__)
 
 
 class PeakedWeight(object):
@@ -15,15 +19,19 @@ class PeakedWeight(object):
         self._peak_values = peak_values
         self._weight = weight
         self._other_weight = other_weight
+        # The peak slide numbers for every number of slides, as negative peak values count from the end
+        self._peak_slide_nrs: Dict[int, FrozenSet[int]] = {}
 
     def __call__(self, slide_nr: int, num_slides: int):
-        actual_peak_values = fix_indices(self._peak_values, num_slides)
-        if slide_nr in actual_peak_values:
+        peak_slide_nrs = self._peak_slide_nrs.get(num_slides)
+        if peak_slide_nrs is None:
+            peak_slide_nrs = frozenset(fix_indices(self._peak_values, num_slides))
+            self._peak_slide_nrs[num_slides] = peak_slide_nrs
+        if slide_nr in peak_slide_nrs:
             return self._weight
         return self._other_weight
 
 
-@lru_cache(maxsize=30)
 def fix_indices(values: Collection[int], num_slides: int):
     return [value % num_slides if value < 0 else value for value in values]
 
@@ -62,27 +70,59 @@ class SlideGeneratorData:
 
     def generate(self, presentation_context, used_elements):
         """Generate a slide for a given presentation using the given seed."""
-        logger.debug('slide_generator_data.generate()')
-        logger.debug('presentation_context: {}'.format(presentation_context))
-        logger.debug('used_elements: {}'.format(used_elements))
-        logger.debug('self._allowed_repeated_elements: {}'.format(self._allowed_repeated_elements))
+        name = str(self)
+        metrics_util.registry.increment(metrics_util.GENERATOR_ATTEMPTS, generator=name)
+        start = time.perf_counter()
+        try:
+            with trace_util.span(
+                name, "slide_generator", presentation_context.get("seed")
+            ) as current_span:
+                result = self._generate(presentation_context, used_elements, name)
+                if current_span is not None:
+                    current_span.set_result(result)
+        finally:
+            metrics_util.registry.observe(
+                metrics_util.GENERATOR_SECONDS, time.perf_counter() - start, generator=name
+            )
+        if result:
+            metrics_util.registry.increment(
+                metrics_util.GENERATOR_SUCCESSES, generator=name
+            )
+        return result
 
+    def _generate(self, presentation_context, used_elements, name):
         # Try a certain amount of times
         for i in range(self._retries):
-            logger.debug('retry: {}'.format(i))
-            logger.debug('self._generator: {}'.format(self._generator))
+            if metrics_util.is_source_budget_exhausted():
+                logger.info(
+                    "External call budget used up, not trying {}".format(name)
+                )
+                return None
+            if i > 0:
+                metrics_util.registry.increment(
+                    metrics_util.GENERATOR_RETRIES, generator=name
+                )
             slide_results = self._generator.generate_slide(
                 presentation_context, (used_elements, self._allowed_repeated_elements)
             )
-            logger.debug('slide_results: {}'.format(slide_results))
+            _debug(
+                "slide_generator_data",
+                generator=name,
+                retry=i,
+                presentation_context=presentation_context,
+                used_elements=used_elements,
+                allowed_repeated_elements=self._allowed_repeated_elements,
+                slide_results=slide_results,
+            )
 
             if slide_results:
                 (slide, generated_elements) = slide_results
-                logger.debug('slide: {}'.format(slide))
-                logger.debug('generated_elements: {}'.format(generated_elements))
 
                 # If the generated content is nothing, don't try again
                 if _has_not_generated_something(generated_elements):
+                    metrics_util.registry.increment(
+                        metrics_util.GENERATOR_CONSTRAINT_REJECTIONS, generator=name
+                    )
                     return None
 
                 if slide:
@@ -104,6 +144,11 @@ class SlideGeneratorData:
                             slide.add_source(generated_element.get_source())
 
                     return slide, generated_elements
+            else:
+                # Nothing was generated, or it reused too many elements of earlier slides
+                metrics_util.registry.increment(
+                    metrics_util.GENERATOR_CONSTRAINT_REJECTIONS, generator=name
+                )
 
     def get_weight_for(self, slide_nr: int, total_slides: int) -> float:
         """The weight of the generator for a particular slide.
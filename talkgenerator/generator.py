@@ -1,6 +1,5 @@
 import argparse
 import os
-import pathlib
 import random
 import subprocess
 import sys
@@ -10,14 +9,18 @@ from typing import List, Union, Tuple, Optional
 from pptx import Presentation
 
 from talkgenerator.slide.slide_deck import SlideDeck
-from talkgenerator.schema.content_generators import full_name_generator
 from talkgenerator.schema.presentation_schema_types import get_schema
 from talkgenerator import runtime_checker
+from talkgenerator.slide import powerpoint_slide_creator
 from talkgenerator.sources import phrasefinder
+from talkgenerator.util import metrics_util
 from talkgenerator.util import os_util
+from talkgenerator.util import phase_util
+from talkgenerator.util import profile_util
+from talkgenerator.util import trace_util
 
 DEFAULT_PRESENTATION_TOPIC = "cat"
-MAX_PRESENTATION_SAVE_TRIES = 100
+OUTPUT_FORMATS = ("pptx", "json", "html")
 
 logger = logging.getLogger("talkgenerator")
 
@@ -31,18 +34,32 @@ def generate_presentation_using_cli_arguments(args) -> Tuple[Presentation, Slide
     logger.info("******************************************")
     logger.info("Making {} slide talk on: {}".format(args.num_slides, args.topic))
 
-    return generate_presentation(
-        schema=args.schema,
-        slides=args.num_slides,
-        topic=args.topic,
-        title=args.title,
-        presenter=args.presenter,
-        parallel=args.parallel,
-        int_seed=args.int_seed,
-        print_logs=args.print_logs,
-        save_ppt=args.save_ppt,
-        open_ppt=args.open_ppt,
-    )
+    tracer = trace_util.Tracer() if args.trace_file else None
+    with trace_util.tracing(tracer):
+        result = generate_presentation(
+            schema=args.schema,
+            slides=args.num_slides,
+            topic=args.topic,
+            title=args.title,
+            presenter=args.presenter,
+            parallel=args.parallel,
+            int_seed=args.int_seed,
+            print_logs=args.print_logs,
+            save_ppt=args.save_ppt,
+            output_folder=args.output_folder,
+            output_shard_levels=args.output_shard_levels,
+            output_format=args.format,
+            open_ppt=args.open_ppt,
+            profile=args.profile,
+            profile_folder=args.profile_folder,
+            max_external_calls=args.max_external_calls,
+        )
+
+    if tracer is not None:
+        tracer.save(args.trace_file)
+    if args.metrics_file:
+        metrics_util.registry.save(args.metrics_file)
+    return result
 
 
 def generate_presentation(
@@ -55,8 +72,14 @@ def generate_presentation(
     int_seed: int = None,
     save_ppt: bool = True,
     output_folder: str = "../output/",
+    output_shard_levels: int = 0,
+    output_format: str = "pptx",
     open_ppt: bool = False,
     print_logs=False,
+    profile: str = None,
+    profile_folder: str = "../profile/",
+    max_external_calls: int = None,
+    debug: bool = False,
 ) -> Tuple[Presentation, SlideDeck, str]:
 
     logger.info('**************************')
@@ -64,15 +87,69 @@ def generate_presentation(
     if print_logs:
         os_util.show_logs(logger)
 
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format: {}".format(output_format))
+
+    # Profile every phase if asked for
+    with profile_util.profiling(profile, profile_folder):
+        slide_deck = generate_slide_deck(
+            schema=schema,
+            slides=slides,
+            topic=topic,
+            title=title,
+            presenter=presenter,
+            parallel=parallel,
+            int_seed=int_seed,
+            max_external_calls=max_external_calls,
+            debug=debug,
+        )
+
+        logger.info('Presentation save_ppt: {}'.format(save_ppt))
+        logger.info('Presentation output_format: {}'.format(output_format))
+
+        presentation, presentation_file = render_slide_deck(
+            slide_deck,
+            save_ppt=save_ppt,
+            output_folder=output_folder,
+            output_shard_levels=output_shard_levels,
+            output_format=output_format,
+        )
+
+    # Open the presentation
+    if open_ppt and presentation_file is not None:
+        path = os.path.realpath(presentation_file)
+        _open_file(path)
+
+    return presentation, slide_deck, presentation_file
+
+
+def generate_slide_deck(
+    schema: str,
+    slides: int,
+    topic: Union[str, List[str]] = None,
+    title: str = None,
+    presenter: str = None,
+    parallel: bool = True,
+    int_seed: int = None,
+    max_external_calls: int = None,
+    debug: bool = False,
+) -> SlideDeck:
+    """Generate the content of all slides, without building the powerpoint. This is the network-bound phase.
+    max_external_calls caps the number of external calls of the deck: once used up, no more slides are generated.
+    debug logs the debug events of generating only this deck, e.g. to trace one deck in production"""
     if int_seed is not None:
         random.seed(int_seed)
 
     # Retrieve the schema to generate the presentation with
-    presentation_schema = get_schema(schema)
+    with phase_util.phase(phase_util.GET_SCHEMA):
+        presentation_schema = get_schema(schema)
     logger.info('Presentation schema: {}'.format(presentation_schema))
 
     # Generate random presenter name if no presenter name given
     if not presenter:
+        # Imported here, as importing the content generators loads all their sources
+        from talkgenerator.schema.content_generators import full_name_generator
+
         presenter = full_name_generator()
 
     if not topic:
@@ -93,66 +170,186 @@ def generate_presentation(
     logger.info('Presentation title: {}'.format(title))
     logger.info('Presentation parallel: {}'.format(parallel))
     logger.info('Presentation int_seed: {}'.format(int_seed))
-    logger.info('Presentation save_ppt: {}'.format(save_ppt))
 
-    # Generate the presentation object
-    presentation, slide_deck = presentation_schema.generate_presentation(
+    # Generate the slide deck
+    _, slide_deck = presentation_schema.generate_presentation(
         topics=topics,
         num_slides=slides,
         presenter=presenter,
         title=title,
         parallel=parallel,
         int_seed=int_seed,
-        save_ppt=save_ppt,
+        save_ppt=False,
+        max_external_calls=max_external_calls,
+        debug=debug,
     )
+    slide_deck.set_schema_name(schema)
 
     logger.info('**************************')
-    logger.info('Presentation generated: {}'.format(presentation))
     logger.info('Slide deck generated: {}'.format(slide_deck))
-
-    cleaned_topics = ",".join(topics).replace(" ", "").replace(",", "_")
-    file_name = "".join(e for e in cleaned_topics if e.isalnum() or e == "_")
-
     logger.info(
         "Slide deck structured data: {}".format(slide_deck.get_structured_data())
     )
+    return slide_deck
+
+
+def render_slide_deck(
+    slide_deck: SlideDeck,
+    save_ppt: bool = True,
+    output_folder: str = "../output/",
+    output_shard_levels: int = 0,
+    output_format: str = "pptx",
+) -> Tuple[Optional[Presentation], Optional[str]]:
+    """Build the powerpoint of a generated slide deck and save it. This is the CPU and disk-bound phase"""
+    # Only build the powerpoint when it will be saved as pptx
+    presentation = None
+    if save_ppt and output_format == "pptx":
+        presentation = get_schema(slide_deck.get_schema_name()).render_presentation(
+            slide_deck
+        )
+        logger.info('Presentation generated: {}'.format(presentation))
 
     # Save presentation
     presentation_file = None
     if save_ppt:
-        presentation_file = save_presentation_to_pptx(
-            output_folder, file_name, presentation
-        )
-
-        # Open the presentation
-        if open_ppt and presentation_file is not None:
-            path = os.path.realpath(presentation_file)
-            _open_file(path)
+        file_name = _get_file_name(slide_deck.get_presentation_context()["topics"])
+        if output_format == "pptx":
+            presentation_file = save_presentation_to_pptx(
+                output_folder, file_name, presentation, output_shard_levels
+            )
+        else:
+            presentation_file = save_slide_deck_to_file(
+                output_folder, file_name, slide_deck, output_format, output_shard_levels
+            )
 
-    return presentation, slide_deck, presentation_file
+    return presentation, presentation_file
 
 
-def save_presentation_to_pptx(output_folder: str, file_name: str, prs, index=0) -> Optional[str]:
-    """Save the talk."""
-    if index > MAX_PRESENTATION_SAVE_TRIES:
-        return None
+def _get_file_name(topics: List[str]) -> str:
+    cleaned_topics = ",".join(topics).replace(" ", "").replace(",", "_")
+    return "".join(e for e in cleaned_topics if e.isalnum() or e == "_")
 
-    suffix = "_" + str(index) if index > 0 else ""
-    fp: str = os.path.join(output_folder, str(file_name) + str(suffix) + ".pptx")
 
-    # If file already exists, don't overwrite it:
-    if pathlib.Path(fp).is_file():
-        return save_presentation_to_pptx(output_folder, file_name, prs, index + 1)
+def regenerate_slide(
+    schema: str,
+    slide_deck: SlideDeck,
+    slide_index: int,
+    presentation: Presentation = None,
+    int_seed: int = None,
+) -> Tuple[Presentation, SlideDeck]:
+    """Regenerate a single slide of an existing slide deck, and only re-render that slide if a presentation is given"""
+    logger.info("Regenerating slide {} of {}".format(slide_index + 1, slide_deck))
+    presentation_schema = get_schema(schema)
+    presentation_schema.regenerate_slide(slide_deck, slide_index, int_seed)
+    if presentation is not None:
+        slide_deck.save_slide_to_powerpoint(presentation, slide_index)
+    return presentation, slide_deck
+
+
+def load_slide_deck(deck_file: str, schema: str = None) -> SlideDeck:
+    """Load a serialized slide deck. The slide generators are looked up in the given schema, or the deck's own schema"""
+    with open(deck_file, encoding="utf-8") as file:
+        serialized = file.read()
+    slide_deck = SlideDeck.from_json(serialized)
+    schema = schema or slide_deck.get_schema_name()
+    if schema is None:
+        return slide_deck
+    return SlideDeck.from_json(serialized, get_schema(schema).get_slide_generator)
+
+
+def save_slide_deck(slide_deck: SlideDeck, deck_file: str):
+    with open(deck_file, "w", encoding="utf-8") as file:
+        file.write(slide_deck.to_json())
+    logger.info("Saved slide deck to {}".format(deck_file))
+
+
+def render_slide_deck_file(deck_file: str, output_file: str) -> str:
+    """Render a serialized slide deck to a pptx file with the powerpoint of its schema, without fetching any content
+    again"""
+    with open(deck_file, encoding="utf-8") as file:
+        slide_deck = SlideDeck.from_json(file.read())
+    if slide_deck.get_schema_name() is not None:
+        presentation = get_schema(slide_deck.get_schema_name()).render_presentation(
+            slide_deck
+        )
+    else:
+        presentation = powerpoint_slide_creator.create_new_powerpoint()
+        slide_deck.save_to_powerpoint(presentation)
+    presentation.save(output_file)
+    logger.info("Rendered {} to {}".format(deck_file, output_file))
+    return output_file
+
+
+def regenerate_slide_deck_file(
+    deck_file: str,
+    slide_index: int,
+    output_deck_file: str = None,
+    pptx_file: str = None,
+    schema: str = None,
+    int_seed: int = None,
+) -> SlideDeck:
+    """Regenerate one slide of a serialized slide deck, and re-render only that slide in the given pptx file"""
+    slide_deck = load_slide_deck(deck_file, schema)
+    schema = schema or slide_deck.get_schema_name()
+    if schema is None:
+        raise ValueError("The slide deck does not mention its schema, please pass one")
+
+    presentation = Presentation(pptx_file) if pptx_file else None
+    regenerate_slide(schema, slide_deck, slide_index, presentation, int_seed)
+
+    save_slide_deck(slide_deck, output_deck_file or deck_file)
+    if presentation is not None:
+        presentation.save(pptx_file)
+    return slide_deck
+
+
+def save_presentation_to_pptx(
+    output_folder: str, file_name: str, prs, shard_levels: int = 0
+) -> Optional[str]:
+    """Save the talk, without overwriting existing talks in the output folder."""
+    unique_file = os_util.open_unique_file(
+        output_folder, str(file_name), ".pptx", shard_levels
+    )
+    if unique_file is None:
+        logger.error("Could not find a free file name for {}".format(file_name))
+        return None
 
-    # Create the parent folder if it doesn't exist
-    pathlib.Path(os.path.dirname(fp)).mkdir(parents=True, exist_ok=True)
+    fp, file = unique_file
+    try:
+        with file, phase_util.phase(phase_util.SAVE):
+            prs.save(file)
+    except BaseException:
+        os_util.remove_unique_file(fp)
+        raise
+    logger.info("Saved talk to {}".format(fp))
+    return fp
+
+
+def save_slide_deck_to_file(
+    output_folder: str,
+    file_name: str,
+    slide_deck: SlideDeck,
+    output_format: str,
+    shard_levels: int = 0,
+) -> Optional[str]:
+    """Save the talk as JSON or HTML, without needing python-pptx."""
+    content = slide_deck.to_json() if output_format == "json" else slide_deck.to_html()
+    unique_file = os_util.open_unique_file(
+        output_folder, str(file_name), "." + output_format, shard_levels
+    )
+    if unique_file is None:
+        logger.error("Could not find a free file name for {}".format(file_name))
+        return None
 
+    fp, file = unique_file
     try:
-        prs.save(fp)
-        logger.info("Saved talk to {}".format(fp))
-        return fp
-    except PermissionError:
-        return save_presentation_to_pptx(output_folder, file_name, prs, index + 1)
+        with file, phase_util.phase(phase_util.SAVE):
+            file.write(content.encode("utf-8"))
+    except BaseException:
+        os_util.remove_unique_file(fp)
+        raise
+    logger.info("Saved talk to {}".format(fp))
+    return fp
 
 
 def _open_file(filename: str):
@@ -229,16 +426,106 @@ def get_argument_parser():
         type=str,
         help="The folder to output the generated presentations",
     )
+    parser.add_argument(
+        "--output_shard_levels",
+        default=0,
+        type=int,
+        help="Number of hashed subdirectory levels to spread the saved presentations over",
+    )
     parser.add_argument(
         "--save_ppt",
         default=True,
         type=str2bool,
         help="If this flag is true, the generated powerpoint will be saved",
     )
+    parser.add_argument(
+        "--format",
+        default="pptx",
+        choices=OUTPUT_FORMATS,
+        help="Save the talk as a powerpoint, a JSON description or a self-contained HTML slideshow",
+    )
     parser.add_argument(
         "--open_ppt",
         default=True,
         type=str2bool,
         help="Generated powerpoint will automatically open",
     )
+    parser.add_argument(
+        "--max_external_calls",
+        default=None,
+        type=int,
+        help="Maximum number of external calls (e.g. to ConceptNet or Reddit) for the deck, after which no more slides are generated",
+    )
+    parser.add_argument(
+        "--metrics_file",
+        default=None,
+        type=str,
+        help="File to write the generator and source metrics to, as JSON if it ends with .json, else in the Prometheus text format",
+    )
+    parser.add_argument(
+        "--trace_file",
+        default=None,
+        type=str,
+        help="File to write a Chrome trace of all generator and source calls of the deck to",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=profile_util.CPROFILE,
+        default=None,
+        choices=profile_util.PROFILE_MODES,
+        help="Profile every generation phase, with cProfile (default) or a light sampling profiler for parallel runs",
+    )
+    parser.add_argument(
+        "--profile_folder",
+        default="../profile/",
+        type=str,
+        help="The folder to write the profile of every phase to, as pstats or collapsed stack files",
+    )
+    return parser
+
+
+def get_render_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog="talkgenerator render",
+        description="Render a serialized slide deck (saved with --format json) to a pptx file.",
+    )
+    parser.add_argument("deck_file", type=str, help="The serialized slide deck")
+    parser.add_argument("output_file", type=str, help="The pptx file to create")
+    return parser
+
+
+def get_regenerate_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog="talkgenerator regenerate",
+        description="Regenerate a single slide of a serialized slide deck (saved with --format json).",
+    )
+    parser.add_argument("deck_file", type=str, help="The serialized slide deck")
+    parser.add_argument(
+        "slide_nr", type=int, help="The number of the slide to regenerate, starting at 1"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        type=str,
+        help="Where to save the updated slide deck, leave blank to overwrite the given deck",
+    )
+    parser.add_argument(
+        "--pptx",
+        default=None,
+        type=str,
+        help="A pptx file rendered from this deck, in which only the regenerated slide is replaced",
+    )
+    parser.add_argument(
+        "--schema",
+        default=None,
+        type=str,
+        help="The presentation schema to regenerate with, leave blank to use the schema of the deck",
+    )
+    parser.add_argument(
+        "--int_seed",
+        default=None,
+        type=int,
+        help="Seed used for random.seed(int_seed).",
+    )
     return parser
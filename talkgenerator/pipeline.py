@@ -0,0 +1,177 @@
+"""
+Pipelines the generation of many presentations in one process: while one slide deck is being rendered and saved
+(CPU and disk-bound), the next slide decks are already generating their content (network-bound).
+Both stages have their own executor, and bounded queues between them to keep memory use in check.
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from talkgenerator import generator
+from talkgenerator.slide.slide_deck import SlideDeck
+from talkgenerator.util import language_util
+
+logger = logging.getLogger("talkgenerator")
+
+
+class PresentationPipeline(object):
+    """ Generates and renders presentations in two overlapping stages.
+
+    Use `submit` with the arguments of `generator.generate_presentation`, which returns a future of the
+    (presentation_file, slide_deck) tuple. Opening the presentation, showing the logs and profiling are not supported
+    by the workers, so `open_ppt`, `print_logs`, `profile` and `profile_folder` are ignored. `submit` blocks when more than `max_queued_generations` decks are waiting
+    to be generated, and generation workers block when more than `max_queued_renders` decks are waiting to be
+    rendered, such that a fast stage can never run arbitrarily far ahead of a slow one. Generation workers load the
+    language models when they start.
+
+    Generating a deck seeds and draws from the global random generator, so decks generated concurrently disturb
+    each other's random draws. An `int_seed` is therefore only supported with a single generation worker. """
+
+    def __init__(
+        self,
+        generation_workers: int = 2,
+        rendering_workers: int = 1,
+        max_queued_generations: int = 4,
+        max_queued_renders: int = 2,
+    ):
+        self._generation_workers = generation_workers
+        self._generation_executor = ThreadPoolExecutor(
+            max_workers=generation_workers,
+            thread_name_prefix="talkgenerator-generate",
+            initializer=_preload,
+        )
+        self._rendering_executor = ThreadPoolExecutor(
+            max_workers=rendering_workers, thread_name_prefix="talkgenerator-render"
+        )
+        self._generation_slots = threading.BoundedSemaphore(
+            generation_workers + max_queued_generations
+        )
+        self._rendering_slots = threading.BoundedSemaphore(
+            rendering_workers + max_queued_renders
+        )
+
+    def submit(self, **presentation_arguments) -> Future:
+        result = Future()
+        self._generation_slots.acquire()
+        try:
+            self._generation_executor.submit(
+                self._generate, result, presentation_arguments
+            )
+        except Exception:
+            self._generation_slots.release()
+            raise
+        return result
+
+    def _generate(self, result: Future, presentation_arguments: dict):
+        ignored = [
+            name for name in _IGNORED_ARGUMENTS if presentation_arguments.get(name)
+        ]
+        if ignored:
+            logger.warning(
+                "Ignoring presentation arguments in the pipeline: {}".format(ignored)
+            )
+        try:
+            if (
+                presentation_arguments.get("int_seed") is not None
+                and self._generation_workers > 1
+            ):
+                raise ValueError(
+                    "int_seed is only reproducible with a single generation worker"
+                )
+            slide_deck = generator.generate_slide_deck(
+                **_get_arguments(presentation_arguments, _GENERATION_ARGUMENTS)
+            )
+        except Exception as e:
+            result.set_exception(e)
+            return
+        finally:
+            self._generation_slots.release()
+
+        # Wait for room in the rendering queue, so generated decks don't pile up
+        self._rendering_slots.acquire()
+        try:
+            self._rendering_executor.submit(
+                self._render, result, slide_deck, presentation_arguments
+            )
+        except Exception as e:
+            self._rendering_slots.release()
+            result.set_exception(e)
+
+    def _render(self, result: Future, slide_deck: SlideDeck, presentation_arguments):
+        try:
+            _, presentation_file = generator.render_slide_deck(
+                slide_deck, **_get_arguments(presentation_arguments, _RENDER_ARGUMENTS)
+            )
+            result.set_result((presentation_file, slide_deck))
+        except Exception as e:
+            result.set_exception(e)
+        finally:
+            self._rendering_slots.release()
+
+    def close(self):
+        """ Waits until all submitted presentations are generated and rendered """
+        self._generation_executor.shutdown(wait=True)
+        self._rendering_executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _preload():
+    """ Loads the language models when a generation worker starts, instead of halfway its first deck """
+    try:
+        language_util.preload()
+    except Exception as e:
+        # The executor would refuse all work if its initializer failed, and generating may not need NLTK
+        logger.warning("Could not preload the language models: {}".format(e))
+
+
+_GENERATION_ARGUMENTS = (
+    "schema",
+    "slides",
+    "topic",
+    "title",
+    "presenter",
+    "parallel",
+    "int_seed",
+    "max_external_calls",
+    "debug",
+)
+_RENDER_ARGUMENTS = ("save_ppt", "output_folder", "output_shard_levels", "output_format")
+_IGNORED_ARGUMENTS = ("open_ppt", "print_logs", "profile", "profile_folder")
+
+
+def _get_arguments(presentation_arguments: dict, names) -> dict:
+    unknown = (
+        set(presentation_arguments)
+        - set(_GENERATION_ARGUMENTS)
+        - set(_RENDER_ARGUMENTS)
+        - set(_IGNORED_ARGUMENTS)
+    )
+    if unknown:
+        raise ValueError("Unknown presentation arguments: {}".format(unknown))
+    return {
+        name: presentation_arguments[name]
+        for name in names
+        if name in presentation_arguments
+    }
+
+
+def generate_presentations(
+    all_presentation_arguments: Iterable[dict],
+    generation_workers: int = 2,
+    rendering_workers: int = 1,
+) -> List[Tuple[Optional[str], SlideDeck]]:
+    """ Generates and saves many presentations, overlapping the generation and rendering of different decks.
+    Returns the (presentation_file, slide_deck) tuples in the same order as the given arguments """
+    with PresentationPipeline(generation_workers, rendering_workers) as pipeline:
+        futures = [
+            pipeline.submit(**presentation_arguments)
+            for presentation_arguments in all_presentation_arguments
+        ]
+    return [future.result() for future in futures]
@@ -1,3 +1,5 @@
+import sys
+
 from talkgenerator import generator
 
 
@@ -8,9 +10,36 @@ def main(args):
     )
 
 
+def render(args):
+    """Render a serialized slide deck to a pptx file."""
+    generator.render_slide_deck_file(args.deck_file, args.output_file)
+
+
+def regenerate(args):
+    """Regenerate a single slide of a serialized slide deck."""
+    generator.regenerate_slide_deck_file(
+        args.deck_file,
+        args.slide_nr - 1,
+        output_deck_file=args.output,
+        pptx_file=args.pptx,
+        schema=args.schema,
+        int_seed=args.int_seed,
+    )
+
+
+_SUBCOMMANDS = {
+    "render": (generator.get_render_argument_parser, render),
+    "regenerate": (generator.get_regenerate_argument_parser, regenerate),
+}
+
+
 def main_cli():
-    args = generator.get_argument_parser().parse_args()
-    main(args)
+    arguments = sys.argv[1:]
+    if arguments and arguments[0] in _SUBCOMMANDS:
+        get_parser, command = _SUBCOMMANDS[arguments[0]]
+        command(get_parser().parse_args(arguments[1:]))
+    else:
+        main(generator.get_argument_parser().parse_args(arguments))
 
 
 if __name__ == "__main__":
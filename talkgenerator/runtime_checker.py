@@ -1,7 +1,6 @@
 import logging
 
 import talkgenerator.settings
-import talkgenerator.util.language_util
 
 logger = logging.getLogger("talkgenerator")
 
@@ -11,8 +10,6 @@ def check_runtime_environment():
     if check_env:
         logger.info("Successful check: Environment variables")
 
-    check_ntlk = talkgenerator.util.language_util.check_and_download()
-    if check_ntlk:
-        logger.info("Successful check: NLTK Dictionaries available")
+    # The NLTK data is only checked (and downloaded) when first needed, see language_util.preload
 
-    return check_ntlk
+    return check_env
@@ -10,7 +10,8 @@ import multiprocessing
 from multiprocessing.pool import ThreadPool
 multiprocessing.set_start_method('spawn')
 import random
-from typing import List, Collection, Callable, Dict, Union, Optional, Tuple
+from collections import defaultdict
+from typing import List, Collection, Callable, Dict, Union, Optional, Set, Tuple
 
 from pptx import Presentation
 
@@ -20,9 +21,15 @@ from talkgenerator.datastructures.slide_generator_data import _filter_generated_
 from talkgenerator.datastructures.slide_generator_data import SlideGeneratorData
 from talkgenerator.slide import slide_generator_types
 from talkgenerator.slide.slide_deck import SlideDeck
+from talkgenerator.sources import text_generator
+from talkgenerator.util import cache_util
+from talkgenerator.util import log_util
+from talkgenerator.util import metrics_util
+from talkgenerator.util import phase_util
 from talkgenerator.util import random_util
 
 logger = logging.getLogger("talkgenerator")
+_debug = log_util.DebugLogger(__name__)
 
 
 class PresentationSchema:
@@ -44,6 +51,7 @@ class PresentationSchema:
         if max_allowed_tags is None:
             max_allowed_tags = {}
         self._max_allowed_tags = max_allowed_tags
+        self._generators_by_tag = _index_generators_by_tag(slide_generators)
         self._ignore_weights = ignore_weights
         self._title_generator = title_generator
 
@@ -56,10 +64,36 @@ class PresentationSchema:
         parallel: bool = False,
         int_seed: int = None,
         save_ppt: bool = True,
+        max_external_calls: int = None,
+        debug: bool = False,
     ) -> Tuple[Presentation, SlideDeck]:
-        """Generate a presentation about a certain topic with a certain number of slides"""
+        """Generate a presentation about a certain topic with a certain number of slides.
+        The external calls of the deck are accounted in its source usage, and capped by max_external_calls.
+        If debug, all debug events of generating this deck are logged, even if the logger is not at debug level"""
 
         logger.info('Made it to presentation_schema...')
+        source_usage = metrics_util.SourceUsage(max_external_calls)
+        with metrics_util.using_source_usage(source_usage), log_util.debugging(
+            debug
+        ), text_generator.memoizing_functions():
+            slide_deck = self._generate_presentation(
+                topics, num_slides, presenter, title, parallel, int_seed
+            )
+        slide_deck.set_source_usage(source_usage)
+        logger.info(
+            "External calls of the slide deck: {}".format(
+                source_usage.to_dictionary()["total"]
+            )
+        )
+
+        if save_ppt:
+            return self.render_presentation(slide_deck), slide_deck
+
+        return None, slide_deck
+
+    def _generate_presentation(
+        self, topics, num_slides, presenter, title, parallel, int_seed
+    ) -> SlideDeck:
         # Generate random talk title
         if not title or title is None:
             if self._title_generator is not None:
@@ -68,12 +102,9 @@ class PresentationSchema:
                 title = "About " + topics[0]
         logger.info('Generate talk title: {}'.format(title))
 
-        # Create new presentation
-        slide_deck = SlideDeck(num_slides)
-        logger.info('Slide deck: {}'.format(slide_deck))
-
         # Create the topic-for-each-slide generator
-        seed_generator = self._seed_generator(topics, num_slides)
+        with phase_util.phase(phase_util.SEED_GENERATION):
+            seed_generator = self._seed_generator(topics, num_slides)
         logger.info('Seed generator: {}'.format(seed_generator))
 
         # Create main presentation_context
@@ -84,37 +115,53 @@ class PresentationSchema:
             "title": title,
         }
 
-        used_tags = {}
+        # Create new presentation
+        slide_deck = SlideDeck(num_slides, main_presentation_context)
+        logger.info('Slide deck: {}'.format(slide_deck))
+
+        used_tags = self._create_used_tags(num_slides)
         used_elements = set()
 
         # Generate
-        if parallel:
-            self._generate_slide_deck_parallel(
-                slide_deck,
-                num_slides,
-                main_presentation_context,
-                seed_generator,
-                used_elements,
-                used_tags,
-                int_seed,
-            )
-        else:
-            self._generate_slide_deck(
-                slide_deck,
-                num_slides,
-                main_presentation_context,
-                seed_generator,
-                used_elements,
-                used_tags,
-                int_seed,
-            )
+        with phase_util.phase(phase_util.SLIDE_GENERATION):
+            if parallel:
+                self._generate_slide_deck_parallel(
+                    slide_deck,
+                    num_slides,
+                    main_presentation_context,
+                    seed_generator,
+                    used_elements,
+                    used_tags,
+                    int_seed,
+                )
+            else:
+                self._generate_slide_deck(
+                    slide_deck,
+                    num_slides,
+                    main_presentation_context,
+                    seed_generator,
+                    used_elements,
+                    used_tags,
+                    int_seed,
+                )
 
-        if save_ppt:
+        # Remember the seeds of the slides that were not generated, e.g. as the call budget was used up,
+        # such that these can still be regenerated later
+        for slide_nr in range(num_slides):
+            if not slide_deck.has_slide_nr(slide_nr):
+                slide_deck.set_seed(slide_nr, seed_generator.get_seed(slide_nr))
+
+        return slide_deck
+
+    def render_presentation(self, slide_deck: SlideDeck) -> Presentation:
+        """Build the powerpoint of a generated slide deck. The images downloaded for it are accounted in the
+        source usage of the deck"""
+        with phase_util.phase(
+            phase_util.SAVE_TO_POWERPOINT
+        ), metrics_util.using_source_usage(slide_deck.get_source_usage()):
             presentation = self._powerpoint_creator()
             slide_deck.save_to_powerpoint(presentation)
-            return presentation, slide_deck
-
-        return None, slide_deck
+        return presentation
 
     def _generate_slide_deck_parallel(
         self,
@@ -123,7 +170,7 @@ class PresentationSchema:
         main_presentation_context,
         seed_generator: SlideSeedGenerator,
         used_elements,
-        used_tags: Dict[str, int],
+        used_tags: "UsedTags",
         int_seed: int,
     ):
         logger.info("Generating the slide deck in parallel")
@@ -132,6 +179,13 @@ class PresentationSchema:
         generated_results = [None] * num_slides
 
         while len(slide_nrs_to_generate) > 0:
+            if metrics_util.is_source_budget_exhausted():
+                logger.warning(
+                    "External call budget used up, not generating slides {}".format(
+                        slide_nrs_to_generate
+                    )
+                )
+                break
             if len(slide_nrs_to_generate) < num_slides:
                 logger.info(
                     "Regenerating the following slides: " + str(slide_nrs_to_generate)
@@ -145,10 +199,11 @@ class PresentationSchema:
                         seed_generator=seed_generator,
                         num_slides=num_slides,
                         used_elements=used_elements,
-                        prohibited_generators=self._calculate_prohibited_generators(
-                            used_tags, num_slides
-                        ),
+                        prohibited_generators=used_tags.get_prohibited_generators(),
                         int_seed=int_seed,
+                        source_usage=metrics_util.get_source_usage(),
+                        debug=log_util.is_debugging(),
+                        function_results=text_generator.get_function_results(),
                     ),
                     slide_nrs_to_generate,
                 )
@@ -160,6 +215,7 @@ class PresentationSchema:
                             generated_elements,
                             slide_generator_data,
                             slide_nr,
+                            seed,
                         ) = slide_result
                         generated_results[slide_nr] = slide_result
 
@@ -175,7 +231,6 @@ class PresentationSchema:
                             generated_results[i],
                             used_elements,
                             used_tags,
-                            num_slides,
                         )
                         if not success:
                             slide_nrs_to_generate.append(i)
@@ -193,7 +248,13 @@ class PresentationSchema:
         int_seed=None,
     ):
         for slide_nr in range(num_slides):
-            logger.debug('Generating slide: {}'.format(slide_nr))
+            if metrics_util.is_source_budget_exhausted():
+                logger.warning(
+                    "External call budget used up, not generating slides {} to {}".format(
+                        slide_nr + 1, num_slides
+                    )
+                )
+                break
             # Generate the slide
             slide_results = self.generate_slide(
                 presentation_context=create_slide_presentation_context(
@@ -202,33 +263,37 @@ class PresentationSchema:
                 slide_nr=slide_nr,
                 num_slides=num_slides,
                 used_elements=used_elements,
-                prohibited_generators=self._calculate_prohibited_generators(
-                    used_tags, num_slides
-                ),
+                prohibited_generators=used_tags.get_prohibited_generators(),
                 int_seed=int_seed,
             )
 
             if slide_results:
                 success = self._update_slide_deck_with_generated_result(
-                    slide_deck, slide_results, used_elements, used_tags, num_slides
+                    slide_deck, slide_results, used_elements, used_tags
                 )
                 assert success
 
         return slide_deck
 
     def _update_slide_deck_with_generated_result(
-        self, slide_deck, generated_result, used_elements, used_tags, num_slides
+        self, slide_deck, generated_result, used_elements, used_tags
     ):
-        slide, generated_elements, slide_generator_data, slide_nr = generated_result
+        (
+            slide,
+            generated_elements,
+            slide_generator_data,
+            slide_nr,
+            seed,
+        ) = generated_result
         # Check if allowed according to repeated elements & slide type tags
         if slide_generator_types.is_different_enough_for_allowed_repeated(
             generated_elements,
             used_elements,
             slide_generator_data.get_allowed_repeated_elements(),
-        ) and slide_generator_data not in self._calculate_prohibited_generators(
-            used_tags, num_slides
-        ):
-            slide_deck.add_slide(slide_nr, slide)
+        ) and not used_tags.is_prohibited(slide_generator_data):
+            slide_deck.add_slide(
+                slide_nr, slide, generated_elements, slide_generator_data, seed
+            )
             self._update_used_elements(
                 used_elements, used_tags, generated_elements, slide_generator_data
             )
@@ -244,8 +309,8 @@ class PresentationSchema:
         _filter_generated_elements(generated_elements)
         used_elements.update(generated_elements)
 
-        # Add generator tags to used_tags list
-        add_tags(used_tags, slide_generator_data.get_tags())
+        # Add generator tags to the used tags
+        used_tags.add_tags(slide_generator_data.get_tags())
 
     def generate_slide(
         self,
@@ -256,17 +321,30 @@ class PresentationSchema:
         prohibited_generators=None,
         int_seed=None,
     ):
-        logger.debug('presentation_schema.generate_slide: {}'.format(slide_nr))
         if int_seed is not None:
             random.seed(int_seed + slide_nr)
 
+        # Every attempt, including falling back on another generator, may make external calls
+        if metrics_util.is_source_budget_exhausted():
+            logger.info(
+                "External call budget used up, not generating slide {}".format(
+                    slide_nr + 1
+                )
+            )
+            return None
+
         # Default arguments: avoid mutable defaults
         if prohibited_generators is None:
             prohibited_generators = set()
 
         # Select the slide generator to generate with
         generator = self._select_generator(slide_nr, num_slides, prohibited_generators)
-        logger.debug('Generator: {}'.format(generator))
+        _debug(
+            "select_generator",
+            slide_nr=slide_nr,
+            generator=generator,
+            prohibited_generators=prohibited_generators,
+        )
 
         start_time = time.time()
         if generator:
@@ -276,7 +354,7 @@ class PresentationSchema:
                 )
             )
             slide_result = generator.generate(presentation_context, used_elements)
-            logger.debug('Slide result: {}'.format(slide_result))
+            _debug("generate_slide", slide_nr=slide_nr, slide_result=slide_result)
 
             # Try again if slide is None, and prohibit generator for generating for this topic
             if not bool(slide_result):
@@ -306,70 +384,176 @@ class PresentationSchema:
                     round(end_time - start_time, 2),
                 )
             )
-            return slide, generated_elements, generator, slide_nr
+            return (
+                slide,
+                generated_elements,
+                generator,
+                slide_nr,
+                presentation_context["seed"],
+            )
         else:
             logger.warning(
                 "No generator found to generate about ",
                 presentation_context["Presentation"],
             )
 
+    def get_slide_generator(self, name: str) -> Optional[SlideGeneratorData]:
+        """Find the slide generator of this schema with the given name"""
+        for slide_generator in self._slide_generators:
+            if str(slide_generator) == name:
+                return slide_generator
+        return None
+
+    def regenerate_slide(
+        self,
+        slide_deck: SlideDeck,
+        slide_nr: int,
+        int_seed: int = None,
+        attempts: int = 10,
+    ) -> SlideDeck:
+        """Generate the given slide of an existing slide deck again, leaving all other slides untouched.
+        The elements and tags used by the other slides are respected, and the content of the slide
+        being replaced is avoided. The slide is kept if the external call budget of the deck is used up,
+        and a ValueError is raised if none of the attempts generated an allowed slide."""
+        num_slides = slide_deck.get_size()
+        if slide_deck.get_source_usage() is None:
+            slide_deck.set_source_usage(metrics_util.SourceUsage())
+        used_elements = slide_deck.get_used_elements()
+        used_tags = self._create_used_tags(
+            num_slides, slide_deck.get_used_tags(excluded_slide_index=slide_nr)
+        )
+
+        seed = slide_deck.get_seed(slide_nr)
+        if seed is None:
+            seed = slide_deck.get_presentation_context()["topic"]
+        presentation_context = create_slide_presentation_context(
+            slide_deck.get_presentation_context(), seed
+        )
+
+        success = False
+        attempt = 0
+        while not success:
+            if attempt >= attempts:
+                raise ValueError(
+                    "Could not regenerate slide {} in {} attempts".format(
+                        slide_nr + 1, attempts
+                    )
+                )
+            attempt += 1
+            if slide_deck.get_source_usage().is_exhausted():
+                logger.warning(
+                    "External call budget used up, not regenerating slide {}".format(
+                        slide_nr + 1
+                    )
+                )
+                break
+            with metrics_util.using_source_usage(slide_deck.get_source_usage()):
+                slide_result = self.generate_slide(
+                    presentation_context=dict(presentation_context),
+                    slide_nr=slide_nr,
+                    num_slides=num_slides,
+                    used_elements=used_elements,
+                    prohibited_generators=used_tags.get_prohibited_generators(),
+                    int_seed=int_seed,
+                )
+            success = bool(slide_result) and (
+                self._update_slide_deck_with_generated_result(
+                    slide_deck, slide_result, used_elements, used_tags
+                )
+            )
+            # Only use the given int seed once, as it would otherwise generate the same slide over and over
+            int_seed = None
+
+        return slide_deck
+
     def _select_generator(self, slide_nr, total_slides, prohibited_generators):
         """Select a generator for a certain slide number"""
-        logging.debug('presentation_schema._select_generator self._slide_generators: {}'.format(
-                self._slide_generators))
-        logging.debug('self._ignore_weights: {}'.format(self._ignore_weights))
         if self._ignore_weights:
             return random_util.choice_optional(self._slide_generators)
-        _selected_generator = random_util.weighted_random(
+        return random_util.weighted_random(
             self._get_weighted_generators_for_slide_nr(
                 slide_nr, total_slides, prohibited_generators))
-        logging.debug('_selected_generator: {}'.format(_selected_generator))
-        return _selected_generator
 
     def _get_weighted_generators_for_slide_nr(
         self, slide_nr, total_slides, prohibited_generators
     ):
-        weighted_generators = []
-        for i in range(len(self._slide_generators)):
-            generator = self._slide_generators[i]
-            if generator in prohibited_generators:
-                continue
-            weighted_generator = (
-                generator.get_weight_for(slide_nr, total_slides),
-                generator,
-            )
-            weighted_generators.append(weighted_generator)
+        weighted_generators = self._get_weight_table(total_slides)[slide_nr]
+        if prohibited_generators:
+            weighted_generators = [
+                weighted_generator
+                for weighted_generator in weighted_generators
+                if weighted_generator[1] not in prohibited_generators
+            ]
 
         if len(weighted_generators) == 0:
             raise ValueError("No generators left to generate slides with!")
 
         return weighted_generators
 
-    def _calculate_prohibited_generators(
-        self, used_tags: Dict[str, int], num_slides: int
+    @cache_util.registered_cache(maxsize=16)
+    def _get_weight_table(self, num_slides: int) -> List[List[Tuple[float, SlideGeneratorData]]]:
+        """ The weight of every generator for every slide number of a deck with the given number of slides """
+        return [
+            [
+                (generator.get_weight_for(slide_nr, num_slides), generator)
+                for generator in self._slide_generators
+            ]
+            for slide_nr in range(num_slides)
+        ]
+
+    def _create_used_tags(
+        self, num_slides: int, used_tags: Dict[str, int] = None
+    ) -> "UsedTags":
+        max_tag_counts = {}
+        for tag, max_tag in self._max_allowed_tags.items():
+            # Assumes integer maximum
+            max_number_of_slides = max_tag
+
+            # If Procentua/Double ratio:
+            if 0 < max_tag < 1:
+                max_number_of_slides = int(max_tag * num_slides)
+            max_tag_counts[tag] = max_number_of_slides
+        return UsedTags(max_tag_counts, self._generators_by_tag, used_tags)
+
+
+class UsedTags(object):
+    """ Counts the tags of the slide generators used in a deck, and keeps track of the generators that are
+    prohibited as one of their tags is used on as many slides as allowed """
+
+    def __init__(
+        self,
+        max_tag_counts: Dict[str, int],
+        generators_by_tag: Dict[str, List[SlideGeneratorData]],
+        used_tags: Dict[str, int] = None,
     ):
-        prohibited_tags = set()
-        for key, value in used_tags.items():
-            if key in self._max_allowed_tags:
-                max_tag = self._max_allowed_tags[key]
+        self._max_tag_counts = max_tag_counts
+        self._generators_by_tag = generators_by_tag
+        self._counts: Dict[str, int] = {}
+        self._prohibited_generators: Set[SlideGeneratorData] = set()
+        if used_tags:
+            for tag, count in used_tags.items():
+                self._add_tag(tag, count)
 
-                # Assumes integer maximum
-                max_number_of_slides = max_tag
+    def add_tags(self, tags: Collection[str]):
+        for tag in tags:
+            self._add_tag(tag, 1)
 
-                # If Procentua/Double ratio:
-                if 0 < max_tag < 1:
-                    max_number_of_slides = int(max_tag * num_slides)
+    def _add_tag(self, tag: str, count: int):
+        self._counts[tag] = self._counts.get(tag, 0) + count
+        max_count = self._max_tag_counts.get(tag)
+        # Check if currently over the max allowed slides of this tag
+        if max_count is not None and self._counts[tag] >= max_count:
+            self._prohibited_generators.update(self._generators_by_tag.get(tag, ()))
 
-                # Check if currently over the max allowed slides of this tag
-                if value >= max_number_of_slides:
-                    prohibited_tags.add(key)
+    def get_prohibited_generators(self) -> Set[SlideGeneratorData]:
+        """ Copy of the prohibited generators, to which the generators failing for a slide can be added """
+        return set(self._prohibited_generators)
 
-        prohibited_generators = set()
-        for generator in self._slide_generators:
-            if set(generator.get_tags()) & prohibited_tags:
-                prohibited_generators.add(generator)
+    def is_prohibited(self, slide_generator_data: SlideGeneratorData) -> bool:
+        return slide_generator_data in self._prohibited_generators
 
-        return prohibited_generators
+    def to_dictionary(self) -> Dict[str, int]:
+        return dict(self._counts)
 
 
 class SlideGeneratorContext(object):
@@ -382,6 +566,9 @@ class SlideGeneratorContext(object):
         used_elements: Optional[Collection[Union[str, ImageData]]] = None,
         prohibited_generators: Optional[Collection[SlideGeneratorData]] = None,
         int_seed: Optional[int] = None,
+        source_usage: Optional[metrics_util.SourceUsage] = None,
+        debug: bool = False,
+        function_results: Optional[dict] = None,
     ):
         self.presentation_schema = presentation_schema
         self.presentation_context = presentation_context
@@ -390,23 +577,31 @@ class SlideGeneratorContext(object):
         self.used_elements = used_elements
         self.prohibited_generators = prohibited_generators
         self.int_seed = int_seed
+        # Usage of the deck, as the worker threads don't see the usage of the generating thread
+        self.source_usage = source_usage
+        self.debug = debug
+        # Results of the template functions of the deck, shared by all slides
+        self.function_results = function_results
 
     def __call__(self, slide_nr):
         if self and self.int_seed and self.int_seed is not None:
             random.seed(self.int_seed + slide_nr)
 
-        return self.presentation_schema.generate_slide(
-            # presentation_context=dict(),
-            create_slide_presentation_context(
-                self.presentation_context,
-                self.seed_generator.get_seed(slide_nr)
-                # 'cat'
-            ),
-            slide_nr=slide_nr,
-            num_slides=self.num_slides,
-            used_elements=self.used_elements,
-            prohibited_generators=self.prohibited_generators,
-        )
+        with metrics_util.using_source_usage(self.source_usage), log_util.debugging(
+            self.debug
+        ), text_generator.memoizing_functions(self.function_results):
+            return self.presentation_schema.generate_slide(
+                # presentation_context=dict(),
+                create_slide_presentation_context(
+                    self.presentation_context,
+                    self.seed_generator.get_seed(slide_nr)
+                    # 'cat'
+                ),
+                slide_nr=slide_nr,
+                num_slides=self.num_slides,
+                used_elements=self.used_elements,
+                prohibited_generators=self.prohibited_generators,
+            )
 
 
 # Helper functions
@@ -416,9 +611,11 @@ def create_slide_presentation_context(main_presentation_context, seed):
     return presentation_context
 
 
-def add_tags(used_tags, tags):
-    for tag in tags:
-        if tag not in used_tags:
-            used_tags[tag] = 1
-        else:
-            used_tags[tag] += 1
+def _index_generators_by_tag(
+    slide_generators: List[SlideGeneratorData],
+) -> Dict[str, List[SlideGeneratorData]]:
+    generators_by_tag = defaultdict(list)
+    for generator in slide_generators:
+        for tag in set(generator.get_tags()):
+            generators_by_tag[tag].append(generator)
+    return dict(generators_by_tag)
@@ -1,4 +1,6 @@
-from talkgenerator.schema.slide_schemas import *
+import threading
+from typing import Callable, Dict
+
 from talkgenerator.schema import slide_topic_generators
 from talkgenerator.schema.presentation_schema import PresentationSchema
 from talkgenerator.datastructures.slide_generator_data import ConstantWeightFunction
@@ -10,107 +12,158 @@ from talkgenerator.slide import slide_generator_types
 # =====  PRESENTATION SCHEMAS  =====
 # ==================================
 
+# The schemas are only created when first requested, as creating their slide generators imports and loads
+# all content generators and their sources
+
+
+def _slide_schemas():
+    from talkgenerator.schema import slide_schemas
+
+    return slide_schemas
+
+
+def create_presentation_schema():
+    """ This object holds all the information about how to generate the presentation """
+    slide_schemas = _slide_schemas()
+    return PresentationSchema(
+        # Basic powerpoint generator
+        powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
+        # Topic per slide generator
+        seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
+        # Title of the presentation
+        title_generator=slide_schemas.talk_title_generator,
+        # Slide generators
+        slide_generators=slide_schemas.all_slide_generators,
+        # Max tags
+        max_allowed_tags=slide_schemas.default_max_allowed_tags,
+    )
+
+
+def create_interview_schema():
+    """ Interview schema: Disallow about_me slides """
+    slide_schemas = _slide_schemas()
+    interview_max_allowed_tags = slide_schemas.default_max_allowed_tags.copy()
+    interview_max_allowed_tags["about_me"] = 0
+
+    return PresentationSchema(
+        # Basic powerpoint generator
+        powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
+        # Topic per slide generator
+        seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
+        # Title of the presentation
+        title_generator=slide_schemas.talk_title_generator,
+        # Slide generators
+        slide_generators=slide_schemas.all_slide_generators,
+        # Max tags
+        max_allowed_tags=interview_max_allowed_tags,
+    )
+
+
+def create_test_schema():
+    """ Test schema: for testing purposes """
+    slide_schemas = _slide_schemas()
+    return PresentationSchema(
+        # Basic powerpoint generator
+        powerpoint_slide_creator.create_new_powerpoint,
+        # Title of the presentation
+        title_generator=slide_schemas.talk_title_generator,
+        # Topic per slide generator
+        # seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
+        seed_generator=slide_topic_generators.IdentityTopicGenerator,
+        # Slide generators
+        slide_generators=slide_schemas.title_slide_generators
+        + [
+            SlideGeneratorData(
+                # slide_templates.generate_image_slide(
+                slide_generator_types.ImageSlideGenerator.of(
+                    slide_schemas.inspiration_title_generator,
+                    slide_schemas.generate_unsplash_image,
+                ),
+                weight_function=ConstantWeightFunction(8),
+                allowed_repeated_elements=10,
+                name="Test sourcing",
+            )
+        ],
+        # ignore_weights=True,
+    )
+
+
+def create_ted_schema():
+    """ TED schema: using only images from approved sources """
+    slide_schemas = _slide_schemas()
+    return PresentationSchema(
+        # Basic powerpoint generator
+        powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
+        # Topic per slide generator
+        seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
+        # Title of the presentation
+        title_generator=slide_schemas.talk_ted_title_generator,
+        # Slide generators
+        slide_generators=slide_schemas.title_slide_generators
+        + slide_schemas.history_slide_generators_copyright_free
+        + slide_schemas.single_image_slide_generators_copyright_free
+        + slide_schemas.statement_slide_generators_copyright_free
+        + slide_schemas.captioned_images_slide_generators_copyright_free
+        + slide_schemas.own_chart_generators
+        + slide_schemas.conclusion_slide_generators_copyright_free,
+        # Max tags
+        max_allowed_tags={
+            # Absolute maxima
+            "title": 1,
+            "history": 1,
+            "anecdote": 1,
+            "location_chart": 1,
+            "chart": 1,
+            "deep": 2,
+            # Relative (procentual) maxima
+            "two_captions": 0.3,
+            "three_captions": 0.2,
+            "multi_captions": 0.3,
+            "gif": 0.5,
+            "quote": 0.2,
+            "statement": 0.2,
+        },
+    )
+
+
+schema_factories: Dict[str, Callable[[], PresentationSchema]] = {
+    "default": create_presentation_schema,
+    "interview": create_interview_schema,
+    "test": create_test_schema,
+    "ted": create_ted_schema,
+}
+
+# The schemas that were already created
+schemas: Dict[str, PresentationSchema] = {}
+_schemas_lock = threading.Lock()
+
+
+def register_schema(name: str, schema_factory: Callable[[], PresentationSchema]):
+    """ Registers a schema, which is only created when first requested """
+    schema_factories[name] = schema_factory
+
+
+def get_schema(name) -> PresentationSchema:
+    schema = schemas.get(name)
+    if schema is None:
+        with _schemas_lock:
+            schema = schemas.get(name)
+            if schema is None:
+                schema = schema_factories[name]()
+                schemas[name] = schema
+    return schema
+
 
-# This object holds all the information about how to generate the presentation
-presentation_schema = PresentationSchema(
-    # Basic powerpoint generator
-    powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
-    # Topic per slide generator
-    seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
-    # Title of the presentation
-    title_generator=talk_title_generator,
-    # Slide generators
-    slide_generators=all_slide_generators,
-    # Max tags
-    max_allowed_tags=default_max_allowed_tags,
-)
-
-# Interview schema: Disallow about_me slides
-interview_max_allowed_tags = default_max_allowed_tags.copy()
-interview_max_allowed_tags["about_me"] = 0
-
-interview_schema = PresentationSchema(
-    # Basic powerpoint generator
-    powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
-    # Topic per slide generator
-    seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
-    # Title of the presentation
-    title_generator=talk_title_generator,
-    # Slide generators
-    slide_generators=all_slide_generators,
-    # Max tags
-    max_allowed_tags=interview_max_allowed_tags,
-)
-
-# Test schema: for testing purposes
-
-test_schema = PresentationSchema(
-    # Basic powerpoint generator
-    powerpoint_slide_creator.create_new_powerpoint,
-    # Title of the presentation
-    title_generator=talk_title_generator,
-    # Topic per slide generator
-    # seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
-    seed_generator=slide_topic_generators.IdentityTopicGenerator,
-    # Slide generators
-    slide_generators=title_slide_generators
-    + [
-        SlideGeneratorData(
-            # slide_templates.generate_image_slide(
-            slide_generator_types.ImageSlideGenerator.of(
-                inspiration_title_generator, generate_unsplash_image
-            ),
-            weight_function=ConstantWeightFunction(8),
-            allowed_repeated_elements=10,
-            name="Test sourcing",
-        )
-    ],
-    # ignore_weights=True,
-)
-
-
-# TED schema: using only images from approved sources
-ted_schema = PresentationSchema(
-    # Basic powerpoint generator
-    powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
-    # Topic per slide generator
-    seed_generator=slide_topic_generators.SideTrackingTopicGenerator,
-    # Title of the presentation
-    title_generator=talk_ted_title_generator,
-    # Slide generators
-    slide_generators=title_slide_generators
-    + history_slide_generators_copyright_free
-    + single_image_slide_generators_copyright_free
-    + statement_slide_generators_copyright_free
-    + captioned_images_slide_generators_copyright_free
-    + own_chart_generators
-    + conclusion_slide_generators_copyright_free,
-    # Max tags
-    max_allowed_tags={
-        # Absolute maxima
-        "title": 1,
-        "history": 1,
-        "anecdote": 1,
-        "location_chart": 1,
-        "chart": 1,
-        "deep": 2,
-        # Relative (procentual) maxima
-        "two_captions": 0.3,
-        "three_captions": 0.2,
-        "multi_captions": 0.3,
-        "gif": 0.5,
-        "quote": 0.2,
-        "statement": 0.2,
-    },
-)
-
-schemas = {
-    "default": presentation_schema,
-    "interview": interview_schema,
-    "test": test_schema,
-    "ted": ted_schema,
+# The module attributes that held the schemas when they were created on import
+_schema_attributes = {
+    "presentation_schema": "default",
+    "interview_schema": "interview",
+    "test_schema": "test",
+    "ted_schema": "ted",
 }
 
 
-def get_schema(name):
-    return schemas[name]
+def __getattr__(name):
+    if name in _schema_attributes:
+        return get_schema(_schema_attributes[name])
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -1,11 +1,10 @@
 import multiprocessing
 import random
 import logging
-from functools import lru_cache
 from typing import List, Collection
 
 from talkgenerator.sources import conceptnet, phrasefinder
-from talkgenerator.util import language_util, random_util
+from talkgenerator.util import cache_util, language_util, random_util
 
 # == TOPIC GENERATORS ==
 
@@ -125,7 +124,7 @@ def _fill_in(seeds, i, distance=1):
                 _fill_in(seeds, i, distance + 1)
 
 
-@lru_cache(maxsize=300)
+@cache_util.registered_cache(maxsize=300)
 def normalise_seed(seed):
     normalised = conceptnet.normalise(seed).lower()
     normalised = language_util.replace_non_alphabetical_characters(normalised)
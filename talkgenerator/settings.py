@@ -1,4 +1,7 @@
 import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
 from environs import Env
 
 
@@ -54,6 +57,43 @@ def pexels_auth():
     return {"pexels_key": env.str("PEXELS_KEY", "")}
 
 
+# Base URLs of external services overriding their real location, e.g. to use local stub servers
+_base_urls: Dict[str, str] = {}
+
+
+def set_base_url(service: str, base_url: Optional[str]):
+    """ Overrides the base URL (e.g. "http://localhost:8000") of an external service, None removes the override """
+    if base_url is None:
+        _base_urls.pop(service, None)
+    else:
+        _base_urls[service] = base_url
+
+
+def get_base_url(service: str) -> Optional[str]:
+    """ The overridden base URL of the service, set using set_base_url or the TALKGENERATOR_<SERVICE>_URL variable """
+    if service in _base_urls:
+        return _base_urls[service]
+    return env.str("TALKGENERATOR_{}_URL".format(service.upper()), "") or None
+
+
+def service_url(service: str, url: str) -> str:
+    """ Moves the url to the overridden base URL of the service, if there is one """
+    base_url = get_base_url(service)
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit(
+        (
+            base.scheme,
+            base.netloc,
+            base.path.rstrip("/") + parts.path,
+            parts.query,
+            parts.fragment,
+        )
+    )
+
+
 def _get_missing_keys(key_variables):
     missing = []
     for key_name in key_variables:
@@ -0,0 +1,245 @@
+""" Creates a self-contained HTML slideshow from slide dictionaries, as a light alternative to the pptx output """
+import html
+from typing import List, Optional
+
+from talkgenerator.util import os_util
+
+# = HELPERS =
+
+
+def _escape(text) -> str:
+    return html.escape(str(text)) if text is not None else ""
+
+
+def _get_image_url(image) -> Optional[str]:
+    if isinstance(image, dict):
+        return image.get("image_url")
+    if isinstance(image, str) and os_util.is_image(image):
+        return image
+    return None
+
+
+def _add_title(title, tag="h1") -> str:
+    if title:
+        return "<{0}>{1}</{0}>".format(tag, _escape(title))
+    return ""
+
+
+def _add_text(text, css_class="text") -> str:
+    if text:
+        return '<p class="{}">{}</p>'.format(css_class, _escape(text))
+    return ""
+
+
+def _add_image(image) -> str:
+    image_url = _get_image_url(image)
+    if image_url:
+        return '<img src="{}" alt="">'.format(_escape(image_url))
+    return ""
+
+
+def _add_image_or_text(image_or_text) -> str:
+    if _get_image_url(image_or_text):
+        return _add_image(image_or_text)
+    return _add_text(image_or_text, "column-text")
+
+
+def _create_slide(layout: str, content: str) -> str:
+    return '<section class="slide {}">{}</section>'.format(layout, content)
+
+
+def _create_columns(title, captions_and_images) -> str:
+    columns = "".join(
+        '<div class="column">{}{}</div>'.format(
+            _add_text(caption, "caption"), _add_image_or_text(image_or_text)
+        )
+        for caption, image_or_text in captions_and_images
+    )
+    return _add_title(title) + '<div class="columns">{}</div>'.format(columns)
+
+
+# = CHARTS =
+
+
+def _create_category_chart(chart_data) -> str:
+    categories = chart_data["categories"] or []
+    values = chart_data["series"][0]["values"] if chart_data["series"] else []
+    max_value = max(values, default=0) or 1
+    # Fractions are shown as percentages, like the generated charts do, other values (e.g. counts) as they are
+    value_format = "{:.0%}" if all(0 <= value <= 1 for value in values) else "{:g}"
+    bars = "".join(
+        '<div class="bar-row"><span class="bar-label">{}</span>'
+        '<span class="bar" style="width: {:.1f}%"></span>'
+        '<span class="bar-value">{}</span></div>'.format(
+            _escape(category), 100 * value / max_value, value_format.format(value)
+        )
+        for category, value in zip(categories, values)
+    )
+    return '<div class="chart">{}</div>'.format(bars)
+
+
+def _create_xy_chart(chart_data, width=800, height=450) -> str:
+    points = [
+        (x, y)
+        for serie in chart_data["series"]
+        for x, y in zip(serie["x_values"], serie["y_values"])
+    ]
+    max_x = max((point[0] for point in points), default=0) or 1
+    max_y = max((point[1] for point in points), default=0) or 1
+    circles = "".join(
+        '<circle cx="{:.1f}" cy="{:.1f}" r="4"></circle>'.format(
+            width * x / max_x, height - height * y / max_y
+        )
+        for x, y in points
+    )
+    return '<svg class="chart" viewBox="0 0 {} {}">{}</svg>'.format(
+        width, height, circles
+    )
+
+
+# FORMAT GENERATORS
+# These mirror the powerpoint_slide_creator functions, but output HTML fragments
+
+
+def create_title_slide(title, subtitle, **_):
+    return _create_slide(
+        "title-slide", _add_title(title) + _add_text(subtitle, "subtitle")
+    )
+
+
+def create_large_quote_slide(title, text, background_image=None, **_):
+    background_url = _get_image_url(background_image)
+    style = (
+        ' style="background-image: url(\'{}\')"'.format(_escape(background_url))
+        if background_url
+        else ""
+    )
+    return '<section class="slide large-quote"{}>{}{}</section>'.format(
+        style, _add_title(title, "h2"), _add_text(text, "quote")
+    )
+
+
+def create_image_slide(title=None, image_url=None, **_):
+    return _create_slide("image-slide", _add_title(title) + _add_image(image_url))
+
+
+def create_full_image_slide(title=None, image_url=None, **_):
+    return _create_slide(
+        "full-image-slide", _add_title(title) + _add_image_or_text(image_url)
+    )
+
+
+def create_two_column_images_slide(
+    title=None,
+    caption_1=None,
+    image_or_text_1=None,
+    caption_2=None,
+    image_or_text_2=None,
+    **_
+):
+    return _create_slide(
+        "columns-slide",
+        _create_columns(
+            title, [(caption_1, image_or_text_1), (caption_2, image_or_text_2)]
+        ),
+    )
+
+
+def create_three_column_images_slide(
+    title=None,
+    caption_1=None,
+    image_or_text_1=None,
+    caption_2=None,
+    image_or_text_2=None,
+    caption_3=None,
+    image_or_text_3=None,
+    **_
+):
+    return _create_slide(
+        "columns-slide",
+        _create_columns(
+            title,
+            [
+                (caption_1, image_or_text_1),
+                (caption_2, image_or_text_2),
+                (caption_3, image_or_text_3),
+            ],
+        ),
+    )
+
+
+def create_chart_slide(title, chart_type, chart_data, **_):
+    if chart_data["categories"] is not None:
+        chart = _create_category_chart(chart_data)
+    else:
+        chart = _create_xy_chart(chart_data)
+    return _create_slide("chart-slide", _add_title(title) + chart)
+
+
+_SLIDE_CREATORS = {
+    "title": create_title_slide,
+    "large_quote": create_large_quote_slide,
+    "image": create_image_slide,
+    "full_image": create_full_image_slide,
+    "two_column_image": create_two_column_images_slide,
+    "three_column_image": create_three_column_images_slide,
+    "chart": create_chart_slide,
+}
+
+
+def create_slide(slide_dictionary: dict) -> str:
+    """ Creates the HTML fragment of a slide, given its slide dictionary """
+    arguments = dict(slide_dictionary)
+    slide_type = arguments.pop("type")
+    sources = arguments.pop("sources", [])
+    arguments.pop("note", None)
+    slide_html = _SLIDE_CREATORS[slide_type](**arguments)
+    if sources:
+        sources_html = '<footer class="sources">[Image sources: {}]</footer>'.format(
+            _escape(", ".join(sources))
+        )
+        slide_html = slide_html.replace("</section>", sources_html + "</section>", 1)
+    return slide_html
+
+
+# PRESENTATION
+
+_STYLE = """
+body { margin: 0; background: #000; font-family: Helvetica, Arial, sans-serif; }
+.slide { display: none; box-sizing: border-box; width: 100vw; height: 100vh; padding: 3vh 4vw;
+  background: #fff center / cover no-repeat; text-align: center; position: relative; }
+.slide.active { display: flex; flex-direction: column; justify-content: center; }
+.slide img { max-width: 100%; max-height: 70vh; object-fit: contain; margin: auto; }
+.title-slide h1 { font-size: 5vh; } .subtitle { font-size: 3vh; }
+.large-quote { color: #fff; text-shadow: 0 0 8px #000; } .quote { font-size: 5vh; }
+.columns { display: flex; gap: 2vw; flex: 1; } .column { flex: 1; display: flex; flex-direction: column; }
+.caption { font-weight: bold; } .column img { max-height: 55vh; }
+.chart { width: 80%; margin: auto; } .bar-row { display: flex; align-items: center; margin: 1vh 0; }
+.bar-label { width: 30%; text-align: right; padding-right: 1vw; } .bar { height: 4vh; background: #2a6ebb; }
+.bar-value { padding-left: 1vw; } svg.chart circle { fill: #2a6ebb; }
+.sources { position: absolute; bottom: 1vh; right: 2vw; font-size: 1.5vh; color: #888; }
+"""
+
+_SCRIPT = """
+var slides = document.querySelectorAll(".slide"), current = 0;
+function show(index) {
+  slides[current].classList.remove("active");
+  current = Math.max(0, Math.min(slides.length - 1, index));
+  slides[current].classList.add("active");
+}
+document.addEventListener("keydown", function (e) {
+  if (["ArrowRight", "PageDown", " "].indexOf(e.key) >= 0) show(current + 1);
+  if (["ArrowLeft", "PageUp"].indexOf(e.key) >= 0) show(current - 1);
+});
+document.addEventListener("click", function () { show(current + 1); });
+if (slides.length) slides[0].classList.add("active");
+"""
+
+
+def create_html_presentation(slide_fragments: List[str], title: str = None) -> str:
+    """ Wraps the HTML slide fragments into a single, self-contained HTML slideshow """
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        "<title>{}</title>\n<style>{}</style>\n</head>\n<body>\n{}\n"
+        "<script>{}</script>\n</body>\n</html>\n"
+    ).format(_escape(title), _STYLE, "\n".join(slide_fragments), _SCRIPT)
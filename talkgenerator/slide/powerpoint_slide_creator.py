@@ -1,7 +1,6 @@
 import os
 import sys
 import logging
-from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
 from typing import List
@@ -14,6 +13,8 @@ from lxml.etree import XMLSyntaxError
 from pptx import Presentation
 
 from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
 from talkgenerator.util import os_util
 
 # Location of powerpoint template
@@ -22,7 +23,7 @@ _POWERPOINT_TEMPLATE_FILE = "data/powerpoint/template.pptx"
 logger = logging.getLogger("talkgenerator")
 
 
-@lru_cache(maxsize=1)
+@cache_util.registered_cache(maxsize=1)
 def get_powerpoint_template_file():
     return os_util.to_actual_file(_POWERPOINT_TEMPLATE_FILE)
 
@@ -60,9 +61,11 @@ class ExternalImage(FileLikeImage):
     def __init__(self, url):
         self._url = url
 
-    @lru_cache()
+    @metrics_util.measured_source
+    @cache_util.registered_cache()
     def get_bytes_io(self):
         response = requests.get(self._url)
+        metrics_util.count_source_bytes(len(response.content))
         tmp_img = BytesIO(response.content)
         return tmp_img
 
@@ -87,7 +90,7 @@ class InternalImage(FileLikeImage):
         return self._file_location
 
     def image(self):
-        return Image.open(self._file_location())
+        return Image.open(self._file_location)
 
 # CREATION
 def _create_slide(prs, slide_type):
@@ -95,6 +98,27 @@ def _create_slide(prs, slide_type):
     return prs.slides.add_slide(prs.slide_layouts[slide_type])
 
 
+def move_last_slide(prs, slide_index: int):
+    """ Moves the last slide of the presentation to the given index """
+    slide_ids = prs.slides._sldIdLst
+    new_slide_id = slide_ids[-1]
+    old_slide_id = slide_ids[slide_index]
+    if new_slide_id is not old_slide_id:
+        old_slide_id.addprevious(new_slide_id)
+
+
+def replace_slide_with_last(prs, slide_index: int):
+    """ Moves the last slide of the presentation to the given index, removing the slide that was there """
+    slide_ids = prs.slides._sldIdLst
+    new_slide_id = slide_ids[-1]
+    old_slide_id = slide_ids[slide_index]
+    if new_slide_id is old_slide_id:
+        return
+    old_slide_id.addprevious(new_slide_id)
+    slide_ids.remove(old_slide_id)
+    prs.part.drop_rel(old_slide_id.rId)
+
+
 def _add_title(slide, title):
     """ Adds the given title to the slide if the title is present"""
     if title:
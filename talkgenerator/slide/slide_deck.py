@@ -1,44 +1,238 @@
+import json
 import logging
-from typing import List
+from typing import List, Set, Dict, Optional, Callable
 
+from talkgenerator.slide import slides
 from talkgenerator.slide.slides import Slide
+from talkgenerator.slide import html_slide_creator
+from talkgenerator.slide import powerpoint_slide_creator
+from talkgenerator.util import metrics_util
 
 logger = logging.getLogger("talkgenerator")
 
+# Version of the serialized slide deck format, to be increased on incompatible changes
+SERIALIZATION_VERSION = 1
+
 
 class SlideDeck:
     """ Represents a deck of Slide objects    """
 
-    def __init__(self, size):
+    def __init__(
+        self,
+        size,
+        presentation_context: Optional[dict] = None,
+        schema_name: Optional[str] = None,
+    ):
         self._size = size
+        self._schema_name = schema_name
         self._slides : List[Slide] = [None] * size
+        self._presentation_context = presentation_context
+        # Generation state per slide, needed to regenerate single slides later
+        self._seeds: List[Optional[str]] = [None] * size
+        self._generated_elements: List[Optional[list]] = [None] * size
+        self._slide_generators = [None] * size
+        # External calls made to generate this deck
+        self._source_usage: Optional[metrics_util.SourceUsage] = None
 
-    def add_slide(self, slide_index: int, slide):
+    def add_slide(
+        self,
+        slide_index: int,
+        slide,
+        generated_elements=None,
+        slide_generator_data=None,
+        seed: str = None,
+    ):
         self._slides[slide_index] = slide
+        self._generated_elements[slide_index] = generated_elements
+        self._slide_generators[slide_index] = slide_generator_data
+        self._seeds[slide_index] = seed
 
     def is_complete(self):
         return len(self._slides) >= self._size and (None not in self._slides)
 
-    def save_to_powerpoint(self, prs_template):
-        """ Should generate a slide in the powerpoint """
+    def get_size(self) -> int:
+        return self._size
+
+    def get_slide(self, slide_index: int) -> Optional[Slide]:
+        return self._slides[slide_index]
+
+    def get_schema_name(self) -> Optional[str]:
+        return self._schema_name
+
+    def set_schema_name(self, schema_name: str):
+        self._schema_name = schema_name
+
+    def get_source_usage(self) -> Optional[metrics_util.SourceUsage]:
+        return self._source_usage
+
+    def set_source_usage(self, source_usage: metrics_util.SourceUsage):
+        self._source_usage = source_usage
+
+    def get_presentation_context(self) -> Optional[dict]:
+        return self._presentation_context
+
+    def get_seed(self, slide_index: int) -> Optional[str]:
+        return self._seeds[slide_index]
+
+    def set_seed(self, slide_index: int, seed: str):
+        """ Remembers the seed of a slide, also if it is never generated, such that it can be generated later """
+        self._seeds[slide_index] = seed
+
+    def get_slide_generator(self, slide_index: int):
+        return self._slide_generators[slide_index]
+
+    def get_generated_elements(self, slide_index: int) -> Optional[list]:
+        return self._generated_elements[slide_index]
+
+    def get_used_elements(self) -> Set:
+        """ All elements generated by the slides of this deck """
+        used_elements = set()
+        for generated_elements in self._generated_elements:
+            if generated_elements:
+                used_elements.update(generated_elements)
+        return used_elements
+
+    def get_used_tags(self, excluded_slide_index: int = None) -> Dict[str, int]:
+        """ Counts the tags of the slide generators used in this deck, optionally ignoring one slide """
+        used_tags = {}
+        for i, slide_generator_data in enumerate(self._slide_generators):
+            if i == excluded_slide_index or slide_generator_data is None:
+                continue
+            for tag in slide_generator_data.get_tags():
+                used_tags[tag] = used_tags.get(tag, 0) + 1
+        return used_tags
+
+    def _get_generated_slides(self) -> List[Slide]:
+        """ The slides that were generated, in order. The slides themselves keep their index in the deck """
         if not self.is_complete():
             logger.error(
                 "ERROR: SOME SLIDES WERE NOT GENERATED: {}".format(self._slides)
             )
-            self._slides = [slide for slide in self._slides if slide is not None]
-        return [slide.create_powerpoint_slide(prs_template) for slide in self._slides]
+        return [slide for slide in self._slides if slide is not None]
 
-    def to_slide_deck_dictionary(self) -> List[dict]:
-        return [slide.to_slide_dictionary() for slide in self._slides]
+    def save_to_powerpoint(self, prs_template):
+        """ Should generate a slide in the powerpoint """
+        return [
+            slide.create_powerpoint_slide(prs_template)
+            for slide in self._get_generated_slides()
+        ]
+
+    def save_slide_to_powerpoint(self, prs, slide_index: int):
+        """ Renders only the given slide again, replacing the slide at the same position in the powerpoint.
+        Missing slides are not in the powerpoint, so a slide that was missing when rendering is inserted instead """
+        position = sum(slide is not None for slide in self._slides[:slide_index])
+        was_rendered = len(prs.slides) == sum(
+            slide is not None for slide in self._slides
+        )
+        ppt_slide = self._slides[slide_index].create_powerpoint_slide(prs)
+        if ppt_slide:
+            if was_rendered:
+                powerpoint_slide_creator.replace_slide_with_last(prs, position)
+            else:
+                powerpoint_slide_creator.move_last_slide(prs, position)
+        return ppt_slide
+
+    def to_slide_deck_dictionary(self) -> List[Optional[dict]]:
+        """ The dictionary of every slide, or None for slides that were not generated """
+        return [
+            slide.to_slide_dictionary() if slide is not None else None
+            for slide in self._slides
+        ]
+
+    def get_title(self) -> Optional[str]:
+        if self._presentation_context:
+            return self._presentation_context.get("title")
+        return None
+
+    def to_json(self) -> str:
+        """ Serializes the slide deck to a compact, versioned JSON format. It describes the slides for
+        e.g. a web front end, and keeps the generation state so the deck can be rendered or regenerated later """
+        generation = [
+            {
+                "seed": self._seeds[i],
+                "generator": str(self._slide_generators[i])
+                if self._slide_generators[i] is not None
+                else None,
+                # Only text can be recognised again as a used element
+                "generated_elements": [
+                    element
+                    for element in self._generated_elements[i]
+                    if isinstance(element, str)
+                ]
+                if self._generated_elements[i] is not None
+                else None,
+            }
+            for i in range(self._size)
+        ]
+        return json.dumps(
+            {
+                "version": SERIALIZATION_VERSION,
+                "schema": self._schema_name,
+                "title": self.get_title(),
+                "presentation_context": self._presentation_context,
+                "slides": [
+                    slide.to_slide_dictionary() if slide is not None else None
+                    for slide in self._slides
+                ],
+                "generation": generation,
+                "external_calls": self._source_usage.to_dictionary()
+                if self._source_usage is not None
+                else None,
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(
+        cls, serialized: str, get_slide_generator: Callable[[str], object] = None
+    ) -> "SlideDeck":
+        """ Recreates a slide deck from its JSON serialization. The optional get_slide_generator maps slide generator
+        names back to the slide generators, which is needed for regenerating slides """
+        deck_dict = json.loads(serialized)
+        version = deck_dict.get("version")
+        if version != SERIALIZATION_VERSION:
+            raise ValueError(
+                "Unsupported slide deck version {}, expected {}".format(
+                    version, SERIALIZATION_VERSION
+                )
+            )
+
+        slide_dicts = deck_dict["slides"]
+        slide_deck = cls(
+            len(slide_dicts), deck_dict["presentation_context"], deck_dict["schema"]
+        )
+        for i, (slide_dict, generation) in enumerate(
+            zip(slide_dicts, deck_dict["generation"])
+        ):
+            if slide_dict is None:
+                slide_deck.set_seed(i, generation["seed"])
+                continue
+            slide_generator = None
+            if get_slide_generator is not None and generation["generator"]:
+                slide_generator = get_slide_generator(generation["generator"])
+            slide_deck.add_slide(
+                i,
+                slides.slide_from_dictionary(slide_dict),
+                generation["generated_elements"],
+                slide_generator,
+                generation["seed"],
+            )
+        if deck_dict.get("external_calls") is not None:
+            slide_deck.set_source_usage(
+                metrics_util.SourceUsage.from_dictionary(deck_dict["external_calls"])
+            )
+        return slide_deck
+
+    def to_html(self) -> str:
+        """ Renders the slide deck to a self-contained HTML slideshow """
+        return html_slide_creator.create_html_presentation(
+            [slide.create_html_slide() for slide in self.get_structured_data()],
+            self.get_title(),
+        )
 
     def get_structured_data(self):
         """ Return slide deck as structured data for alternative presentation """
-        if not self.is_complete():
-            logger.error(
-                "ERROR: SOME SLIDES WERE NOT GENERATED: {}".format(self._slides)
-            )
-            self._slides = [slide for slide in self._slides if slide is not None]
-        return [slide for slide in self._slides]
+        return self._get_generated_slides()
 
     def has_slide_nr(self, index):
         return 0 <= index < self._size and self._slides[index] is not None
@@ -4,8 +4,11 @@ from abc import abstractmethod
 
 from talkgenerator.slide import slides
 from talkgenerator.util import generator_util
+from talkgenerator.util import log_util
+from talkgenerator.util import trace_util
 
 logger = logging.getLogger("talkgenerator")
+_debug = log_util.DebugLogger(__name__)
 
 
 class SlideGenerator(metaclass=ABCMeta):
@@ -28,11 +31,13 @@ class SlideGenerator(metaclass=ABCMeta):
 
     def generate_slide(self, presentation_context, used) -> (slides.Slide, list):
         """ Generates the slide using the given generators."""
-        logger.debug('slide_generator_types.generate_slide')
-        logger.debug('presentation_context: {}'.format(presentation_context))
-        logger.debug('self._slide_content_generator: {}'.format(self._slide_content_generator))
         generated = self._slide_content_generator(presentation_context)
-        logger.debug('generated: {}'.format(generated))
+        _debug(
+            "generate_slide",
+            generator=self._slide_content_generator,
+            presentation_context=presentation_context,
+            generated=generated,
+        )
         if is_different_enough(generated, used):
             return self.slide_type(*generated), generated
 
@@ -228,7 +233,6 @@ class TwoImagesAndTupledCaptions(SlideGenerator):
         original_image_size=True,
     ):
         super().__init__(self)
-        logger.debug('initializing TwoImagesAndTupledCaptions')
         self._title_generator = title_generator
         self._captions_generator = captions_generator
         self._image_1_generator = image_1_generator
@@ -236,26 +240,17 @@ class TwoImagesAndTupledCaptions(SlideGenerator):
         self._original_image_size = original_image_size
 
     def __call__(self, presentation_context):
-        logger.debug('Calling TwoImagesAndTupledCaptions')
-        logger.debug('**********************************')
-        logger.debug('presentation_context: {}'.format(presentation_context))
-        logger.debug('captions_generator: {}'.format(self._captions_generator))
-        logger.debug('original_image_size: {}'.format(self._original_image_size))
-
         generated_tuple = self._captions_generator(presentation_context)
-        logger.debug('generated_tuple: {}'.format(generated_tuple))
-
-        logger.debug('title_generator: {}'.format(self._title_generator))
         _title = self._title_generator(presentation_context)
-        logger.debug('_title: {}'.format(_title))
-
-        logger.debug('image_1_generator: {}'.format(self._image_1_generator))
         _image1 = self._image_1_generator(presentation_context)
-        logger.debug('_image1: {}'.format(_image1))
-
-        logger.debug('image_2_generator: {}'.format(self._image_2_generator))
         _image2 = self._image_2_generator(presentation_context)
-        logger.debug('_image2: {}'.format(_image2))
+        _debug(
+            "two_images_and_tupled_captions",
+            captions=generated_tuple,
+            title=_title,
+            image_1=_image1,
+            image_2=_image2,
+        )
 
         return (
             _title,
@@ -451,6 +446,7 @@ class CombinedSlideGenerator(object):
         # print("CombinedGenerator:", self, generators)
         self._generators = generators
 
+    @trace_util.traced_method("slide_content")
     def __call__(self, presentation_context):
         # print("CombinedGenerator:", self)
         return [
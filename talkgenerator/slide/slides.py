@@ -1,8 +1,15 @@
 import logging
 from abc import ABCMeta
-from typing import Dict
+from typing import Callable, Dict, Optional
 
+from pptx.chart.data import ChartData
+from pptx.chart.data import XyChartData
+from pptx.enum.chart import XL_CHART_TYPE
+
+from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.slide import html_slide_creator
 from talkgenerator.slide import powerpoint_slide_creator
+from talkgenerator.util import cache_util
 
 logger = logging.getLogger("talkgenerator")
 
@@ -39,13 +46,52 @@ class Slide(metaclass=ABCMeta):
             logger.error("attribute error on create slide {}".format(e))
         return ppt_slide
 
+    def create_html_slide(self) -> str:
+        """ Generates the slide as an HTML fragment, without needing python-pptx """
+        return html_slide_creator.create_slide(self.to_slide_dictionary())
+
+    @classmethod
+    def from_arguments(cls, **arguments):
+        return cls(**arguments)
+
     def to_slide_dictionary(self) -> dict:
-        slide_dict = dict(self._arguments)
+        """ Converts the slide to a dictionary only containing JSON serializable values """
+        slide_dict = {
+            key: _to_serializable(value) for key, value in self._arguments.items()
+        }
         slide_dict["type"] = self._type_name
         slide_dict["sources"] = self._sources
+        slide_dict["note"] = self._note
         return slide_dict
 
 
+def _to_serializable(value):
+    if isinstance(value, ImageData):
+        return value.to_dictionary()
+    return value
+
+
+def _from_serializable(value):
+    if isinstance(value, dict) and "image_url" in value:
+        return ImageData(image_url=value["image_url"], source=value.get("source"))
+    return value
+
+
+def slide_from_dictionary(slide_dict: dict) -> Slide:
+    """ Recreates a slide from its slide dictionary, as created by to_slide_dictionary """
+    arguments = dict(slide_dict)
+    slide_type = _SLIDE_TYPES[arguments.pop("type")]
+    sources = arguments.pop("sources", [])
+    note = arguments.pop("note", "")
+    slide = slide_type.from_arguments(
+        **{key: _from_serializable(value) for key, value in arguments.items()}
+    )
+    for source in sources:
+        slide.add_source(source)
+    slide.set_note(note)
+    return slide
+
+
 class TitleSlide(Slide):
     def __init__(self, title:str, subtitle:str):
         super().__init__(
@@ -158,3 +204,126 @@ class ChartSlide(Slide):
                 "chart_modifier": chart_modifier,
             },
         )
+
+    def to_slide_dictionary(self) -> dict:
+        slide_dict = super().to_slide_dictionary()
+        slide_dict["chart_type"] = chart_type_to_name(self._arguments["chart_type"])
+        slide_dict["chart_data"] = chart_data_to_dictionary(
+            self._arguments["chart_data"]
+        )
+        slide_dict["chart_modifier"] = chart_modifier_to_dictionary(
+            self._arguments["chart_modifier"]
+        )
+        return slide_dict
+
+    @classmethod
+    def from_arguments(cls, title, chart_type, chart_data, chart_modifier=None):
+        return cls(
+            title,
+            chart_type_from_name(chart_type),
+            chart_data_from_dictionary(chart_data),
+            chart_modifier_from_dictionary(chart_modifier),
+        )
+
+
+def chart_type_to_name(chart_type) -> str:
+    """ Converts a pptx XL_CHART_TYPE to its name, e.g. 'PIE' """
+    return str(chart_type).split(" ")[0]
+
+
+def chart_type_from_name(name: str):
+    return getattr(XL_CHART_TYPE, name)
+
+
+def chart_data_to_dictionary(chart_data) -> dict:
+    """ Converts pptx (xy) chart data to plain categories and series """
+    categories = getattr(chart_data, "categories", None)
+    series = []
+    for serie in chart_data:
+        if hasattr(serie, "x_values"):
+            series.append(
+                {
+                    "name": serie.name,
+                    "x_values": list(serie.x_values),
+                    "y_values": list(serie.y_values),
+                }
+            )
+        else:
+            series.append({"name": serie.name, "values": list(serie.values)})
+    return {
+        "categories": [category.label for category in categories]
+        if categories is not None
+        else None,
+        "series": series,
+    }
+
+
+def chart_data_from_dictionary(chart_data_dict: dict):
+    """ Recreates pptx (xy) chart data from plain categories and series """
+    if chart_data_dict["categories"] is not None:
+        chart_data = ChartData()
+        chart_data.categories = chart_data_dict["categories"]
+        for serie in chart_data_dict["series"]:
+            chart_data.add_series(serie["name"], serie["values"])
+        return chart_data
+
+    chart_data = XyChartData()
+    for serie in chart_data_dict["series"]:
+        xy_serie = chart_data.add_series(serie["name"])
+        for x, y in zip(serie["x_values"], serie["y_values"]):
+            xy_serie.add_data_point(x, y)
+    return chart_data
+
+
+@cache_util.registered_cache(maxsize=1)
+def _get_chart_modifiers() -> Dict[str, Callable]:
+    """ The chart modifiers that can be serialized, by name. Loading a deck only resolves these names,
+    such that a deck file can not refer to any other code """
+    # Imported here, as the chart module loads its text generators
+    from talkgenerator.sources import chart
+
+    return {
+        "pie": chart.set_pie_properties,
+        "histogram": chart.set_histogram_properties,
+        "doughnut": chart.set_doughnut_properties,
+        "scatter": chart.ScatterPropertiesSetter,
+    }
+
+
+def chart_modifier_to_dictionary(chart_modifier) -> Optional[dict]:
+    """ Refers to a registered chart modifier by its name, with the arguments of modifier objects """
+    if chart_modifier is None:
+        return None
+    modifier_type = (
+        type(chart_modifier) if hasattr(chart_modifier, "get_arguments") else None
+    )
+    for name, modifier in _get_chart_modifiers().items():
+        if modifier is chart_modifier:
+            return {"name": name}
+        if modifier is modifier_type:
+            return {"name": name, "arguments": chart_modifier.get_arguments()}
+    raise ValueError("Can not serialize unknown chart modifier {}".format(chart_modifier))
+
+
+def chart_modifier_from_dictionary(chart_modifier_dict: Optional[dict]):
+    if chart_modifier_dict is None:
+        return None
+    modifier = _get_chart_modifiers().get(chart_modifier_dict.get("name"))
+    if modifier is None:
+        raise ValueError(
+            "Unknown chart modifier {}".format(chart_modifier_dict.get("name"))
+        )
+    if "arguments" in chart_modifier_dict:
+        return modifier(*chart_modifier_dict["arguments"])
+    return modifier
+
+
+_SLIDE_TYPES = {
+    "title": TitleSlide,
+    "large_quote": LarqeQuoteSlide,
+    "image": ImageSlide,
+    "full_image": FullImageSlide,
+    "two_column_image": TwoColumnImageSlide,
+    "three_column_image": ThreeColumnImageSlide,
+    "chart": ChartSlide,
+}
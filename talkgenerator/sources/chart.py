@@ -181,8 +181,17 @@ def set_doughnut_properties(chart, chart_data):
         _set_pie_label_positions(chart, series, chart_data, None)
 
 
-def create_set_scatter_properties(x_label, y_label):
-    def set_scatter_properties(chart, chart_data):
+class ScatterPropertiesSetter(object):
+    """ Chart modifier for scatter charts. It is a class rather than a closure so that it can be serialized """
+
+    def __init__(self, x_label, y_label):
+        self._x_label = x_label
+        self._y_label = y_label
+
+    def get_arguments(self):
+        return [self._x_label, self._y_label]
+
+    def __call__(self, chart, chart_data):
         chart.has_legend = False
         x_axis = chart.category_axis
         y_axis = chart.value_axis
@@ -191,7 +200,9 @@ def create_set_scatter_properties(x_label, y_label):
         # x_axis.has_title = True
         # y_axis.has_title = True
 
-    return set_scatter_properties
+
+def create_set_scatter_properties(x_label, y_label):
+    return ScatterPropertiesSetter(x_label, y_label)
 
 
 # CHART TYPES
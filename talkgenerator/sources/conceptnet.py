@@ -1,13 +1,13 @@
 import time
 import logging
-from functools import lru_cache
 from pathlib import Path
 from urllib.parse import urlencode
 
 import requests
 # from cachier import cachier
 
-from talkgenerator.util import generator_util, cache_util
+from talkgenerator import settings
+from talkgenerator.util import generator_util, cache_util, metrics_util
 
 URL = "http://api.conceptnet.io/c/en/{}?"
 
@@ -82,19 +82,25 @@ def remove_nones(entries):
 # RETRIEVING DATA
 
 
-@lru_cache(maxsize=20)
+@metrics_util.measured_source
+@cache_util.registered_cache(maxsize=20)
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def _get_data(word, arguments=None):
     if not arguments:
         arguments = _DEFAULT_ARGUMENTS
     splitted_word = _remove_prohibited_words(word)
     search_term = "_".join(splitted_word)
-    url = URL.format(search_term) + urlencode(arguments, False, "/")
+    url = settings.service_url(
+        "conceptnet", URL.format(search_term) + urlencode(arguments, False, "/")
+    )
     start = time.perf_counter()
     try:
-        result = requests.get(url).json()
+        response = requests.get(url)
+        metrics_util.count_source_bytes(len(response.content))
+        result = response.json()
     except Exception as e:
         logger.warning("conceptnet _get_data timeout: {}".format(e))
+        metrics_util.count_source_error()
         result = None
     end = time.perf_counter()
     logger.info(
@@ -1,10 +1,12 @@
-from functools import lru_cache
 from pathlib import Path
 
 import requests
 from bs4 import BeautifulSoup
 # from cachier import cachier
 
+from talkgenerator import settings
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
 from talkgenerator.util import scraper_util
 
 quote_search_url = (
@@ -13,14 +15,19 @@ quote_search_url = (
 )
 
 
-@lru_cache(maxsize=20)
+@metrics_util.measured_source
+@cache_util.registered_cache(maxsize=20)
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def _search_quotes_page(search_term, page):
-    url = quote_search_url.format(page, search_term.replace(" ", "+"))
+    url = settings.service_url(
+        "goodreads", quote_search_url.format(page, search_term.replace(" ", "+"))
+    )
     try:
         page = requests.get(url, timeout=5)
     except (requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout) as e:
+        metrics_util.count_source_error()
         return None
+    metrics_util.count_source_bytes(len(page.content))
     if page:
         soup = BeautifulSoup(page.content, "html.parser")
         # Replace breaks with new lines
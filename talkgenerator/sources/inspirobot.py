@@ -1,16 +1,19 @@
 import random
 
+from talkgenerator import settings
+from talkgenerator.util import metrics_util
 from talkgenerator.util import os_util
 from talkgenerator.datastructures.image_data import ImageData
 
+_IMAGE_URL = "http://generated.inspirobot.me/0{}/aXm{}xjU.jpg"
 
+
+@metrics_util.measured_source
 def get_random_inspirobot_image(_=None):
     # Generate a random url to access inspirobot
     dd = str(random.randint(1, 73)).zfill(2)
     nnnn = random.randint(0, 9998)
-    inspirobot_url = ("http://generated.inspirobot.me/" "0{}/aXm{}xjU.jpg").format(
-        dd, nnnn
-    )
+    inspirobot_url = settings.service_url("inspirobot", _IMAGE_URL.format(dd, nnnn))
 
     # Download the image
     # image_url = os_util.to_actual_file(
@@ -2,31 +2,50 @@ import logging
 from pathlib import Path
 from typing import List
 
+import requests
 # from cachier import cachier
 from pexels_api import API
 from talkgenerator import settings
 from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
 
 logging.getLogger("pexels").setLevel(logging.DEBUG)
 logger = logging.getLogger("talkgenerator")
 
+_SEARCH_URL = "https://api.pexels.com/v1/search?query={}&per_page={}&page={}"
 
+
+@cache_util.registered_cache(maxsize=1)
 def get_pexels_session():
+    """ Creates the Pexels client on first use """
     creds = settings.pexels_auth()
     api = API(creds["pexels_key"])
     return api
 
 
-pexels_session = get_pexels_session()
-
-
+@metrics_util.measured_source
 # @cachier(cache_dir=Path("..", "tmp").absolute())
-def _search_pexels(query):
-    return pexels_session.search(query)
+def _search_pexels(query, results_per_page=15, page=1):
+    # Same request as the search of the Pexels client, which can't be pointed to another host and exits on connection errors
+    url = settings.service_url(
+        "pexels", _SEARCH_URL.format(query.replace(" ", "+"), results_per_page, page)
+    )
+    try:
+        response = requests.get(
+            url, timeout=15, headers=get_pexels_session().PEXELS_AUTHORIZATION
+        )
+    except requests.exceptions.RequestException as e:
+        logger.warning("Pexels request failed: {}".format(e))
+        metrics_util.count_source_error()
+        return None
+    metrics_util.count_source_bytes(len(response.content))
+    if response.ok:
+        return response.json()
 
 
 def search_photos(query) -> List[ImageData]:
-    if pexels_session and query:
+    if get_pexels_session() and query:
         results = _search_pexels(query)
         if results and results["photos"]:
             images = []
@@ -4,21 +4,26 @@ from pathlib import Path
 import requests
 # from cachier import cachier
 
+from talkgenerator import settings
 from talkgenerator.util import language_util
+from talkgenerator.util import metrics_util
 
 URL = "https://api.phrasefinder.io/search?corpus=eng-us&query={}&nmax=1"
 
 
+@metrics_util.measured_source
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def _search(word):
     word.replace(" ", "%20")
-    url = URL.format(word)
+    url = settings.service_url("phrasefinder", URL.format(word))
     try:
         result = requests.get(url)
+        metrics_util.count_source_bytes(len(result.content))
         result = result.json()
         if result:
             return result["phrases"]
     except JSONDecodeError:
+        metrics_util.count_source_error()
         return None
 
 
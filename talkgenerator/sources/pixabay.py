@@ -2,13 +2,17 @@ import logging
 from pathlib import Path
 from typing import List
 
+import requests
 from pixabay import Image
 from talkgenerator import settings
 from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.util import metrics_util
 
 logging.getLogger("pixabay").setLevel(logging.DEBUG)
 logger = logging.getLogger("talkgenerator")
 
+_SEARCH_URL = "https://pixabay.com/api/"
+
 
 def get_pixabay_session():
     creds = settings.pixabay_auth()
@@ -20,12 +24,30 @@ def search_horizontal(query):
     return search_photos(query, orientation="horizontal")
 
 
+def _search(pixabay_session, query, orientation):
+    if not settings.get_base_url("pixabay"):
+        return pixabay_session.search(q=query, orientation=orientation)
+    # The pixabay package can't be pointed to another host, e.g. a stub server
+    response = requests.get(
+        settings.service_url("pixabay", _SEARCH_URL),
+        params={
+            "key": settings.pixabay_auth()["pixabay_key"],
+            "q": query,
+            "orientation": orientation,
+        },
+    )
+    metrics_util.count_source_bytes(len(response.content))
+    if response.ok:
+        return response.json()
+
+
+@metrics_util.measured_source
 def search_photos(query, orientation="all") -> List[ImageData]:
     pixabay_session = get_pixabay_session()
     logger.debug('pixabay_session: {}'.format(pixabay_session))
     logger.debug('pixabay.search_photos called with query: {}'.format(query))
     if pixabay_session and query:
-        results = pixabay_session.search(q=query, orientation=orientation)
+        results = _search(pixabay_session, query, orientation)
         if results and results["hits"]:
             images = []
             for photo in results["hits"]:
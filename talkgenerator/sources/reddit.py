@@ -1,6 +1,5 @@
 import datetime
 import logging
-from functools import lru_cache
 from pathlib import Path
 
 import praw
@@ -9,16 +8,26 @@ from prawcore import ResponseException
 from prawcore import RequestException
 
 from talkgenerator import settings
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
 
 singleton_reddit = None
 
 logger = logging.getLogger("talkgenerator")
 
 
+def _get_url_settings():
+    """ Points praw to the overridden base URL of Reddit, if there is one """
+    base_url = settings.get_base_url("reddit")
+    if base_url:
+        return {"oauth_url": base_url, "reddit_url": base_url}
+    return {}
+
+
 def get_reddit():
     reddit = singleton_reddit
     if not bool(reddit):
-        reddit = praw.Reddit(**settings.reddit_auth())
+        reddit = praw.Reddit(**settings.reddit_auth(), **_get_url_settings())
     return reddit
 
 
@@ -33,7 +42,8 @@ def get_subreddit(name):
             return subreddit
 
 
-@lru_cache(maxsize=20)
+@metrics_util.measured_source
+@cache_util.registered_cache(maxsize=20)
 # @cachier(cache_dir=Path("..", "tmp").absolute(), stale_after=datetime.timedelta(weeks=2))
 def search_subreddit(name, query, sort="relevance", limit=500, filter_nsfw=True):
     if has_reddit_access():
@@ -50,7 +60,9 @@ def search_subreddit(name, query, sort="relevance", limit=500, filter_nsfw=True)
 
         except ResponseException as err:
             logger.error("Exception with accessing Reddit: {}".format(err))
+            metrics_util.count_source_error()
         except RequestException as err:
             logger.error("Exception with accessing Reddit: {}".format(err))
+            metrics_util.count_source_error()
     else:
         logger.warning("WARNING: No reddit access!")
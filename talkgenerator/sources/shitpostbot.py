@@ -1,11 +1,13 @@
 import random
-from functools import lru_cache
 from pathlib import Path
 
 import requests
 from bs4 import BeautifulSoup
 # from cachier import cachier
 
+from talkgenerator import settings
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
 from talkgenerator.util import scraper_util
 
 _MAX_RANDOM_PAGE = 150
@@ -19,11 +21,14 @@ def _search_shitpostbot_page(search_term, page):
     return [element[1] for element in _search_shitpostbot_page_rated(search_term, page)]
 
 
-@lru_cache(maxsize=20)
+@metrics_util.measured_source
+@cache_util.registered_cache(maxsize=20)
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def _search_shitpostbot_page_rated(search_term, page):
     url = _SEARCH_URL.format(search_term, page, search_term.replace(" ", "+"))
+    url = settings.service_url("shitpostbot", url)
     page = requests.get(url)
+    metrics_util.count_source_bytes(len(page.content))
     if page:
         soup = BeautifulSoup(page.content, "html.parser")
 
@@ -58,7 +63,7 @@ def _get_source_image(image_url):
     image_url = image_url.replace("%2F", "/")
     last_slash_idx = image_url.rfind("/")
     image_file_name = image_url[last_slash_idx + 1 :]
-    return source_image_prefix + image_file_name
+    return settings.service_url("shitpostbot", source_image_prefix + image_file_name)
 
 
 def get_random_images(_):
@@ -1,8 +1,12 @@
 """ This module helps out with generating text using templates """
 import json
+import os
 import random
 import re
-from functools import lru_cache
+import string
+import threading
+from contextlib import contextmanager
+from typing import Optional
 
 import tracery
 from tracery.modifiers import base_english
@@ -10,9 +14,11 @@ from tracery.modifiers import base_english
 from talkgenerator.sources import conceptnet
 from talkgenerator.sources import phrasefinder
 from talkgenerator.sources import wikihow
+from talkgenerator.util import cache_util
 from talkgenerator.util import language_util
 from talkgenerator.util import os_util
 from talkgenerator.util import random_util
+from talkgenerator.util import trace_util
 
 known_functions = {
     "title": str.title,
@@ -33,14 +39,18 @@ known_functions = {
     # "synonym": generator_util.FromListGenerator(language_util.get_synonyms),
     "2_to_1_pronouns": language_util.second_to_first_pronouns,
     "wikihow_action": lambda seed: random_util.choice_optional(
-        wikihow.get_related_wikihow_actions(seed)
+        get_source_options(wikihow.get_related_wikihow_actions, seed)
     ),
     "get_last_noun_and_article": language_util.get_last_noun_and_article,
     # Conceptnet
-    "conceptnet_location": conceptnet.weighted_location_generator,
-    "conceptnet_related": conceptnet.weighted_related_word_generator,
+    "conceptnet_location": lambda word: _weighted_choice(
+        get_source_options(conceptnet.get_weighted_related_locations, word)
+    ),
+    "conceptnet_related": lambda word: _weighted_choice(
+        get_source_options(conceptnet.get_weighted_related_words, word)
+    ),
     "conceptnet_related_single_word": lambda word: phrasefinder.get_rarest_word(
-        conceptnet.weighted_related_word_generator(word)
+        _weighted_choice(get_source_options(conceptnet.get_weighted_related_words, word))
     ),
     # Checkers
     "is_noun": lambda word: word if language_util.is_noun(word) else None,
@@ -58,59 +68,217 @@ class AbstractTextGenerator(object):
         return self.generate({"seed": seed})
 
 
+class TemplateIndex(object):
+    """ Compiled templates, indexed by the variables they need """
+
+    def __init__(self, templates):
+        # Create a tuple so no templates can accidentally be deleted from the index
+        self.templates = tuple(templates)
+        self._templates_by_variables = {}
+        for template in self.templates:
+            compiled = compile_template(template)
+            self._templates_by_variables.setdefault(compiled.variables, []).append(
+                compiled
+            )
+        # Templates that can be formatted, for every combination of satisfied variable sets
+        self._usable_templates = {}
+
+    def get_usable_templates(self, variables_dictionary) -> tuple:
+        # A tuple in the order of the index, as the templates have to be in the same order for the same seed
+        satisfied = tuple(
+            variables
+            for variables in self._templates_by_variables
+            if variables.issubset(variables_dictionary)
+        )
+        usable_templates = self._usable_templates.get(satisfied)
+        if usable_templates is None:
+            usable_templates = tuple(
+                compiled
+                for variables in satisfied
+                for compiled in self._templates_by_variables[variables]
+            )
+            self._usable_templates[satisfied] = usable_templates
+        return usable_templates
+
+
 class TemplatedTextGenerator(AbstractTextGenerator):
     def __init__(self, template_file=None, templates_list=None):
-        templates = []
-        if template_file:
-            templates.extend(read_lines(template_file))
-        if templates_list:
-            templates.extend(templates_list)
-        # Create a tuple so no templates can accidentally be deleted from the generator
-        self._templates = tuple(templates)
-
+        self._template_file = template_file
+        self._templates_list = tuple(templates_list) if templates_list else ()
+        # Loaded on first use, from the registry if only using a template file
+        self._index = None
+
+    def _get_index(self) -> TemplateIndex:
+        if self._index is None:
+            if self._template_file and not self._templates_list:
+                self._index = get_template_index(self._template_file)
+            else:
+                templates = []
+                if self._template_file:
+                    templates.extend(read_lines(self._template_file))
+                templates.extend(self._templates_list)
+                self._index = TemplateIndex(templates)
+        return self._index
+
+    @trace_util.traced_method("text_generator")
     def generate(self, variables_dictionary=None):
         """ Generates a text from the templates using the given variables dictionary"""
         # Set empty dictionary if none is given
         if not bool(variables_dictionary):
             variables_dictionary = {}
-        # Create a mutable copy of the templates list
-        possible_templates = list(self._templates)
-        for i in range(len(possible_templates)):
-            template = random.choice(possible_templates)
-            if can_format_with(template, variables_dictionary):
-                result = apply_variables_to_template(template, variables_dictionary)
-                if result:
-                    return result
-            # Remove the template from the possible templates list, such that it won
-            possible_templates.remove(template)
+        possible_templates = self._get_index().get_usable_templates(
+            variables_dictionary
+        )
+        while len(possible_templates) > 0:
+            index = random.randrange(len(possible_templates))
+            result = possible_templates[index](variables_dictionary)
+            if result:
+                return result
+            # Only copy the templates when one fails, and replace the failed one by the last one
+            if isinstance(possible_templates, tuple):
+                possible_templates = list(possible_templates)
+            possible_templates[index] = possible_templates[-1]
+            possible_templates.pop()
+
+
+class TraceryGrammar(object):
+    """ Tracery grammar of a file, shared by the generators of all its symbols.
+    Only expands to templates that can be formatted with the available variables """
+
+    def __init__(self, raw_grammar):
+        self._rules = analyse_tracery_rules(raw_grammar)
+        self.variables = frozenset(
+            variable
+            for expansions in self._rules.values()
+            for _, variables, _ in expansions
+            for variable in variables
+        )
+        # Pruned grammars, per set of available variables used in the grammar
+        self._pruned_grammars = {}
+
+    def _get_pruned_grammar(self, variables_dictionary) -> tracery.Grammar:
+        available = self.variables.intersection(variables_dictionary)
+        pruned_grammar = self._pruned_grammars.get(available)
+        if pruned_grammar is None:
+            pruned_grammar = tracery.Grammar(
+                prune_tracery_rules(self._rules, available)
+            )
+            pruned_grammar.add_modifiers(base_english)
+            self._pruned_grammars[available] = pruned_grammar
+        return pruned_grammar
+
+    def flatten(self, symbol, variables_dictionary) -> Optional[str]:
+        """ Expands the symbol to a template using only the given variables, or None if that is not possible """
+        grammar = self._get_pruned_grammar(variables_dictionary)
+        if symbol not in grammar.symbols:
+            return None
+        template = grammar.flatten("#" + symbol + "#")
+        # Tracery remembers every expansion, which would keep on growing as the grammar is shared
+        grammar.clear_state()
+        del grammar.errors[:]
+        return template
 
 
 class TraceryTextGenerator(AbstractTextGenerator):
     def __init__(self, tracery_json, variable="origin"):
-        with open(os_util.to_actual_file(tracery_json)) as grammar_file:
-            grammar = get_tracery_grammar(grammar_file)
-            grammar.add_modifiers(base_english)
-            self._grammar = grammar
-            self._variable = variable
+        self._tracery_json = tracery_json
+        self._variable = variable
 
+    @trace_util.traced_method("text_generator")
     def generate(self, variables_dictionary=None):
         """ Generates a text from internal tracery grammar using the given variables dictionary"""
         # Set empty dictionary if none is given
         if not bool(variables_dictionary):
             variables_dictionary = {}
 
-        # Generate
-        for i in range(100):  # TODO prune the grammar instead of retrying
-            template = self._grammar.flatten("#" + self._variable + "#")
-            if can_format_with(template, variables_dictionary):
-                result = apply_variables_to_template(template, variables_dictionary)
-                if result:
-                    return result
+        # Loaded on first use, and shared with the other generators of the same file
+        grammar = get_tracery_grammar(self._tracery_json)
+
+        # Generate, retrying only for functions of variables that failed
+        for i in range(100):
+            template = grammar.flatten(self._variable, variables_dictionary)
+            if template is None:
+                return None
+            result = apply_variables_to_template(template, variables_dictionary)
+            if result:
+                return result
+
+
+_TRACERY_SYMBOL_REGEX = re.compile(r"#([^#.\[\]]*)[^#]*#")
+
+
+def analyse_tracery_rules(raw_grammar):
+    """ Finds for every expansion of every symbol of a tracery grammar which format variables it needs
+    and which symbols it refers to """
+    rules = {}
+    for symbol, expansions in raw_grammar.items():
+        if isinstance(expansions, str):
+            expansions = [expansions]
+        rules[symbol] = [
+            (
+                expansion,
+                frozenset(get_format_variables(expansion)),
+                # Symbols set by tracery actions are only known while expanding, so are not checked
+                frozenset()
+                if "[" in expansion
+                else frozenset(_TRACERY_SYMBOL_REGEX.findall(expansion)),
+            )
+            for expansion in expansions
+        ]
+    return rules
+
+
+def prune_tracery_rules(rules, available_variables):
+    """ Returns the tracery grammar with only the expansions of which every possible flattening only needs
+    the available variables. Symbols that can no longer be expanded are left out """
+
+    def is_usable(variables, symbols, usable_symbols):
+        return variables <= available_variables and symbols <= usable_symbols
+
+    # Find all symbols that can be expanded, until no more new ones are found
+    usable_symbols = set()
+    found_new = True
+    while found_new:
+        found_new = False
+        for symbol, expansions in rules.items():
+            if symbol not in usable_symbols and any(
+                is_usable(variables, symbols, usable_symbols)
+                for _, variables, symbols in expansions
+            ):
+                usable_symbols.add(symbol)
+                found_new = True
+
+    return {
+        symbol: [
+            expansion
+            for expansion, variables, symbols in rules[symbol]
+            if is_usable(variables, symbols, usable_symbols)
+        ]
+        for symbol in rules
+        if symbol in usable_symbols
+    }
+
+
+# Registry of the template and grammar files, each loaded once
+
+
+def get_template_index(template_file) -> TemplateIndex:
+    return _load_template_index(os.path.realpath(os_util.to_actual_file(template_file)))
+
+
+@cache_util.registered_cache(maxsize=64)
+def _load_template_index(actual_file) -> TemplateIndex:
+    return TemplateIndex(read_lines(actual_file))
 
 
-@lru_cache(maxsize=20)
-def get_tracery_grammar(grammar_file):
-    return tracery.Grammar(json.load(grammar_file))
+def get_tracery_grammar(tracery_json) -> TraceryGrammar:
+    return _load_tracery_grammar(os.path.realpath(os_util.to_actual_file(tracery_json)))
+
+
+@cache_util.registered_cache(maxsize=64)
+def _load_tracery_grammar(actual_file) -> TraceryGrammar:
+    with open(actual_file) as grammar_file:
+        return TraceryGrammar(json.load(grammar_file))
 
 
 def can_format_with(template, variables_dictionary):
@@ -132,14 +300,109 @@ def get_format_variables_and_functions(template):
     return set(matches)
 
 
+_FIELD_NAME_REGEX = re.compile(r"\w+(?:[.]\w+)*")
+_formatter = string.Formatter()
+
+
+class CompiledTemplate(object):
+    """ Template parsed once into its literal texts and fields. Every field is a variable with the chain of
+    functions to apply to it, of which the result is formatted like str.format would """
+
+    def __init__(self, template: str):
+        self.template = template
+        # Every distinct variable with its function chain, in order of appearance
+        self._chains = []
+        # Literal texts and (chain index, conversion, format spec) fields
+        self._segments = []
+        chain_indices = {}
+        for literal, field_name, format_spec, conversion in _formatter.parse(template):
+            if literal:
+                self._segments.append(literal)
+            if field_name is None:
+                continue
+            if not _FIELD_NAME_REGEX.fullmatch(field_name) or "{" in format_spec:
+                raise ValueError(
+                    "Unsupported field {{{}}} in template: {}".format(
+                        field_name, template
+                    )
+                )
+            variable, *functions = field_name.split(".")
+            chain = (variable, tuple(functions))
+            if chain not in chain_indices:
+                chain_indices[chain] = len(self._chains)
+                self._chains.append(chain)
+            self._segments.append((chain_indices[chain], conversion, format_spec))
+        self.variables = frozenset(variable for variable, _ in self._chains)
+
+    def __call__(self, variables_dictionary) -> Optional[str]:
+        """ Formats the template with the given variables, or returns None if a function returned nothing """
+        values = []
+        for variable, functions in self._chains:
+            value = apply_functions(variables_dictionary[variable], functions)
+            if value is None:
+                return None
+            values.append(value)
+        return "".join(
+            segment
+            if isinstance(segment, str)
+            else format(
+                _formatter.convert_field(values[segment[0]], segment[1]), segment[2]
+            )
+            for segment in self._segments
+        )
+
+    def __repr__(self):
+        return "CompiledTemplate({!r})".format(self.template)
+
+
+@cache_util.registered_cache(maxsize=2048)
+def compile_template(template: str) -> CompiledTemplate:
+    return CompiledTemplate(template)
+
+
 def apply_variables_to_template(template, variables_dictionary):
-    variables_and_functions = get_format_variables_and_functions(template)
-    applied = apply_functions_to_variables(
-        template, variables_dictionary, variables_and_functions
-    )
-    if applied:
-        (template, variables_dictionary) = applied
-        return template.format(**variables_dictionary)
+    return compile_template(template)(variables_dictionary)
+
+
+_function_results = threading.local()
+
+
+@contextmanager
+def memoizing_functions(function_results: Optional[dict] = None):
+    """ Memoizes the options that sources give to the template functions in this context, e.g. the related words
+    of conceptnet_related, such that every seed is only looked up and parsed once per presentation. The source
+    caches are shared by all presentations, and can evict these options halfway a presentation """
+    previous = getattr(_function_results, "results", None)
+    _function_results.results = {} if function_results is None else function_results
+    try:
+        yield _function_results.results
+    finally:
+        _function_results.results = previous
+
+
+def get_function_results() -> Optional[dict]:
+    return getattr(_function_results, "results", None)
+
+
+def get_source_options(get_options, argument):
+    """ The options the source gives for the argument, to choose from at random every time """
+    results = get_function_results()
+    if results is None:
+        return get_options(argument)
+    key = (get_options, argument)
+    options = results.get(key)
+    if options is None:
+        options = get_options(argument)
+        # Don't remember failures, as the source may still succeed on a retry
+        if options:
+            results[key] = options
+    return options
+
+
+def _weighted_choice(weighted_options):
+    if weighted_options:
+        return random_util.weighted_random(weighted_options)
+    return None
 
 
 def apply_functions(variable, functions):
@@ -164,34 +427,6 @@ def apply_functions(variable, functions):
     return result
 
 
-def apply_functions_to_variables(
-    template, variables_dictionary, variables_and_functions
-):
-    """ Applies the functions of the variables_and_functions tuple and stores them in the variable dictionary and
-    updates the template """
-    variables_and_functions = list(variables_and_functions)
-    variables_and_functions.sort(key=lambda a: len(a), reverse=True)
-
-    for var_func in variables_and_functions:
-        # Check if it has functions to apply
-        if len(var_func) > 1 and len(var_func[1]) > 0:
-            old_var_name = var_func[0] + var_func[1]
-            functions = var_func[1][1:].split(".")
-            variable_name = var_func[0]
-            variable = variables_dictionary[variable_name]
-            applied_functions = apply_functions(variable, functions)
-            if applied_functions is not None:
-                applied_var_name = old_var_name.replace(".", "_")
-                # Replace all occurrences with the dot to the underscore notation
-                template = template.replace(old_var_name, applied_var_name)
-                # Store in dictionary
-                variables_dictionary[applied_var_name] = applied_functions
-            else:
-                return None
-
-    return template, variables_dictionary
-
-
 def read_lines(filename):
     """ Reads all the string lines from a file """
     return os_util.read_lines(filename)
@@ -7,9 +7,14 @@ from typing import List
 
 # from cachier import cachier
 from pyunsplash import PyUnsplash
+from pyunsplash.src.settings import API_ROOT
+from pyunsplash.src.unobject import UnsplashObject
+from pyunsplash.src.unpage import UnsplashPage
 
 from talkgenerator.datastructures.image_data import ImageData
 from talkgenerator import settings
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
 
 # pyunsplash logger defaults to level logging.ERROR
 # If you need to change that, use getLogger/setLevel
@@ -18,14 +23,20 @@ logging.getLogger("pyunsplash").setLevel(logging.DEBUG)
 logger = logging.getLogger("talkgenerator")
 
 
+@cache_util.registered_cache(maxsize=1)
 def get_unsplash_session():
+    """ Creates the Unsplash client on first use """
     creds = settings.unsplash_auth()
     # instantiate PyUnsplash object
     api = PyUnsplash(api_key=creds["unsplash_access_key"])
     return api
 
 
-unsplash_session = get_unsplash_session()
+def _use_api_root():
+    """ Points pyunsplash to the overridden base URL of Unsplash, if there is one """
+    api_root = settings.service_url("unsplash", API_ROOT)
+    UnsplashObject._api_root = api_root
+    UnsplashPage._api_root = api_root
 
 
 def _map_to_image_data(photo):
@@ -36,14 +47,17 @@ def _map_to_image_data(photo):
         creator_name = creator_user["name"] + " (Unsplash)"
     return ImageData(image_url=link_download, source=creator_name)
 
+@metrics_util.measured_source
 def random(_=None):
+    _use_api_root()
     try:
-        random_image = unsplash_session.photos(type_="random")
+        random_image = get_unsplash_session().photos(type_="random")
         image_url = random_image.body["links"]["download"]
         creator_name = random_image.body["user"]["name"]
         return ImageData(image_url=image_url, source=creator_name)
     except JSONDecodeError:
         logger.warning("Couldn't get random Unsplash image")
+        metrics_util.count_source_error()
         return None
 
 
@@ -55,9 +69,12 @@ def random_as_list(_=None):
         return []
 
 
+@metrics_util.measured_source
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def search_photos(query) -> List[ImageData]:
+    unsplash_session = get_unsplash_session()
     if unsplash_session and query:
+        _use_api_root()
         results = unsplash_session.search(type_="photos", query=query)
         if results and results.body:
             images = []
@@ -2,20 +2,22 @@
 import re
 import time
 import logging
-from functools import lru_cache
 from itertools import chain
 from pathlib import Path
 
-import inflect
 import requests
 from bs4 import BeautifulSoup
 # from cachier import cachier
 
 from talkgenerator import settings
+from talkgenerator.util import cache_util
+from talkgenerator.util import language_util
+from talkgenerator.util import metrics_util
 
 logger = logging.getLogger("talkgenerator")
 
 _LOG_IN_URL = "https://www.wikihow.com/index.php?title=Special:UserLogin&action=submitlogin&type=login"
+_BASIC_SEARCH_URL = "https://en.wikihow.com/wikiHowTo?search={}"
 _ADVANCED_SEARCH_URL = (
     "https://www.wikihow.com/index.php?title=Special%3ASearch&profile=default&search={}"
     "&fulltext=Search&ss=relevance&so=desc&ffriy=1&ffrin=1&fft=ffta&fftsi=&profile=default"
@@ -31,7 +33,11 @@ def _create_log_in_session(username, password):
 
     while not success and trial < max_session_attempts:
         try:
-            resp = session.post(_LOG_IN_URL, log_in_credentials, log_in_credentials)
+            resp = session.post(
+                settings.service_url("wikihow", _LOG_IN_URL),
+                log_in_credentials,
+                log_in_credentials,
+            )
             if "Unable to continue login." in resp.text:
                 logger.warning("Requests login failed. Unable to continue login.")
                 return False
@@ -100,25 +106,34 @@ def _remove_trademarks(action):
     return action
 
 
-@lru_cache(maxsize=20)
+@metrics_util.measured_source
+@cache_util.registered_cache(maxsize=20)
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def basic_search_wikihow(search_words):
-    return requests.get(
-        "https://en.wikihow.com/wikiHowTo?search=" + search_words.replace(" ", "+")
+    page = requests.get(
+        settings.service_url(
+            "wikihow", _BASIC_SEARCH_URL.format(search_words.replace(" ", "+"))
+        )
     )
+    metrics_util.count_source_bytes(len(page.content))
+    return page
 
 
 # wikihow_session = get_wikihow_session()
 wikihow_session = None
 
 
-@lru_cache(maxsize=20)
+@metrics_util.measured_source
+@cache_util.registered_cache(maxsize=20)
 # @cachier(cache_dir=Path("..", "tmp").absolute())
 def _advanced_search_wikihow(search_words):
     # session = get_wikihow_session()
     if wikihow_session:
-        url = _ADVANCED_SEARCH_URL.format(search_words.replace(" ", "+"))
+        url = settings.service_url(
+            "wikihow", _ADVANCED_SEARCH_URL.format(search_words.replace(" ", "+"))
+        )
         resp = wikihow_session.get(url, allow_redirects=True)
+        metrics_util.count_source_bytes(len(resp.content))
         if "Login Required - wikiHow" in str(resp.content):
             logger.warning(
                 "WARNING: Problem logging in on Wikihow: Advanced Search disabled"
@@ -131,7 +146,9 @@ def get_related_wikihow_actions_basic_search(seed_word):
     page = basic_search_wikihow(seed_word)
     # Try again but with plural if nothing is found
     if not page:
-        page = basic_search_wikihow(inflect.engine().plural(seed_word))
+        page = basic_search_wikihow(
+            language_util.get_inflect_engine().plural(seed_word)
+        )
 
     soup = BeautifulSoup(page.content, "html.parser")
     actions_elements = soup.find_all("a", class_="result_link")
@@ -152,7 +169,9 @@ def get_related_wikihow_actions_advanced_search(seed_word):
     page = _advanced_search_wikihow(seed_word)
     # Try again but with plural if nothing is found
     if not page:
-        page = _advanced_search_wikihow(inflect.engine().plural(seed_word))
+        page = _advanced_search_wikihow(
+            language_util.get_inflect_engine().plural(seed_word)
+        )
     if page:
         soup = BeautifulSoup(page.content, "html.parser")
         actions_elements = soup.find_all("div", class_="mw-search-result-heading")
@@ -1,3 +1,21 @@
+"""
+Caching helpers. Functions cached with `registered_cache` are known to a registry,
+which reports their entry counts and approximate memory size, and can clear or resize them at runtime.
+"""
+import functools
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Maximum depth to look into objects when approximating the size of cached values
+_MAX_SIZE_DEPTH = 8
+
+_KEYWORDS_MARK = object()
+
+
 # from https://stackoverflow.com/questions/1151658/python-hashable-dicts
 class HashableDict(dict):
     """ A hashable version of a dictionary, useful for when a function needs to be cached but uses a dict as an
@@ -11,3 +29,160 @@ class HashableDict(dict):
 
     def __eq__(self, other):
         return self.__key() == other.__key()
+
+
+class RegisteredCache(object):
+    """ Least recently used cache of a function, like functools.lru_cache (maxsize None means unbounded),
+    of which the entries can be inspected, and which can be resized without losing its most recent entries """
+
+    def __init__(self, function, maxsize: Optional[int], name: str):
+        self.name = name
+        self.maxsize = maxsize
+        self._function = function
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        # Hits per thread, such that a caller can tell whether its own call was answered from the cache
+        self._thread_hits = threading.local()
+        functools.update_wrapper(self, function)
+
+    def __call__(self, *args, **kwargs):
+        key = args + (_KEYWORDS_MARK,) + tuple(sorted(kwargs.items())) if kwargs else args
+        with self._lock:
+            try:
+                result = self._entries[key]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                self._thread_hits.count = self.get_thread_hits() + 1
+                return result
+        result = self._function(*args, **kwargs)
+        with self._lock:
+            self._entries[key] = result
+            self._evict()
+        return result
+
+    def __get__(self, instance, owner=None):
+        # Caches methods like functools.lru_cache does, with the object as part of the key
+        if instance is None:
+            return self
+        return functools.partial(self, instance)
+
+    def get_thread_hits(self) -> int:
+        """ The number of hits of the calls made by the current thread """
+        return getattr(self._thread_hits, "count", 0)
+
+    def _evict(self):
+        while self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._entries))
+
+    def cache_clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def resize(self, maxsize: Optional[int]):
+        """ Changes the maximum number of entries, evicting the least recently used entries if necessary """
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def get_approximate_size(self) -> int:
+        """ Approximate number of bytes used by the keys and values of this cache """
+        with self._lock:
+            entries = list(self._entries.items())
+        return get_approximate_size(entries)
+
+
+_caches: Dict[str, RegisteredCache] = {}
+_caches_lock = threading.Lock()
+
+
+def registered_cache(maxsize: Optional[int] = 128, name: str = None):
+    """ Decorator caching the function like functools.lru_cache, and adding the cache to the registry """
+
+    def decorator(function) -> RegisteredCache:
+        cache = RegisteredCache(
+            function, maxsize, name or function.__module__ + "." + function.__qualname__
+        )
+        with _caches_lock:
+            _caches[cache.name] = cache
+        return cache
+
+    return decorator
+
+
+def get_caches() -> List[RegisteredCache]:
+    with _caches_lock:
+        return [cache for _, cache in sorted(_caches.items())]
+
+
+def get_cache(name: str) -> RegisteredCache:
+    with _caches_lock:
+        if name not in _caches:
+            raise KeyError("Unknown cache: {}".format(name))
+        return _caches[name]
+
+
+def resize_cache(name: str, maxsize: Optional[int]):
+    get_cache(name).resize(maxsize)
+
+
+def clear_caches():
+    for cache in get_caches():
+        cache.cache_clear()
+
+
+def get_cache_report(include_size: bool = True) -> List[dict]:
+    """ Entries, maximum size, hits, misses and (optionally, as it is slower) approximate bytes of every cache """
+    report = []
+    for cache in get_caches():
+        info = cache.cache_info()
+        cache_report = {
+            "name": cache.name,
+            "entries": info.currsize,
+            "maxsize": info.maxsize,
+            "hits": info.hits,
+            "misses": info.misses,
+        }
+        if include_size:
+            cache_report["approximate_bytes"] = cache.get_approximate_size()
+        report.append(cache_report)
+    return report
+
+
+def get_approximate_size(value) -> int:
+    """ Approximate number of bytes used by the value and the objects it refers to, counting shared objects once """
+    return _get_size(value, set(), 0)
+
+
+def _get_size(value, seen: set, depth: int) -> int:
+    if id(value) in seen or depth > _MAX_SIZE_DEPTH:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _get_size(key, seen, depth + 1) + _get_size(item, seen, depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _get_size(item, seen, depth + 1)
+    if hasattr(value, "__dict__"):
+        attributes = vars(value)
+        size += _get_size(attributes, seen, depth + 1)
+        # Loaded (PIL) images only refer to their pixel data through a C object
+        pixels = attributes.get("_im", attributes.get("im"))
+        if pixels is not None and hasattr(value, "getbands"):
+            width, height = value.size
+            size += width * height * len(value.getbands())
+    return size
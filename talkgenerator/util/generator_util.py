@@ -12,9 +12,10 @@ from typing import Callable, Optional, Dict, Union, Tuple
 import requests
 
 from talkgenerator.datastructures.image_data import ImageData
-from talkgenerator.util import random_util, os_util
+from talkgenerator.util import random_util, os_util, trace_util, metrics_util, log_util
 
 logger = logging.getLogger("talkgenerator")
+_debug = log_util.DebugLogger(__name__)
 
 
 def fullname(o):
@@ -33,6 +34,12 @@ def fullname(o):
 
 
 class Generator(object):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Record every generator call as a span when tracing is enabled
+        if "__call__" in cls.__dict__:
+            cls.__call__ = trace_util.traced_method("generator")(cls.__call__)
+
     def __call__(self, seed: str):
         raise NotImplemented(
             str(self) + " has not provided an implementation for the generator"
@@ -64,17 +71,23 @@ class CombinedGenerator(Generator):
         self._weighted_generators = weighted_generators
 
     def __call__(self, seed: Union[str, Dict[str, str]]):
-        logger.debug('Calling generator_util.CombinedGenerator')
         current_weighted_generators = list(self._weighted_generators)
-        logger.debug("current_weighted_generators: {}".format(current_weighted_generators))
         while len(current_weighted_generators) > 0:
             generator = random_util.weighted_random(current_weighted_generators)
-            logger.debug("current generator: {}".format(generator))
-            logger.debug("generator seed: {}".format(seed))
             generated = generator(seed)
-            logger.debug("generated: {}".format(generated))
+            _debug(
+                "combined_generator",
+                generator=generator,
+                seed=seed,
+                generated=generated,
+                candidates=len(current_weighted_generators),
+            )
             if generated is not None:
                 return generated
+            # Don't fall back on other generators when the deck used up its external calls
+            if metrics_util.is_source_budget_exhausted():
+                logger.info("External call budget used up, not trying other generators")
+                return None
             _remove_object_from_weighted_list(current_weighted_generators, generator)
 
 
@@ -132,9 +145,11 @@ class SeededGenerator(Generator):
         self._simple_generator = simple_generator
 
     def __call__(self, presentation_context):
-        logger.debug('Calling generator_util.SeededGenerator')
-        logger.debug('presentation_context: {}'.format(presentation_context))
-        logger.debug('self._simple_generator: {}'.format(self._simple_generator))
+        _debug(
+            "seeded_generator",
+            generator=self._simple_generator,
+            seed=presentation_context["seed"],
+        )
         return self._simple_generator(presentation_context["seed"])
 
 
@@ -201,15 +216,14 @@ class ExternalImageListGenerator(Generator):
         self._weighted = weighted
 
     def __call__(self, presentation_context) -> Optional[ImageData]:
-        logger.debug('Calling generator_util.ExternalImageListGenerator')
-        logger.debug('self._image_generator: {}'.format(self._image_generator))
-        logger.debug('self._check_image_validness: {}'.format(self._check_image_validness))
-        logger.debug('self._weighted: {}'.format(self._weighted))
-        logger.debug('module where function def: {}'.format(self._image_generator.__module__))
-        logger.debug('****************************************************************')
         images = self._image_generator(presentation_context)
-        logger.debug('images: {}'.format(images))
-        logger.debug('****************************************************************')
+        _debug(
+            "external_image_list_generator",
+            generator=self._image_generator,
+            check_image_validness=self._check_image_validness,
+            weighted=self._weighted,
+            images=images,
+        )
 
         while bool(images) and len(images) > 0:
             original_chosen_image = (
@@ -2,12 +2,26 @@
 import logging
 import re
 import string
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-import inflect
-import nltk
+from talkgenerator.util import cache_util
+from talkgenerator.util import pos_lexicon
 
 logger = logging.getLogger("talkgenerator")
 
+# NLTK and inflect take long to import and load, so are only loaded when first needed
+_nltk_lock = threading.Lock()
+_tagger = None
+# Why and when loading NLTK last failed. Later calls fail fast instead of checking and downloading its data
+# again, until NLTK_RETRY_SECONDS passed, as the failure may be temporary (e.g. a network error)
+_nltk_error: Optional[Exception] = None
+_nltk_failure_time = 0.0
+NLTK_RETRY_SECONDS = 300
+_inflect_lock = threading.Lock()
+_inflect_engine = None
+
 
 def check_and_download():
     required_corpus_list = ["tokenizers/punkt", "taggers/averaged_perceptron_tagger"]
@@ -23,6 +37,8 @@ def check_and_download():
 
 
 def _check_and_download_corpus(corpus_fullname, corpus_shortname):
+    import nltk
+
     try:
         nltk.data.find(corpus_fullname)
     except LookupError as le:
@@ -45,29 +61,126 @@ def print_corpus_download_warning():
     logger.warning(corpus_warning)
 
 
+def _is_nltk_backing_off() -> bool:
+    return (
+        _nltk_error is not None
+        and time.monotonic() - _nltk_failure_time < NLTK_RETRY_SECONDS
+    )
+
+
+def _load_nltk():
+    """ Checks the NLTK data and loads the tokenizer and tagger when first needed, once for all threads.
+    If loading fails, it is only attempted again after NLTK_RETRY_SECONDS """
+    global _tagger, _nltk_error, _nltk_failure_time
+    if _tagger is None and not _is_nltk_backing_off():
+        with _nltk_lock:
+            if _tagger is None and not _is_nltk_backing_off():
+                import nltk
+
+                try:
+                    check_and_download()
+                    # Loads the tokenizer model
+                    nltk.word_tokenize("preload")
+                    _tagger = nltk.tag.PerceptronTagger()
+                except Exception as e:
+                    _nltk_error = e
+                    _nltk_failure_time = time.monotonic()
+                    raise
+                _nltk_error = None
+    if _tagger is None:
+        raise LookupError(
+            "Loading the NLTK data failed before: {}".format(_nltk_error)
+        ) from _nltk_error
+    return _tagger
+
+
+def preload():
+    """ Loads the NLTK models and the POS lexicon up front instead of on first use, e.g. for long-lived workers """
+    pos_lexicon.get_lexicon()
+    _load_nltk()
+
+
 # Helpers
 
 
-def _replace_word_one_case(sentence, word, replacement, flags=0):
-    return re.sub(
-        r"(^|\W)" + word + r"(\W|$)", r"\1" + replacement + r"\2", sentence, flags=flags
-    )
+def _match_case(original, replacement):
+    if original.islower():
+        return replacement.lower()
+    if original.isupper():
+        return replacement.upper()
+    if original.istitle():
+        return replacement.title()
+    return replacement
+
+
+class WordReplacer(object):
+    """ Replaces whole words according to a mapping in a single pass over a sentence,
+    giving every replacement the casing of the word it replaces """
+
+    def __init__(self, mapping: Dict[str, str]):
+        self._mapping = {
+            word.lower(): replacement for word, replacement in mapping.items()
+        }
+        # Longest words first, such that e.g. "yours" is not seen as "your"
+        words = sorted(self._mapping, key=len, reverse=True)
+        self._regex = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(word) for word in words) + r")(?!\w)",
+            re.I,
+        )
+
+    def __call__(self, sentence: str) -> str:
+        return self._regex.sub(self._replace, sentence)
+
+    def _replace(self, match):
+        word = match.group(0)
+        return _match_case(word, self._mapping[word.lower()])
+
+
+@cache_util.registered_cache(maxsize=128)
+def _get_word_replacer(word, replacement):
+    return WordReplacer({word: replacement})
 
 
 def replace_word(sentence, word, replacement):
-    lowered = _replace_word_one_case(sentence, word.lower(), replacement.lower())
-    upper = _replace_word_one_case(lowered, word.upper(), replacement.upper())
-    titled = _replace_word_one_case(upper, word.title(), replacement.title())
-    result = _replace_word_one_case(titled, word, replacement, re.I)
-    return result
+    return _get_word_replacer(word, replacement)(sentence)
+
+
+@cache_util.registered_cache(maxsize=4096)
+def _tokenize(text: str) -> Tuple[str, ...]:
+    _load_nltk()
+    import nltk
+
+    return tuple(nltk.word_tokenize(text))
+
+
+@cache_util.registered_cache(maxsize=4096)
+def _tag_tokens(tokens: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(_load_nltk().tag(list(tokens)))
+
+
+def tag_phrase(phrase: str) -> Tuple[Tuple[str, str], ...]:
+    """ Returns the tokens of the phrase with their POS tag, tagging the whole phrase at once.
+    Words of the precomputed lexicon, which is lowercase, don't need the tagger at all """
+    tag = pos_lexicon.get_lexicon().get(phrase.lower())
+    if tag is not None:
+        return ((phrase, tag),)
+    return _tag_tokens(_tokenize(phrase))
 
 
 def get_pos_tags(word):
     """ Returns all possible POS tags for a given word according to nltk """
-    tags = nltk.pos_tag(nltk.word_tokenize(word))
-    tags_strings = [tag[1] for tag in tags]
-    # print(word, ":", tags_strings)
-    return tags_strings
+    return [tag[1] for tag in tag_phrase(word)]
+
+
+def get_pos_tags_of_words(words: Sequence[str]) -> List[List[str]]:
+    """ Returns the POS tags of every word of a phrase, calling the POS tagger only once for the whole phrase """
+    if len(words) == 1:
+        return [get_pos_tags(words[0])]
+    tokens_of_words = [_tokenize(word) for word in words]
+    tags = iter(
+        _tag_tokens(tuple(token for tokens in tokens_of_words for token in tokens))
+    )
+    return [[next(tags)[1] for _ in tokens] for tokens in tokens_of_words]
 
 
 # Verbs
@@ -75,8 +188,9 @@ def get_pos_tags(word):
 
 def get_verb_index(words):
     seen_adverb = False
+    tags_of_words = get_pos_tags_of_words(words)
     for i in range(len(words)):
-        tags = get_pos_tags(words[i])
+        tags = tags_of_words[i]
         # Is verb: return
         if "VB" in tags:
             return i
@@ -105,24 +219,26 @@ def apply_function_to_verb(action, func):
     ).strip()
 
 
+@cache_util.registered_cache(maxsize=4096)
 def to_present_participle(action):
     return apply_function_to_verb(action, to_ing_form)
 
 
+_VOWELS = frozenset("aeiou")
+_CONSONANTS = frozenset(string.ascii_lowercase) - _VOWELS
+_ING_EXCEPTIONS = frozenset(["be", "see", "flee", "knee", "lie"])
+
+
 # From https://github.com/arsho/46-Simple-Python-Exercises-Solutions/blob/master/problem_25.py
 def _make_ing_form(passed_string):
     passed_string = passed_string.lower()
-    letter = list(string.ascii_lowercase)
-    vowel = ["a", "e", "i", "o", "u"]
-    consonant = [c for c in letter if c not in vowel]
-    exception = ["be", "see", "flee", "knee", "lie"]
 
     if passed_string.endswith("ie"):
         passed_string = passed_string[:-2]
         return passed_string + "ying"
 
     elif passed_string.endswith("e"):
-        if passed_string in exception:
+        if passed_string in _ING_EXCEPTIONS:
             return passed_string + "ing"
         else:
             passed_string = passed_string[:-1]
@@ -133,9 +249,9 @@ def _make_ing_form(passed_string):
 
     elif (
         len(passed_string) >= 3
-        and passed_string[-1] in consonant
-        and passed_string[-2] in vowel
-        and passed_string[-3] in consonant
+        and passed_string[-1] in _CONSONANTS
+        and passed_string[-2] in _VOWELS
+        and passed_string[-3] in _CONSONANTS
     ):
         passed_string += passed_string[-1]
         return passed_string + "ing"
@@ -143,64 +259,87 @@ def _make_ing_form(passed_string):
         return passed_string + "ing"
 
 
+@cache_util.registered_cache(maxsize=4096)
 def to_ing_form(passed_string):
-    result = _make_ing_form(passed_string)
-    if passed_string.islower():
-        return result.lower()
-    if passed_string.isupper():
-        return result.upper()
-    if passed_string.istitle():
-        return result.title()
-    return result
+    return _match_case(passed_string, _make_ing_form(passed_string))
+
+
+def get_inflect_engine():
+    """ Imports inflect and creates its engine on first use, once for all threads """
+    global _inflect_engine
+    if _inflect_engine is None:
+        with _inflect_lock:
+            if _inflect_engine is None:
+                import inflect
 
+                _inflect_engine = inflect.engine()
+    return _inflect_engine
 
-inflect_engine = inflect.engine()
+
+def __getattr__(name):
+    # The engine used to be created on import, as the module attribute inflect_engine
+    if name == "inflect_engine":
+        return get_inflect_engine()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+@cache_util.registered_cache(maxsize=4096)
+def _singular_noun(word):
+    return get_inflect_engine().singular_noun(word)
 
 
 def is_singular(word):
-    return inflect_engine.singular_noun(word) is False
+    return _singular_noun(word) is False
 
 
 def is_plural(word):
-    return bool(inflect_engine.singular_noun(word))
+    return bool(_singular_noun(word))
 
 
+@cache_util.registered_cache(maxsize=4096)
 def to_plural(word):
     if is_singular(word):
         if word.startswith("a "):
             word = word[2:]
-        return inflect_engine.plural(word)
+        return get_inflect_engine().plural(word)
     return word
 
 
 def to_singular(word):
-    if is_plural(word):
-        return inflect_engine.singular_noun(word)
+    singular = _singular_noun(word)
+    if singular:
+        return singular
     return word
 
 
+def apply_to_all(function: Callable[[str], str], words: Iterable[str]) -> List[str]:
+    """ Applies a word transformation such as to_plural or add_article to many words,
+    transforming every distinct word only once """
+    words = list(words)
+    transformed = {word: function(word) for word in set(words)}
+    return [transformed[word] for word in words]
+
+
+_AN_FIRST_LETTERS = frozenset("aeioAEIO")
+
+
 def add_article(word):
     # TODO: Maybe more checks, some u's cause "an", or some big letters in case it's an abbreviation
-    word_lower = word.lower()
-    article = "a"
-    if (
-        word_lower.startswith("a")
-        or word_lower.startswith("e")
-        or word_lower.startswith("i")
-        or word_lower.startswith("o")
-    ):
-        article = "an"
+    # Cheaper to compute than to look up in a cache
+    article = "an" if word[:1] in _AN_FIRST_LETTERS else "a"
     return article + " " + word
 
 
 # Pronouns
 
 
+_second_to_first_pronouns_replacer = WordReplacer(
+    {"yours": "mine", "your": "my", "you": "me"}
+)
+
+
 def second_to_first_pronouns(sentence):
-    sentence = replace_word(sentence, "yours", "mine")
-    sentence = replace_word(sentence, "your", "my")
-    sentence = replace_word(sentence, "you", "me")
-    return sentence
+    return _second_to_first_pronouns_replacer(sentence)
 
 
 # POS tag checkers
@@ -218,8 +357,7 @@ def is_verb(word):
 
 
 def get_last_noun_and_article(sentence):
-    tokens = nltk.word_tokenize(sentence)
-    tags = nltk.pos_tag(tokens)
+    tags = tag_phrase(sentence)
 
     noun = None
     for tag in reversed(tags):
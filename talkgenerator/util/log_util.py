@@ -0,0 +1,91 @@
+"""
+Structured debug logging for the hot paths of generating slides.
+
+Debug events have a name and fields, which are only rendered to text when the event is actually logged,
+such that a disabled debug event costs no more than a function call. Debug events can be sampled per module,
+and `debugging()` logs all debug events of a single deck, even when the logger is not at the debug level.
+"""
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+_MAX_FIELD_LENGTH = 500
+
+# Fraction of the debug events to log, per module
+_sample_rates: Dict[str, float] = {}
+# Separate random generator, as sampling may not change the random state of seeded generation
+_sampling_random = random.Random()
+_debugging = threading.local()
+
+
+class _StructuredMessage(object):
+    """ Renders the event and its fields only when the message is formatted by a handler """
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return " ".join(
+            [self.event]
+            + [
+                "{}={}".format(key, _render(value))
+                for key, value in self.fields.items()
+            ]
+        )
+
+
+def _render(value) -> str:
+    text = repr(value) if isinstance(value, str) else str(value)
+    if len(text) > _MAX_FIELD_LENGTH:
+        text = text[:_MAX_FIELD_LENGTH] + "..."
+    return text
+
+
+class DebugLogger(object):
+    """ Logs structured debug events of a module, e.g.
+    _debug = DebugLogger(__name__)
+    _debug("generated", seed=seed, generated=generated) """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._logger = logging.getLogger(name)
+
+    def __call__(self, event: str, **fields):
+        if not getattr(_debugging, "active", False):
+            if not self._logger.isEnabledFor(logging.DEBUG):
+                return
+            sample_rate = _sample_rates.get(self.name)
+            if sample_rate is not None and _sampling_random.random() >= sample_rate:
+                return
+        # Also logs when only debugging is active, so bypasses the level check of logger.debug
+        self._logger._log(
+            logging.DEBUG, _StructuredMessage(event, fields), (), stacklevel=2
+        )
+
+
+def set_sample_rate(module_name: str, sample_rate: float):
+    """ Only logs the given fraction of the debug events of the module, e.g. 0.01 for one in a hundred """
+    _sample_rates[module_name] = sample_rate
+
+
+def reset_sample_rates():
+    _sample_rates.clear()
+
+
+@contextmanager
+def debugging(enabled: bool = True):
+    """ If enabled, logs all debug events of the current thread in this context, regardless of the log level
+    and sampling """
+    previous = getattr(_debugging, "active", False)
+    _debugging.active = enabled or previous
+    try:
+        yield
+    finally:
+        _debugging.active = previous
+
+
+def is_debugging() -> bool:
+    return getattr(_debugging, "active", False)
@@ -0,0 +1,345 @@
+"""
+In-process metrics about the generation of presentations: counters and latency histograms per slide generator
+and per (external) source function. The metrics can be dumped as JSON or in the Prometheus text format.
+The external calls of a single slide deck can also be accounted separately, optionally capped, using SourceUsage.
+"""
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from talkgenerator.util import trace_util
+
+# Slide generator metrics, labeled by the name of the SlideGeneratorData
+GENERATOR_ATTEMPTS = "talkgenerator_slide_generator_attempts_total"
+GENERATOR_SUCCESSES = "talkgenerator_slide_generator_successes_total"
+GENERATOR_CONSTRAINT_REJECTIONS = (
+    "talkgenerator_slide_generator_constraint_rejections_total"
+)
+GENERATOR_RETRIES = "talkgenerator_slide_generator_retries_total"
+GENERATOR_SECONDS = "talkgenerator_slide_generator_seconds"
+
+# Source metrics, labeled by the name of the source function
+SOURCE_CALLS = "talkgenerator_source_calls_total"
+SOURCE_ERRORS = "talkgenerator_source_errors_total"
+SOURCE_CACHE_HITS = "talkgenerator_source_cache_hits_total"
+SOURCE_BYTES = "talkgenerator_source_bytes_total"
+SOURCE_SECONDS = "talkgenerator_source_seconds"
+
+_HELP = {
+    GENERATOR_ATTEMPTS: "Times a slide generator was asked to generate a slide",
+    GENERATOR_SUCCESSES: "Slides successfully generated by a slide generator",
+    GENERATOR_CONSTRAINT_REJECTIONS: "Generated slides rejected for being empty or reusing too many elements",
+    GENERATOR_RETRIES: "Retries used by a slide generator after a rejected slide",
+    GENERATOR_SECONDS: "Time spent by a slide generator on generating a slide",
+    SOURCE_CALLS: "Calls of a source function",
+    SOURCE_ERRORS: "Errors of a source function",
+    SOURCE_CACHE_HITS: "Calls of a source function answered from its cache",
+    SOURCE_BYTES: "Bytes downloaded by a source function",
+    SOURCE_SECONDS: "Time spent in a source function",
+}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self):
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRegistry(object):
+    """ Thread-safe collection of counters and histograms, identified by their name and labels """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._counters: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = _to_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = _to_key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = _Histogram(self._buckets)
+            self._histograms[key].observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_to_key(name, labels), 0)
+
+    def get_histogram_count(self, name: str, **labels) -> int:
+        with self._lock:
+            histogram = self._histograms.get(_to_key(name, labels))
+            return histogram.count if histogram else 0
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_dictionary(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": dict(
+                            zip(
+                                [str(bound) for bound in histogram.buckets] + ["+Inf"],
+                                histogram.get_cumulative_counts(),
+                            )
+                        ),
+                    }
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dictionary())
+
+    def to_prometheus(self) -> str:
+        """ Renders all metrics in the Prometheus text exposition format """
+        with self._lock:
+            lines = []
+            written_names = set()
+
+            def add_header(name, metric_type):
+                if name not in written_names:
+                    written_names.add(name)
+                    if name in _HELP:
+                        lines.append("# HELP {} {}".format(name, _HELP[name]))
+                    lines.append("# TYPE {} {}".format(name, metric_type))
+
+            for (name, labels), value in sorted(self._counters.items()):
+                add_header(name, "counter")
+                lines.append("{}{} {}".format(name, _format_labels(labels), value))
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                add_header(name, "histogram")
+                bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.get_cumulative_counts()):
+                    lines.append(
+                        "{}_bucket{} {}".format(
+                            name, _format_labels(labels + (("le", bound),)), count
+                        )
+                    )
+                lines.append("{}_sum{} {}".format(name, _format_labels(labels), histogram.sum))
+                lines.append(
+                    "{}_count{} {}".format(name, _format_labels(labels), histogram.count)
+                )
+            return "\n".join(lines) + "\n"
+
+    def save(self, file_name: str):
+        """ Saves the metrics as JSON if the file name ends with .json, in the Prometheus text format otherwise """
+        content = self.to_json() if file_name.endswith(".json") else self.to_prometheus()
+        with open(file_name, "w", encoding="utf-8") as file:
+            file.write(content)
+
+
+def _to_key(name: str, labels: dict) -> _Key:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for key, value in labels
+        )
+        + "}"
+    )
+
+
+# The registry used by the talk generator itself
+registry = MetricsRegistry()
+
+# = SOURCES =
+
+_current_sources = threading.local()
+
+
+def _get_source_name(function) -> str:
+    return "{}.{}".format(function.__module__.rsplit(".", 1)[-1], function.__qualname__)
+
+
+def get_current_source() -> Optional[str]:
+    """ The name of the innermost measured source function that is running in this thread """
+    stack = getattr(_current_sources, "stack", None)
+    return stack[-1] if stack else None
+
+
+def measured_source(function):
+    """ Decorator counting the calls, errors, cache hits and latency of a source function.
+    Put it above a cache_util.registered_cache decorator to also count the cache hits """
+    source = _get_source_name(function)
+    cache_info = getattr(function, "cache_info", None)
+    # The hits of the calling thread, as other threads may call the same cache at the same time
+    get_thread_hits = getattr(function, "get_thread_hits", None)
+    traced_function = trace_util.traced("source", source)(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        hits = get_thread_hits() if get_thread_hits else None
+        if not hasattr(_current_sources, "stack"):
+            _current_sources.stack = []
+        _current_sources.stack.append(source)
+        start = time.perf_counter()
+        try:
+            return traced_function(*args, **kwargs)
+        except Exception:
+            registry.increment(SOURCE_ERRORS, source=source)
+            raise
+        finally:
+            _current_sources.stack.pop()
+            duration = time.perf_counter() - start
+            registry.increment(SOURCE_CALLS, source=source)
+            registry.observe(SOURCE_SECONDS, duration, source=source)
+            if get_thread_hits and get_thread_hits() != hits:
+                registry.increment(SOURCE_CACHE_HITS, source=source)
+            else:
+                usage = get_source_usage()
+                if usage is not None:
+                    usage.add_call(source, duration)
+
+    if cache_info:
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = function.cache_clear
+    return wrapper
+
+
+def count_source_bytes(number_of_bytes: int):
+    """ Adds downloaded bytes to the source function that is currently running """
+    source = get_current_source()
+    if source is not None:
+        registry.increment(SOURCE_BYTES, number_of_bytes, source=source)
+        usage = get_source_usage()
+        if usage is not None:
+            usage.add_bytes(source, number_of_bytes)
+
+
+def count_source_error():
+    """ Counts an error that the currently running source function handled itself """
+    source = get_current_source()
+    if source is not None:
+        registry.increment(SOURCE_ERRORS, source=source)
+
+
+# = PER DECK USAGE =
+
+
+class SourceUsage(object):
+    """ External calls, downloaded bytes and seconds per source function of a single slide deck.
+    Calls answered from a cache are not counted. If max_calls is given, the deck is not supposed to make more
+    external calls than that: generators stop retrying and falling back once it is exhausted """
+
+    def __init__(self, max_calls: Optional[int] = None):
+        self.max_calls = max_calls
+        self._sources: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get_source(self, source: str) -> Dict[str, float]:
+        if source not in self._sources:
+            self._sources[source] = {"calls": 0, "bytes": 0, "seconds": 0.0}
+        return self._sources[source]
+
+    def add_call(self, source: str, seconds: float):
+        with self._lock:
+            source_usage = self._get_source(source)
+            source_usage["calls"] += 1
+            source_usage["seconds"] += seconds
+
+    def add_bytes(self, source: str, number_of_bytes: int):
+        with self._lock:
+            self._get_source(source)["bytes"] += number_of_bytes
+
+    def get_total_calls(self) -> int:
+        with self._lock:
+            return sum(source_usage["calls"] for source_usage in self._sources.values())
+
+    def is_exhausted(self) -> bool:
+        return self.max_calls is not None and self.get_total_calls() >= self.max_calls
+
+    def to_dictionary(self) -> dict:
+        with self._lock:
+            sources = {
+                source: dict(source_usage)
+                for source, source_usage in sorted(self._sources.items())
+            }
+        return {
+            "max_calls": self.max_calls,
+            "total": {
+                key: sum(source_usage[key] for source_usage in sources.values())
+                for key in ("calls", "bytes", "seconds")
+            },
+            "sources": sources,
+        }
+
+    @classmethod
+    def from_dictionary(cls, usage_dict: dict) -> "SourceUsage":
+        usage = cls(usage_dict.get("max_calls"))
+        for source, source_usage in usage_dict.get("sources", {}).items():
+            usage._sources[source] = dict(source_usage)
+        return usage
+
+
+_active_usage = threading.local()
+
+
+@contextmanager
+def using_source_usage(usage: Optional[SourceUsage]):
+    """ Accounts the source calls of the current thread to the given usage while in this context """
+    previous_usage = getattr(_active_usage, "usage", None)
+    _active_usage.usage = usage
+    try:
+        yield usage
+    finally:
+        _active_usage.usage = previous_usage
+
+
+def get_source_usage() -> Optional[SourceUsage]:
+    return getattr(_active_usage, "usage", None)
+
+
+def is_source_budget_exhausted() -> bool:
+    """ Whether the slide deck being generated in this thread used up its external calls """
+    usage = get_source_usage()
+    return usage is not None and usage.is_exhausted()
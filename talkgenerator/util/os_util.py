@@ -3,8 +3,8 @@ import os
 import logging
 import pathlib
 import sys
-from functools import lru_cache
-from typing import Union
+import uuid
+from typing import Union, Optional, IO, Tuple
 
 import requests
 from PIL import Image
@@ -12,6 +12,7 @@ from PIL.Image import DecompressionBombError
 
 # import tempfile
 from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.util import cache_util
 
 logger = logging.getLogger("talkgenerator")
 
@@ -24,13 +25,13 @@ def to_actual_file(filename=""):
     return os.path.join(util_folder, filename)
 
 
-@lru_cache(maxsize=20)
+@cache_util.registered_cache(maxsize=20)
 def read_lines(filename):
     actual_file = to_actual_file(filename)
     return [line.rstrip("\n") for line in open(actual_file)]
 
 
-@lru_cache(maxsize=20)
+@cache_util.registered_cache(maxsize=20)
 def open_image(filename):
     try:
         return Image.open(filename)
@@ -41,7 +42,7 @@ def open_image(filename):
 _PROHIBITED_IMAGES_DIR = "data/prohibited_images/"
 
 
-@lru_cache(maxsize=1)
+@cache_util.registered_cache(maxsize=1)
 def get_prohibited_images():
     actual_dir = to_actual_file(_PROHIBITED_IMAGES_DIR)
     return list(
@@ -49,7 +50,7 @@ def get_prohibited_images():
     )
 
 
-@lru_cache(maxsize=20)
+@cache_util.registered_cache(maxsize=20)
 def is_image(content: Union[str, ImageData]):
     if isinstance(content, ImageData):
         return True
@@ -69,6 +70,42 @@ def _is_image_path(content: str):
     )
 
 
+_MAX_UNIQUE_FILE_TRIES = 5
+
+
+def open_unique_file(
+    folder: str, file_name: str, extension: str, shard_levels: int = 0
+) -> Optional[Tuple[str, IO]]:
+    """ Atomically creates a new file that does not overwrite an existing one, and returns its path and handle.
+    The plain file name is tried first, after which a random run id is appended, so the cost stays constant
+    however many files with the same name already exist. With shard_levels > 0, the file is always given a run id
+    and is placed in nested subdirectories named after the first hex characters of that id. """
+    for attempt in range(_MAX_UNIQUE_FILE_TRIES):
+        run_id = uuid.uuid4().hex
+        if attempt == 0 and shard_levels <= 0:
+            name = file_name
+        else:
+            name = file_name + "_" + run_id[:12]
+        shards = [run_id[2 * i : 2 * i + 2] for i in range(shard_levels)]
+        target_folder = os.path.join(folder, *shards)
+        pathlib.Path(target_folder).mkdir(parents=True, exist_ok=True)
+
+        fp = os.path.join(target_folder, name + extension)
+        try:
+            return fp, open(fp, "xb")
+        except (FileExistsError, PermissionError):
+            continue
+    return None
+
+
+def remove_unique_file(fp: str):
+    """ Removes a file created by open_unique_file that could not be written, such that no broken file is left """
+    try:
+        os.remove(fp)
+    except OSError as e:
+        logger.warning("Could not remove unwritten file {}: {}".format(fp, e))
+
+
 def show_logs(given_logger: logging.Logger):
     given_logger.setLevel(logging.DEBUG)
     handler = logging.StreamHandler(sys.stdout)
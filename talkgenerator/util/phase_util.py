@@ -0,0 +1,62 @@
+"""
+Marks the main phases of generating a presentation (e.g. slide generation, saving),
+such that benchmarks and profilers can measure them without having to patch the generator itself.
+"""
+import threading
+import time
+from contextlib import contextmanager, ExitStack
+from typing import Callable, ContextManager, List
+
+# Names of the phases that are marked while generating a presentation
+GET_SCHEMA = "get_schema"
+SEED_GENERATION = "seed_generation"
+SLIDE_GENERATION = "slide_generation"
+SAVE_TO_POWERPOINT = "save_to_powerpoint"
+SAVE = "save"
+PHASES = (GET_SCHEMA, SEED_GENERATION, SLIDE_GENERATION, SAVE_TO_POWERPOINT, SAVE)
+
+_listeners: List[Callable[[str, float], None]] = []
+_wrappers: List[Callable[[str], ContextManager]] = []
+_listeners_lock = threading.Lock()
+
+
+def add_phase_listener(listener: Callable[[str, float], None]):
+    """ Calls the listener with the phase name and its duration in seconds every time a phase ends """
+    with _listeners_lock:
+        _listeners.append(listener)
+
+
+def remove_phase_listener(listener: Callable[[str, float], None]):
+    with _listeners_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def add_phase_wrapper(wrapper: Callable[[str], ContextManager]):
+    """ Enters the context manager returned by the wrapper for the phase name around every phase, e.g. to profile it """
+    with _listeners_lock:
+        _wrappers.append(wrapper)
+
+
+def remove_phase_wrapper(wrapper: Callable[[str], ContextManager]):
+    with _listeners_lock:
+        if wrapper in _wrappers:
+            _wrappers.remove(wrapper)
+
+
+@contextmanager
+def phase(name: str):
+    """ Marks the code in this context as the given phase """
+    if not _listeners and not _wrappers:
+        yield
+        return
+    with ExitStack() as wrappers:
+        for wrapper in list(_wrappers):
+            wrappers.enter_context(wrapper(name))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            for listener in list(_listeners):
+                listener(name, duration)
@@ -0,0 +1,83 @@
+"""
+Lexicon with the POS tag of every word of the text templates, tracery grammars and topic list,
+such that tagging these common words does not need the NLTK tagger.
+Building the lexicon requires the NLTK tagger data:
+
+    $ python -m talkgenerator.util.pos_lexicon
+"""
+import logging
+import os
+import re
+from typing import Dict, Iterable, Set
+
+from talkgenerator.util import cache_util
+from talkgenerator.util import os_util
+
+logger = logging.getLogger("talkgenerator")
+
+LEXICON_FILE = "data/pos_lexicon.tsv"
+_TEMPLATES_FOLDER = "data/text-templates/"
+_TOPICS_FILE = "data/eval/common_words.txt"
+
+# Variables of text templates and symbols of tracery grammars are not part of the vocabulary
+_PLACEHOLDER_REGEX = re.compile(r"{[^}]*}|#[^#]*#")
+_WORD_REGEX = re.compile(r"[a-z]+")
+
+
+def collect_vocabulary() -> Set[str]:
+    """ Returns all lowercase words of the text templates, tracery grammars and topic list """
+    words = set()
+    templates_folder = os_util.to_actual_file(_TEMPLATES_FOLDER)
+    for filename in sorted(os.listdir(templates_folder)):
+        with open(os.path.join(templates_folder, filename), encoding="utf-8") as f:
+            text = _PLACEHOLDER_REGEX.sub(" ", f.read())
+        words.update(_WORD_REGEX.findall(text.lower()))
+    words.update(
+        word
+        for word in os_util.read_lines(_TOPICS_FILE)
+        if _WORD_REGEX.fullmatch(word)
+    )
+    return words
+
+
+def build_lexicon(words: Iterable[str]) -> Dict[str, str]:
+    """ Tags every word on its own, like language_util.get_pos_tags does. Words that the tokenizer splits up
+    (e.g. "cannot") are left out, as their tags depend on more than one token """
+    import nltk
+
+    tagger = nltk.tag.PerceptronTagger()
+    lexicon = {}
+    for word in sorted(words):
+        if nltk.word_tokenize(word) == [word]:
+            lexicon[word] = tagger.tag([word])[0][1]
+    return lexicon
+
+
+def save_lexicon(lexicon: Dict[str, str], filename: str = LEXICON_FILE):
+    with open(os_util.to_actual_file(filename), "w", encoding="utf-8") as f:
+        for word in sorted(lexicon):
+            f.write("{}\t{}\n".format(word, lexicon[word]))
+
+
+def load_lexicon(filename: str = LEXICON_FILE) -> Dict[str, str]:
+    with open(os_util.to_actual_file(filename), encoding="utf-8") as f:
+        return dict(line.rstrip("\n").split("\t") for line in f if line.strip())
+
+
+@cache_util.registered_cache(maxsize=1)
+def get_lexicon() -> Dict[str, str]:
+    """ Returns the precomputed lexicon, or an empty one if it was not built yet """
+    try:
+        return load_lexicon()
+    except FileNotFoundError:
+        logger.info(
+            "No POS lexicon found, tagging all words with NLTK."
+            " Build it with: python -m talkgenerator.util.pos_lexicon"
+        )
+        return {}
+
+
+if __name__ == "__main__":
+    built_lexicon = build_lexicon(collect_vocabulary())
+    save_lexicon(built_lexicon)
+    print("Saved the POS tags of {} words".format(len(built_lexicon)))
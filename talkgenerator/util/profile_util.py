@@ -0,0 +1,239 @@
+"""
+Profiles the phases of generating a presentation (see phase_util), writing a profile file per phase.
+
+Two modes are supported:
+- "cprofile": deterministic profiling with cProfile, written as pstats files. Threads started during a phase
+  (e.g. the ThreadPool workers generating slides in parallel) get their own profiler, merged into the phase.
+  From Python 3.12, a single profiler sees all threads, but only one can be active at a time: a phase that starts
+  while another phase is being profiled (e.g. in another pipeline worker) is part of the profile of that phase.
+- "sampling": a light sampling profiler looking at the stacks of all threads, written as collapsed stacks
+  (the input format of flame graph tools). Best suited for threaded runs, as it barely slows them down.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from talkgenerator.util import phase_util
+
+logger = logging.getLogger("talkgenerator")
+
+CPROFILE = "cprofile"
+SAMPLING = "sampling"
+PROFILE_MODES = (CPROFILE, SAMPLING)
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+# From Python 3.12, cProfile uses sys.monitoring, of which only one profiler can be active in the whole process
+_SINGLE_PROFILER = sys.version_info >= (3, 12)
+_process_profile_lock = threading.Lock()
+_process_profile_active = False
+
+
+class _ThreadsProfile(object):
+    """ cProfile of the entering thread, and of all threads started while this profile is active """
+
+    def __init__(self):
+        self._profiles = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def _profile_new_thread(self, frame, event, arg):
+        # Called once in every new thread: the enabled profiler replaces this hook
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def __enter__(self):
+        threading.setprofile(self._profile_new_thread)
+        self._profiles[0].enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._profiles[0].disable()
+        threading.setprofile(None)
+
+    def add_to(self, stats: Optional[pstats.Stats]) -> pstats.Stats:
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+
+class _ProcessProfile(object):
+    """ cProfile of all threads, if no other phase is being profiled already """
+
+    def __init__(self):
+        self._profile: Optional[cProfile.Profile] = None
+
+    def __enter__(self):
+        global _process_profile_active
+        with _process_profile_lock:
+            if _process_profile_active:
+                return self
+            _process_profile_active = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # e.g. a debugger or coverage tool using sys.monitoring
+            logger.warning("Could not profile: {}".format(e))
+            with _process_profile_lock:
+                _process_profile_active = False
+            return self
+        self._profile = profile
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _process_profile_active
+        if self._profile is not None:
+            self._profile.disable()
+            with _process_profile_lock:
+                _process_profile_active = False
+
+    def add_to(self, stats: Optional[pstats.Stats]) -> Optional[pstats.Stats]:
+        if self._profile is None:
+            return stats
+        if stats is None:
+            return pstats.Stats(self._profile)
+        stats.add(self._profile)
+        return stats
+
+
+class _StackSampler(threading.Thread):
+    """ Periodically samples the stacks of all other threads, counting them for every active phase """
+
+    def __init__(self, interval: float):
+        super().__init__(name="talkgenerator-profiler", daemon=True)
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._active_phases: Counter = Counter()
+        self.stacks: Dict[str, Counter] = {}
+
+    def enter_phase(self, phase_name: str):
+        with self._lock:
+            self._active_phases[phase_name] += 1
+            self.stacks.setdefault(phase_name, Counter())
+
+    def exit_phase(self, phase_name: str):
+        with self._lock:
+            self._active_phases[phase_name] -= 1
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            with self._lock:
+                active_phases = [
+                    phase for phase, count in self._active_phases.items() if count > 0
+                ]
+            if not active_phases:
+                continue
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            samples = [
+                _collapse_stack(thread_names.get(thread_id, str(thread_id)), frame)
+                for thread_id, frame in sys._current_frames().items()
+                if thread_id != self.ident
+            ]
+            with self._lock:
+                for phase in active_phases:
+                    self.stacks[phase].update(samples)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _collapse_stack(thread_name: str, frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            "{}@{}:{}".format(
+                code.co_name, os.path.basename(code.co_filename), code.co_firstlineno
+            )
+        )
+        frame = frame.f_back
+    frames.append(thread_name)
+    return ";".join(reversed(frames)).replace(" ", "_")
+
+
+class PhaseProfiler(object):
+    """ Phase wrapper profiling every phase, accumulating the profiles of phases that occur multiple times """
+
+    def __init__(
+        self,
+        output_folder: str,
+        mode: str = CPROFILE,
+        sampling_interval: float = DEFAULT_SAMPLING_INTERVAL,
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError("Unknown profile mode: {}".format(mode))
+        self._output_folder = output_folder
+        self._mode = mode
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        self._sampler = _StackSampler(sampling_interval) if mode == SAMPLING else None
+        if self._sampler:
+            self._sampler.start()
+
+    @contextmanager
+    def __call__(self, phase_name: str):
+        if self._sampler:
+            self._sampler.enter_phase(phase_name)
+            try:
+                yield
+            finally:
+                self._sampler.exit_phase(phase_name)
+            return
+
+        with (_ProcessProfile() if _SINGLE_PROFILER else _ThreadsProfile()) as profile:
+            yield
+        with self._lock:
+            stats = profile.add_to(self._stats.get(phase_name))
+            if stats is not None:
+                self._stats[phase_name] = stats
+
+    def save(self) -> List[str]:
+        """ Writes a pstats or collapsed stacks file per phase to the output folder, returning the files """
+        os.makedirs(self._output_folder, exist_ok=True)
+        files = []
+        if self._sampler:
+            self._sampler.stop()
+            for phase_name, stacks in self._sampler.stacks.items():
+                file_name = os.path.join(self._output_folder, phase_name + ".collapsed")
+                with open(file_name, "w", encoding="utf-8") as file:
+                    for stack, count in sorted(stacks.items()):
+                        file.write("{} {}\n".format(stack, count))
+                files.append(file_name)
+        else:
+            with self._lock:
+                for phase_name, stats in self._stats.items():
+                    file_name = os.path.join(self._output_folder, phase_name + ".pstats")
+                    stats.dump_stats(file_name)
+                    files.append(file_name)
+        logger.info("Saved profiles to {}".format(files))
+        return files
+
+
+@contextmanager
+def profiling(mode: Optional[str], output_folder: str):
+    """ Profiles all phases in this context, and saves the profiles at the end. Does nothing if mode is None """
+    if mode is None:
+        yield None
+        return
+    profiler = PhaseProfiler(output_folder, mode)
+    phase_util.add_phase_wrapper(profiler)
+    try:
+        yield profiler
+    finally:
+        phase_util.remove_phase_wrapper(profiler)
+        profiler.save()
@@ -0,0 +1,207 @@
+"""
+Opt-in tracing of the (nested) generator and source calls used to generate a presentation.
+Every traced call records a span with its parent, seed, outcome and duration,
+which can be exported in the Chrome trace event format (viewable in chrome://tracing or Perfetto).
+"""
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from talkgenerator.util import phase_util
+
+# The tracer receiving all spans, None when tracing is disabled
+_active_tracer: Optional["Tracer"] = None
+
+_MAX_SEED_LENGTH = 100
+
+
+class Span(object):
+    def __init__(self, span_id: int, parent_id: Optional[int]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.outcome = None
+
+    def set_result(self, result):
+        self.outcome = "generated" if result else "nothing"
+
+
+class Tracer(object):
+    """ Collects spans of all threads as Chrome trace events """
+
+    def __init__(self):
+        self._events = []
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def _get_stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, category: str, seed=None):
+        stack = self._get_stack()
+        current_span = Span(next(self._ids), stack[-1].span_id if stack else None)
+        stack.append(current_span)
+        start = time.perf_counter()
+        try:
+            yield current_span
+        except Exception as e:
+            current_span.outcome = "error: " + type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            arguments = {"id": current_span.span_id, "parent": current_span.parent_id}
+            if seed is not None:
+                arguments["seed"] = str(seed)[:_MAX_SEED_LENGTH]
+            if current_span.outcome is not None:
+                arguments["outcome"] = current_span.outcome
+            self._add_event(name, category, start, duration, arguments)
+
+    def _add_event(self, name, category, start, duration, arguments):
+        thread = threading.current_thread()
+        with self._lock:
+            self._thread_names[thread.ident] = thread.name
+            self._events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": self._pid,
+                    "tid": thread.ident,
+                    "args": arguments,
+                }
+            )
+
+    def add_phase(self, phase_name: str, duration: float):
+        """ Phase listener, adding the phases of phase_util to the trace """
+        self._add_event(
+            phase_name, "phase", time.perf_counter() - duration, duration, {}
+        )
+
+    def get_events(self):
+        with self._lock:
+            return list(self._events)
+
+    def to_chrome_trace(self) -> dict:
+        with self._lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": thread_id,
+                    "args": {"name": thread_name},
+                }
+                for thread_id, thread_name in self._thread_names.items()
+            ]
+            return {
+                "traceEvents": metadata + list(self._events),
+                "displayTimeUnit": "ms",
+            }
+
+    def save(self, file_name: str):
+        with open(file_name, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+@contextmanager
+def tracing(tracer: Optional[Tracer]):
+    """ Sends all spans of all threads to the given tracer while in this context. Does nothing if tracer is None """
+    global _active_tracer
+    if tracer is None:
+        yield None
+        return
+    previous_tracer = _active_tracer
+    _active_tracer = tracer
+    phase_util.add_phase_listener(tracer.add_phase)
+    try:
+        yield tracer
+    finally:
+        phase_util.remove_phase_listener(tracer.add_phase)
+        _active_tracer = previous_tracer
+
+
+def is_tracing() -> bool:
+    return _active_tracer is not None
+
+
+@contextmanager
+def span(name: str, category: str, seed=None):
+    """ Records the code in this context as a span while tracing, yields None otherwise """
+    tracer = _active_tracer
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, category, seed) as current_span:
+        yield current_span
+
+
+def _get_seed(arguments):
+    if not arguments:
+        return None
+    if isinstance(arguments[0], dict):
+        return arguments[0].get("seed")
+    return arguments[0]
+
+
+def _call_traced(tracer, name, category, seed, function, args, kwargs):
+    with tracer.span(name, category, seed) as current_span:
+        result = function(*args, **kwargs)
+        current_span.set_result(result)
+        return result
+
+
+def traced(category: str, name: str = None):
+    """ Decorator recording a span for every call of the function while tracing """
+
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            tracer = _active_tracer
+            if tracer is None:
+                return function(*args, **kwargs)
+            return _call_traced(
+                tracer, span_name, category, _get_seed(args), function, args, kwargs
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def traced_method(category: str):
+    """ Decorator recording a span, named after the class of the object, for every call of the method while tracing """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            tracer = _active_tracer
+            if tracer is None:
+                return method(self, *args, **kwargs)
+            return _call_traced(
+                tracer,
+                type(self).__name__,
+                category,
+                _get_seed(args),
+                method,
+                (self,) + args,
+                kwargs,
+            )
+
+        return wrapper
+
+    return decorator
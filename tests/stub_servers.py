@@ -0,0 +1,461 @@
+"""
+Local HTTP servers imitating the external services used by the sources (ConceptNet, phrasefinder, Goodreads,
+Shitpostbot, Wikihow, Reddit, Unsplash, Pixabay, Pexels, Inspirobot and image hosts),
+such that the talk generator can be tested and benchmarked without network access.
+
+Every server has its own latency distribution, error rate and payload size:
+
+    with StubServerFleet({"conceptnet": StubServerConfig(latency=uniform_latency(0.05, 0.2), error_rate=0.1)}):
+        conceptnet.get_weighted_related_words("cat")
+"""
+
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote_plus, urlsplit
+
+from PIL import Image
+
+from talkgenerator import settings
+
+# = LATENCY DISTRIBUTIONS =
+
+
+def constant_latency(seconds: float) -> Callable[[random.Random], float]:
+    return lambda rng: seconds
+
+
+def uniform_latency(minimum: float, maximum: float) -> Callable[[random.Random], float]:
+    return lambda rng: rng.uniform(minimum, maximum)
+
+
+def lognormal_latency(
+    median: float, sigma: float = 0.5
+) -> Callable[[random.Random], float]:
+    """ Long-tailed latency, as typically seen for real web services """
+    return lambda rng: median * rng.lognormvariate(0, sigma)
+
+
+class StubServerConfig(object):
+    """ Behaviour of a stub server.
+    latency: function giving the seconds to wait before answering a request, given a random generator
+    error_rate: chance of answering a request with the error status instead
+    results: number of results in every response (e.g. edges, quotes, photos)
+    payload_size: minimal number of bytes of every response, padded if necessary. Also the size of served images
+    """
+
+    def __init__(
+        self,
+        latency: Callable[[random.Random], float] = constant_latency(0),
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        results: int = 10,
+        payload_size: int = 0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.results = results
+        self.payload_size = payload_size
+
+
+# = RESPONSES =
+
+_WORDS = (
+    "cat dog house tree water book music science coffee cloud river city garden "
+    "light dream robot ocean mountain pizza bicycle history future island rocket"
+).split(" ")
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif")
+
+
+class StubRequest(object):
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        query: Dict[str, str],
+        config: StubServerConfig,
+        images_url: str,
+    ):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.config = config
+        self.images_url = images_url
+        # Same request, same response
+        self.random = random.Random(method + path + json.dumps(query, sort_keys=True))
+
+    def word(self) -> str:
+        return self.random.choice(_WORDS)
+
+    def words(self, number: int) -> str:
+        return " ".join(self.word() for _ in range(number))
+
+    def image_url(self) -> str:
+        return "{}/images/{}.png".format(self.images_url, self.random.randint(0, 10**6))
+
+
+def _json(body) -> Tuple[str, bytes]:
+    return "application/json", json.dumps(body).encode("utf-8")
+
+
+def _html(body: str) -> Tuple[str, bytes]:
+    return "text/html; charset=utf-8", "<html><body>{}</body></html>".format(
+        body
+    ).encode("utf-8")
+
+
+def _conceptnet(request: StubRequest):
+    word = unquote_plus(request.path.rstrip("/").rsplit("/", 1)[-1]).replace("_", " ")
+    relation = request.query.get("rel", "").replace("/r/", "")
+    relations = (
+        [relation]
+        if relation
+        else ["RelatedTo", "AtLocation", "HasA", "HasProperty", "Antonym"]
+    )
+    edges = []
+    for _ in range(request.config.results):
+        other = {"label": request.word(), "language": "en"}
+        own = {"label": word, "language": "en"}
+        start, end = (own, other) if request.random.random() < 0.5 else (other, own)
+        edges.append(
+            {
+                "start": start,
+                "end": end,
+                "rel": {"label": request.random.choice(relations)},
+                "weight": round(request.random.uniform(0.5, 10), 3),
+            }
+        )
+    return _json({"edges": edges})
+
+
+def _phrasefinder(request: StubRequest):
+    query = request.query.get("query", "")
+    phrases = [
+        {"tks": [{"tt": casing}], "mc": request.random.randint(1, 10**7)}
+        for casing in dict.fromkeys((query, query.lower(), query.capitalize()))
+    ]
+    return _json({"phrases": phrases[: max(1, request.config.results)]})
+
+
+def _goodreads(request: StubRequest):
+    quotes = [
+        '<div class="quoteText">&ldquo;{}.&rdquo;<br> &mdash; <span>{}</span></div>'.format(
+            request.words(8).capitalize(), request.words(2).title()
+        )
+        for _ in range(request.config.results)
+    ]
+    return _html("".join(quotes))
+
+
+def _shitpostbot(request: StubRequest):
+    if request.path.lower().endswith(_IMAGE_EXTENSIONS):
+        return _image(request)
+    entries = [
+        '<div class="col-md-4"><img src="/img/sourceimages/{name}.png">'
+        '<div class="caption"><p>{title}</p><p>by <a>{user}</a></p></div>'
+        '<span class="rating">{rating}</span></div>'.format(
+            name=request.random.randint(0, 10**6),
+            title=request.words(3),
+            user=request.word() + "_poster",
+            rating=request.random.randint(-2, 50),
+        )
+        for _ in range(request.config.results)
+    ]
+    return _html("".join(entries))
+
+
+def _wikihow(request: StubRequest):
+    if request.method == "POST":
+        return _html("Logged in")
+    search = request.query.get("search", request.word())
+    if "Special:Search" in request.query.get("title", ""):
+        results = [
+            '<div class="mw-search-result-heading"><a title="How to {} {}">x</a></div>'.format(
+                request.word(), search
+            )
+            for _ in range(request.config.results)
+        ]
+    else:
+        results = [
+            '<a class="result_link"><div class="result_title">How to {} {}</div></a>'.format(
+                request.word().capitalize(), search
+            )
+            for _ in range(request.config.results)
+        ]
+    return _html("".join(results))
+
+
+def _reddit(request: StubRequest):
+    if request.path.endswith("/access_token"):
+        return _json(
+            {
+                "access_token": "stub",
+                "token_type": "bearer",
+                "expires_in": 3600,
+                "scope": "*",
+            }
+        )
+    subreddit = request.path.split("/")[2] if request.path.startswith("/r/") else "pics"
+    children = []
+    for _ in range(request.config.results):
+        post_id = "{:x}".format(request.random.randint(0, 16**6))
+        children.append(
+            {
+                "kind": "t3",
+                "data": {
+                    "id": post_id,
+                    "name": "t3_" + post_id,
+                    "title": request.words(5),
+                    "url": request.image_url(),
+                    "author": request.word() + "_redditor",
+                    "subreddit": subreddit,
+                    "subreddit_name_prefixed": "r/" + subreddit,
+                    "over_18": request.random.random() < 0.1,
+                    "permalink": "/r/{}/comments/{}/".format(subreddit, post_id),
+                },
+            }
+        )
+    return _json(
+        {
+            "kind": "Listing",
+            "data": {"after": None, "before": None, "children": children},
+        }
+    )
+
+
+def _unsplash_photo(request: StubRequest):
+    photo_id = str(request.random.randint(0, 10**6))
+    image_url = request.image_url()
+    return {
+        "id": photo_id,
+        "urls": {"raw": image_url, "full": image_url, "regular": image_url},
+        "links": {"download": image_url, "html": image_url},
+        "user": {"name": request.words(2).title()},
+    }
+
+
+def _unsplash(request: StubRequest):
+    if request.path.startswith("/photos/random"):
+        return _json(_unsplash_photo(request))
+    results = [_unsplash_photo(request) for _ in range(request.config.results)]
+    return _json({"total": len(results), "total_pages": 1, "results": results})
+
+
+def _pixabay(request: StubRequest):
+    hits = [
+        {"largeImageURL": request.image_url(), "user": request.word() + "_pixabay"}
+        for _ in range(request.config.results)
+    ]
+    return _json({"total": len(hits), "totalHits": len(hits), "hits": hits})
+
+
+def _pexels(request: StubRequest):
+    photos = [
+        {
+            "src": {"original": request.image_url(), "large": request.image_url()},
+            "photographer": request.words(2).title(),
+        }
+        for _ in range(request.config.results)
+    ]
+    return _json(
+        {
+            "page": 1,
+            "per_page": len(photos),
+            "total_results": len(photos),
+            "photos": photos,
+        }
+    )
+
+
+_images: Dict[int, bytes] = {}
+_images_lock = threading.Lock()
+
+
+def _image(request: StubRequest):
+    """ PNG of noise, which barely compresses, such that its size is about the payload size """
+    size = request.config.payload_size
+    with _images_lock:
+        if size not in _images:
+            side = max(1, int((size / 3) ** 0.5))
+            noise = random.Random(size)
+            image = Image.frombytes(
+                "RGB",
+                (side, side),
+                bytes(noise.getrandbits(8) for _ in range(side * side * 3)),
+            )
+            output = io.BytesIO()
+            image.save(output, format="PNG")
+            _images[size] = output.getvalue()
+        return "image/png", _images[size]
+
+
+_RESPONDERS = {
+    "conceptnet": _conceptnet,
+    "phrasefinder": _phrasefinder,
+    "goodreads": _goodreads,
+    "shitpostbot": _shitpostbot,
+    "wikihow": _wikihow,
+    "reddit": _reddit,
+    "unsplash": _unsplash,
+    "pixabay": _pixabay,
+    "pexels": _pexels,
+    "inspirobot": _image,
+    "images": _image,
+}
+
+# The services of which the base URL is overridden in the settings. The image host is only used in responses
+SERVICES = tuple(service for service in _RESPONDERS if service != "images")
+
+
+def _pad(content_type: str, body: bytes, payload_size: int) -> bytes:
+    missing = payload_size - len(body)
+    if missing <= 0 or content_type.startswith("image/"):
+        return body
+    if content_type == "application/json":
+        return body[:-1] + ', "padding": "{}"}}'.format("x" * missing).encode("utf-8")
+    return body + "<!-- {} -->".format("x" * missing).encode("utf-8")
+
+
+# = SERVERS =
+
+# Seconds between checks for shutting down, kept short as a fleet stops many servers
+_POLL_INTERVAL = 0.05
+
+
+class StubServer(object):
+    """ Stub of a single service, answering requests in a background thread """
+
+    def __init__(
+        self,
+        service: str,
+        config: StubServerConfig = None,
+        images_url: str = None,
+        seed: int = None,
+    ):
+        self.service = service
+        self.config = config or StubServerConfig()
+        self.images_url = images_url
+        self.requests = 0
+        self._responder = _RESPONDERS[service]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+    def _create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        with self._lock:
+            self.requests += 1
+            latency = self.config.latency(self._random)
+            failed = self._random.random() < self.config.error_rate
+        length = int(handler.headers.get("Content-Length") or 0)
+        if length:
+            handler.rfile.read(length)
+        time.sleep(max(0.0, latency))
+
+        if failed:
+            handler.send_response(self.config.error_status)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        parts = urlsplit(handler.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        request = StubRequest(
+            handler.command, parts.path, query, self.config, self.images_url or self.url
+        )
+        if self.service != "shitpostbot" and parts.path.lower().endswith(
+            _IMAGE_EXTENSIONS
+        ):
+            content_type, body = _image(request)
+        else:
+            content_type, body = self._responder(request)
+        body = _pad(content_type, body, self.config.payload_size)
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            args=(_POLL_INTERVAL,),
+            name="stub-" + self.service,
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class StubServerFleet(object):
+    """ Starts a stub server for every service and points the sources to them while in this context """
+
+    def __init__(
+        self,
+        configs: Dict[str, StubServerConfig] = None,
+        default_config: StubServerConfig = None,
+        seed: Optional[int] = None,
+    ):
+        configs = configs or {}
+        default_config = default_config or StubServerConfig()
+        self.images = StubServer(
+            "images", configs.get("images", default_config), seed=seed
+        )
+        self.servers: Dict[str, StubServer] = {
+            service: StubServer(
+                service, configs.get(service, default_config), self.images.url, seed
+            )
+            for service in SERVICES
+        }
+
+    def get_url(self, service: str) -> str:
+        return self.images.url if service == "images" else self.servers[service].url
+
+    def get_request_counts(self) -> Dict[str, int]:
+        counts = {service: server.requests for service, server in self.servers.items()}
+        counts["images"] = self.images.requests
+        return counts
+
+    def __enter__(self):
+        self.images.start()
+        for service, server in self.servers.items():
+            server.start()
+            settings.set_base_url(service, server.url)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for service, server in self.servers.items():
+            settings.set_base_url(service, None)
+            server.stop()
+        self.images.stop()
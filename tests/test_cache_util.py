@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+from talkgenerator.util import cache_util
+
+
+class CacheUtilTest(unittest.TestCase):
+    def test_least_recently_used_and_resize(self):
+        calls = []
+
+        @cache_util.registered_cache(maxsize=3, name="test_lru")
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        for x in (1, 2, 3, 1, 4):
+            square(x)
+        self.assertEqual(cache_util.CacheInfo(1, 4, 3, 3), square.cache_info())
+
+        # 2 was the least recently used, 1 was used again
+        square(1)
+        square(2)
+        self.assertEqual([1, 2, 3, 4, 2], calls)
+
+        square.resize(1)
+        self.assertEqual(1, square.cache_info().currsize)
+        square(2)
+        self.assertEqual([1, 2, 3, 4, 2], calls)
+
+    def test_registry(self):
+        @cache_util.registered_cache(maxsize=10, name="test_registry")
+        def text(length, character="x"):
+            return character * length
+
+        text(1000)
+        text(1000, character="y")
+        report = {
+            cache_report["name"]: cache_report
+            for cache_report in cache_util.get_cache_report()
+        }
+        self.assertEqual(2, report["test_registry"]["entries"])
+        self.assertGreater(report["test_registry"]["approximate_bytes"], 2000)
+
+        cache_util.resize_cache("test_registry", 20)
+        self.assertEqual(20, text.cache_info().maxsize)
+        cache_util.clear_caches()
+        self.assertEqual(0, text.cache_info().currsize)
+        self.assertRaises(KeyError, cache_util.get_cache, "unknown")
+
+    def test_thread_hits(self):
+        @cache_util.registered_cache(maxsize=10, name="test_thread_hits")
+        def identity(x):
+            return x
+
+        identity(1)
+        identity(1)
+        other_thread = threading.Thread(target=identity, args=(1,))
+        other_thread.start()
+        other_thread.join()
+        self.assertEqual(1, identity.get_thread_hits())
+        self.assertEqual(2, identity.cache_info().hits)
+
+    def test_cached_method(self):
+        class Counter(object):
+            def __init__(self):
+                self.count = 0
+
+            @cache_util.registered_cache(name="test_method")
+            def increase(self, amount):
+                self.count += amount
+                return self.count
+
+        counter = Counter()
+        self.assertEqual(2, counter.increase(2))
+        self.assertEqual(2, counter.increase(2))
+        self.assertEqual(1, Counter().increase(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 import random
+import threading
 import unittest
+from unittest import mock
 
 from talkgenerator.util import language_util
+from talkgenerator.util import pos_lexicon
 
 
 class LanguageUtilTest(unittest.TestCase):
@@ -30,6 +33,16 @@ class LanguageUtilTest(unittest.TestCase):
         self.assertEqual("cat", language_util.to_singular("cat"))
         self.assertEqual("cat", language_util.to_singular("cats"))
 
+    def test_apply_to_all(self):
+        self.assertEqual(
+            ["cats", "dogs", "cats"],
+            language_util.apply_to_all(language_util.to_plural, ["cat", "dog", "cat"]),
+        )
+        self.assertEqual(
+            ["an Egg", "a cat"],
+            language_util.apply_to_all(language_util.add_article, ["Egg", "cat"]),
+        )
+
     def test_ing(self):
         self.assertEqual("toying", language_util.to_ing_form("toy"))
         self.assertEqual("playing", language_util.to_ing_form("play"))
@@ -97,11 +110,102 @@ class LanguageUtilTest(unittest.TestCase):
             "your cat", language_util.get_last_noun_and_article("do you like your cat")
         )
 
+    def test_phrase_tagged_once(self):
+        tags = {"act": "VB", "like": "IN", "a": "DT", "cat": "NN"}
+        tagger = mock.Mock()
+        tagger.tag.side_effect = lambda tokens: [(t, tags[t]) for t in tokens]
+        language_util._tokenize.cache_clear()
+        language_util._tag_tokens.cache_clear()
+        try:
+            with mock.patch("nltk.word_tokenize", str.split), mock.patch.object(
+                language_util, "_load_nltk", return_value=tagger
+            ), mock.patch.object(pos_lexicon, "get_lexicon", return_value={}):
+                self.assertEqual(
+                    [["VB"], ["IN"], ["DT"], ["NN"]],
+                    language_util.get_pos_tags_of_words(["act", "like", "a", "cat"]),
+                )
+                self.assertEqual(
+                    "acting like a cat",
+                    language_util.to_present_participle("act like a cat"),
+                )
+                self.assertEqual(
+                    "a cat", language_util.get_last_noun_and_article("act like a cat")
+                )
+                self.assertTrue(language_util.is_noun("cat"))
+                self.assertTrue(language_util.is_noun("cat"))
+            self.assertEqual(2, tagger.tag.call_count)
+        finally:
+            language_util._tokenize.cache_clear()
+            language_util._tag_tokens.cache_clear()
+
+    def test_lexicon_words_skip_tagger(self):
+        lexicon = {"cat": "NN", "see": "VB"}
+        with mock.patch.object(
+            language_util, "_load_nltk"
+        ) as load_nltk, mock.patch.object(
+            pos_lexicon, "get_lexicon", return_value=lexicon
+        ):
+            self.assertTrue(language_util.is_noun("cat"))
+            self.assertTrue(language_util.is_verb("see"))
+            self.assertEqual("seeing", language_util.to_present_participle("see"))
+            self.assertEqual((("Cat", "NN"),), language_util.tag_phrase("Cat"))
+        load_nltk.assert_not_called()
+
+    def test_nltk_loaded_once(self):
+        with mock.patch.object(language_util, "_tagger", None), mock.patch.object(
+            language_util, "_nltk_error", None
+        ), mock.patch(
+            "nltk.tag.PerceptronTagger"
+        ) as perceptron_tagger, mock.patch("nltk.word_tokenize"), mock.patch.object(
+            language_util, "check_and_download"
+        ):
+            threads = [threading.Thread(target=language_util.preload) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            perceptron_tagger.assert_called_once_with()
+
+    def test_failed_nltk_load_retried_after_backoff(self):
+        with mock.patch.object(language_util, "_tagger", None), mock.patch.object(
+            language_util, "_nltk_error", None
+        ), mock.patch.object(language_util, "_nltk_failure_time", 0.0), mock.patch(
+            "nltk.word_tokenize", side_effect=LookupError("punkt not found")
+        ), mock.patch.object(
+            language_util, "check_and_download"
+        ) as check_and_download, mock.patch.object(
+            language_util.time, "monotonic", return_value=1000.0
+        ) as monotonic:
+            for _ in range(3):
+                self.assertRaises(LookupError, language_util.preload)
+            check_and_download.assert_called_once_with()
+
+            monotonic.return_value = 1000.0 + language_util.NLTK_RETRY_SECONDS
+            self.assertRaises(LookupError, language_util.preload)
+            self.assertEqual(2, check_and_download.call_count)
+
+    def test_inflect_engine_attribute(self):
+        with mock.patch.object(
+            language_util, "get_inflect_engine", return_value="engine"
+        ):
+            self.assertEqual("engine", language_util.inflect_engine)
+        self.assertRaises(AttributeError, getattr, language_util, "unknown_engine")
+
     def test_replace_pronouns(self):
         self.assertEqual(
             "I care about me and my family",
             language_util.second_to_first_pronouns("I care about you and your family"),
         )
+        self.assertEqual(
+            "Is that MINE or my cat? Me, me!",
+            language_util.second_to_first_pronouns(
+                "Is that YOURS or your cat? You, you!"
+            ),
+        )
+        self.assertEqual(
+            "youth stays youth",
+            language_util.second_to_first_pronouns("youth stays youth"),
+        )
 
         # def test_is_noun(self):
         #     self.assertTrue(language_util.is_noun("cat"))
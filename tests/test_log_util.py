@@ -0,0 +1,64 @@
+import logging
+import threading
+import unittest
+
+from talkgenerator.util import log_util
+
+
+class _Unrenderable(object):
+    def __str__(self):
+        raise AssertionError("Rendered a field of a disabled debug event")
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class LogUtilTest(unittest.TestCase):
+    def setUp(self):
+        self.name = "talkgenerator.test_log_util"
+        self.logger = logging.getLogger(self.name)
+        self.logger.setLevel(logging.INFO)
+        self.handler = _RecordingHandler()
+        self.logger.addHandler(self.handler)
+        self.debug = log_util.DebugLogger(self.name)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(logging.NOTSET)
+        log_util.reset_sample_rates()
+
+    def test_disabled_debug_events_are_not_rendered(self):
+        self.debug("generated", generated=_Unrenderable())
+        self.assertEqual([], self.handler.messages)
+
+    def test_structured_message(self):
+        self.logger.setLevel(logging.DEBUG)
+        self.debug("generated", seed="cat", retry=2)
+        self.assertEqual(["generated seed='cat' retry=2"], self.handler.messages)
+
+    def test_sampling(self):
+        self.logger.setLevel(logging.DEBUG)
+        log_util.set_sample_rate(self.name, 0)
+        for _ in range(10):
+            self.debug("sampled")
+        self.assertEqual([], self.handler.messages)
+
+    def test_debugging_only_current_thread(self):
+        log_util.set_sample_rate(self.name, 0)
+        with log_util.debugging():
+            self.debug("forced")
+            other_thread = threading.Thread(target=self.debug, args=("other",))
+            other_thread.start()
+            other_thread.join()
+        self.debug("after")
+        self.assertEqual(["forced"], self.handler.messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import unittest
+
+from talkgenerator.util import cache_util
+from talkgenerator.util import metrics_util
+from talkgenerator.util.metrics_util import MetricsRegistry
+
+
+class MetricsUtilTest(unittest.TestCase):
+    def setUp(self) -> None:
+        metrics_util.registry.reset()
+
+    def test_counters_and_histograms(self):
+        registry = MetricsRegistry(buckets=(0.1, 1))
+        registry.increment("calls_total", source="a")
+        registry.increment("calls_total", 2, source="a")
+        registry.observe("seconds", 0.5, source="a")
+        registry.observe("seconds", 5, source="a")
+
+        self.assertEqual(3, registry.get_counter("calls_total", source="a"))
+        self.assertEqual(0, registry.get_counter("calls_total", source="b"))
+
+        histogram = json.loads(registry.to_json())["histograms"][0]
+        self.assertEqual(2, histogram["count"])
+        self.assertEqual({"0.1": 0, "1": 1, "+Inf": 2}, histogram["buckets"])
+
+    def test_prometheus_format(self):
+        registry = MetricsRegistry(buckets=(1,))
+        registry.increment(metrics_util.SOURCE_CALLS, source='say "hi"')
+        registry.observe(metrics_util.SOURCE_SECONDS, 0.5, source="a")
+        lines = registry.to_prometheus().splitlines()
+        self.assertIn("# TYPE talkgenerator_source_calls_total counter", lines)
+        self.assertIn(
+            'talkgenerator_source_calls_total{source="say \\"hi\\""} 1', lines
+        )
+        self.assertIn(
+            'talkgenerator_source_seconds_bucket{source="a",le="+Inf"} 1', lines
+        )
+        self.assertIn('talkgenerator_source_seconds_count{source="a"} 1', lines)
+
+    def test_measured_source(self):
+        @metrics_util.measured_source
+        @cache_util.registered_cache(maxsize=10, name="test_measured_source")
+        def search(word):
+            metrics_util.count_source_bytes(len(word))
+            if not word:
+                raise ValueError()
+            return word
+
+        search("cat")
+        search("cat")
+        self.assertRaises(ValueError, search, "")
+
+        source = "test_metrics_util.MetricsUtilTest.test_measured_source.<locals>.search"
+        registry = metrics_util.registry
+        self.assertEqual(3, registry.get_counter(metrics_util.SOURCE_CALLS, source=source))
+        self.assertEqual(1, registry.get_counter(metrics_util.SOURCE_CACHE_HITS, source=source))
+        self.assertEqual(1, registry.get_counter(metrics_util.SOURCE_ERRORS, source=source))
+        self.assertEqual(3, registry.get_counter(metrics_util.SOURCE_BYTES, source=source))
+        self.assertEqual(
+            3, registry.get_histogram_count(metrics_util.SOURCE_SECONDS, source=source)
+        )
+        self.assertEqual(1, search.cache_info().hits)
+        self.assertIsNone(metrics_util.get_current_source())
+
+    def test_source_usage(self):
+        @metrics_util.measured_source
+        @cache_util.registered_cache(maxsize=10, name="test_source_usage")
+        def search(word):
+            metrics_util.count_source_bytes(len(word))
+            return word
+
+        usage = metrics_util.SourceUsage(max_calls=2)
+        with metrics_util.using_source_usage(usage):
+            search("cat")
+            search("cat")
+            self.assertFalse(metrics_util.is_source_budget_exhausted())
+            search("dog")
+            self.assertTrue(metrics_util.is_source_budget_exhausted())
+        self.assertFalse(metrics_util.is_source_budget_exhausted())
+        search("bird")
+
+        usage_dict = usage.to_dictionary()
+        self.assertEqual(2, usage_dict["total"]["calls"])
+        self.assertEqual(6, usage_dict["total"]["bytes"])
+        self.assertEqual(
+            usage_dict,
+            metrics_util.SourceUsage.from_dictionary(usage_dict).to_dictionary(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from talkgenerator import generator
+from talkgenerator.util import os_util
+
+
+class OsUtilTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+
+    def _create(self, file_name, shard_levels=0):
+        fp, file = os_util.open_unique_file(
+            self.folder, file_name, ".pptx", shard_levels
+        )
+        with file:
+            file.write(b"test")
+        return fp
+
+    def test_unique_file_uses_plain_name_first(self):
+        fp = self._create("cat")
+        self.assertEqual(os.path.join(self.folder, "cat.pptx"), fp)
+
+    def test_unique_file_never_overwrites(self):
+        paths = {self._create("cat") for _ in range(20)}
+        self.assertEqual(20, len(paths))
+        self.assertEqual(20, len(os.listdir(self.folder)))
+
+    def test_unique_file_sharded(self):
+        fp = self._create("cat", shard_levels=2)
+        relative_parts = os.path.relpath(fp, self.folder).split(os.sep)
+        self.assertEqual(3, len(relative_parts))
+        self.assertTrue(relative_parts[-1].startswith("cat_"))
+        self.assertTrue(os.path.isfile(fp))
+
+    def test_remove_unique_file(self):
+        fp, file = os_util.open_unique_file(self.folder, "cat", ".pptx")
+        file.close()
+        os_util.remove_unique_file(fp)
+        self.assertEqual([], os.listdir(self.folder))
+        # A file that is already gone is not an error
+        os_util.remove_unique_file(fp)
+
+    def test_failed_save_leaves_no_file(self):
+        prs = mock.Mock()
+        prs.save.side_effect = OSError("disk full")
+        with self.assertRaises(OSError):
+            generator.save_presentation_to_pptx(self.folder, "cat", prs)
+        self.assertEqual([], os.listdir(self.folder))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import threading
+import unittest
+
+from talkgenerator.util import phase_util
+
+
+class PhaseUtilTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.recorded = []
+        self.listener = lambda name, duration: self.recorded.append((name, duration))
+        phase_util.add_phase_listener(self.listener)
+
+    def tearDown(self) -> None:
+        phase_util.remove_phase_listener(self.listener)
+
+    def test_phase_notifies_listeners(self):
+        with phase_util.phase(phase_util.SAVE):
+            pass
+        self.assertEqual(1, len(self.recorded))
+        self.assertEqual(phase_util.SAVE, self.recorded[0][0])
+        self.assertGreaterEqual(self.recorded[0][1], 0)
+
+    def _run_save_phase(self):
+        with phase_util.phase(phase_util.SAVE):
+            pass
+
+    def test_phase_notifies_on_error_and_from_threads(self):
+        def fail():
+            with phase_util.phase(phase_util.SLIDE_GENERATION):
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        thread = threading.Thread(target=self._run_save_phase)
+        thread.start()
+        thread.join()
+        self.assertEqual(
+            [phase_util.SLIDE_GENERATION, phase_util.SAVE],
+            [name for name, _ in self.recorded],
+        )
+
+    def test_removed_listener_is_not_notified(self):
+        phase_util.remove_phase_listener(self.listener)
+        with phase_util.phase(phase_util.SAVE):
+            pass
+        self.assertEqual([], self.recorded)
+
+
+if __name__ == "__main__":
+    unittest.main()
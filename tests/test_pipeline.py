@@ -0,0 +1,119 @@
+import threading
+import unittest
+from unittest import mock
+
+from talkgenerator import pipeline
+
+
+class PipelineTest(unittest.TestCase):
+    def test_generation_overlaps_rendering(self):
+        events = []
+        lock = threading.Lock()
+        generated_b = threading.Event()
+
+        def generate_slide_deck(topic, **_):
+            with lock:
+                events.append(("generate", topic))
+            if topic == "b":
+                generated_b.set()
+            return topic
+
+        def render_slide_deck(slide_deck, **_):
+            # Only finishes rendering the first deck when the next one is generated in the meantime
+            if slide_deck == "a":
+                overlapped = generated_b.wait(timeout=5)
+                with lock:
+                    events.append(("overlapped", overlapped))
+            with lock:
+                events.append(("render", slide_deck))
+            return None, slide_deck + ".pptx"
+
+        with mock.patch.object(
+            pipeline.generator, "generate_slide_deck", generate_slide_deck
+        ), mock.patch.object(
+            pipeline.generator, "render_slide_deck", render_slide_deck
+        ):
+            results = pipeline.generate_presentations(
+                [{"topic": topic, "schema": "default"} for topic in "abcd"],
+                generation_workers=1,
+                rendering_workers=1,
+            )
+
+        self.assertEqual(
+            [("a.pptx", "a"), ("b.pptx", "b"), ("c.pptx", "c"), ("d.pptx", "d")],
+            results,
+        )
+        self.assertEqual(9, len(events))
+        self.assertIn(("overlapped", True), events)
+        self.assertLess(events.index(("generate", "b")), events.index(("render", "a")))
+
+    def test_workers_preload_language_models(self):
+        with mock.patch.object(
+            pipeline.generator, "generate_slide_deck", lambda **_: "deck"
+        ), mock.patch.object(
+            pipeline.generator, "render_slide_deck", lambda deck, **_: (None, "deck.pptx")
+        ), mock.patch.object(
+            pipeline.language_util, "preload", side_effect=LookupError("no NLTK data")
+        ) as preload:
+            results = pipeline.generate_presentations(
+                [{"topic": "cat", "schema": "default"}], generation_workers=1
+            )
+        preload.assert_called_once_with()
+        self.assertEqual([("deck.pptx", "deck")], results)
+
+    def test_failing_render_submission(self):
+        with mock.patch.object(
+            pipeline.generator, "generate_slide_deck", lambda **_: "deck"
+        ):
+            presentation_pipeline = pipeline.PresentationPipeline(
+                generation_workers=1, rendering_workers=1, max_queued_renders=0
+            )
+            with mock.patch.object(
+                presentation_pipeline._rendering_executor,
+                "submit",
+                side_effect=RuntimeError("shut down"),
+            ):
+                futures = [presentation_pipeline.submit(topic="cat") for _ in range(3)]
+                for future in futures:
+                    with self.assertRaises(RuntimeError):
+                        future.result(timeout=5)
+            presentation_pipeline.close()
+
+    def test_seed_needs_single_generation_worker(self):
+        with pipeline.PresentationPipeline(generation_workers=2) as presentation_pipeline:
+            future = presentation_pipeline.submit(topic="cat", int_seed=1)
+        with self.assertRaises(ValueError):
+            future.result()
+
+    def test_unknown_arguments(self):
+        with pipeline.PresentationPipeline() as presentation_pipeline:
+            future = presentation_pipeline.submit(topic="cat", unknown_argument=1)
+        with self.assertRaises(ValueError):
+            future.result()
+
+    def test_ignored_arguments(self):
+        with mock.patch.object(
+            pipeline.generator, "generate_slide_deck"
+        ) as generate_slide_deck, mock.patch.object(
+            pipeline.generator, "render_slide_deck", return_value=(None, None)
+        ) as render_slide_deck, mock.patch.object(
+            pipeline.language_util, "preload"
+        ):
+            with pipeline.PresentationPipeline() as presentation_pipeline:
+                future = presentation_pipeline.submit(
+                    topic="cat",
+                    save_ppt=False,
+                    open_ppt=True,
+                    print_logs=True,
+                    profile="cprofile",
+                    profile_folder="profile",
+                )
+            self.assertEqual((None, generate_slide_deck.return_value), future.result())
+        generate_slide_deck.assert_called_once_with(topic="cat")
+        render_slide_deck.assert_called_once_with(
+            generate_slide_deck.return_value, save_ppt=False
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import tempfile
+import unittest
+
+from talkgenerator.util import pos_lexicon
+
+
+class PosLexiconTest(unittest.TestCase):
+    def test_collect_vocabulary(self):
+        vocabulary = pos_lexicon.collect_vocabulary()
+        # From the templates, the tracery grammars and the topics
+        self.assertIn("inspiration", vocabulary)
+        self.assertIn("blockchain", vocabulary)
+        self.assertIn("government", vocabulary)
+        # Not the variables of the templates
+        self.assertNotIn("wikihow_action", vocabulary)
+        self.assertTrue(all(word.islower() for word in vocabulary))
+
+    def test_save_and_load(self):
+        lexicon = {"cat": "NN", "see": "VB"}
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "pos_lexicon.tsv")
+            pos_lexicon.save_lexicon(lexicon, filename)
+            self.assertEqual(lexicon, pos_lexicon.load_lexicon(filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
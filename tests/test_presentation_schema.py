@@ -0,0 +1,300 @@
+import random
+import unittest
+import unittest.mock
+
+from talkgenerator.datastructures.slide_generator_data import SlideGeneratorData
+from talkgenerator.schema import presentation_schema_types
+from talkgenerator.schema.presentation_schema import PresentationSchema
+from talkgenerator.schema.slide_topic_generators import IdentityTopicGenerator
+from talkgenerator.slide import powerpoint_slide_creator
+from talkgenerator.slide import slide_generator_types
+from talkgenerator.slide.slide_deck import SlideDeck
+from talkgenerator.util import generator_util
+from talkgenerator.util import metrics_util
+
+
+def _counting_title_generator():
+    counter = {"count": 0}
+
+    def generate(presentation_context):
+        counter["count"] += 1
+        return presentation_context["seed"] + " " + str(counter["count"])
+
+    return generate
+
+
+@metrics_util.measured_source
+def _search_title(presentation_context):
+    return "About " + presentation_context["seed"]
+
+
+def create_offline_schema():
+    return PresentationSchema(
+        powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
+        seed_generator=IdentityTopicGenerator,
+        title_generator=generator_util.IdentityGenerator("Offline talk"),
+        slide_generators=[
+            SlideGeneratorData(
+                slide_generator_types.TitleSlideGenerator.of(
+                    _counting_title_generator(),
+                    generator_util.StaticGenerator("subtitle"),
+                ),
+                allowed_repeated_elements=1,
+                tags=["title"],
+                name="Counting title",
+            )
+        ],
+    )
+
+
+class PresentationSchemaTest(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(123)
+        self.schema = create_offline_schema()
+
+    def test_deck_keeps_generation_state(self):
+        _, slide_deck = self.schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous", save_ppt=False
+        )
+        self.assertTrue(slide_deck.is_complete())
+        self.assertEqual("cat", slide_deck.get_seed(1))
+        self.assertEqual({"title": 3}, slide_deck.get_used_tags())
+        self.assertEqual({"title": 2}, slide_deck.get_used_tags(excluded_slide_index=0))
+
+    def test_regenerate_single_slide(self):
+        presentation, slide_deck = self.schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous"
+        )
+        before = slide_deck.to_slide_deck_dictionary()
+
+        self.schema.regenerate_slide(slide_deck, 1)
+        slide_deck.save_slide_to_powerpoint(presentation, 1)
+
+        after = slide_deck.to_slide_deck_dictionary()
+        self.assertEqual(before[0], after[0])
+        self.assertEqual(before[2], after[2])
+        self.assertNotEqual(before[1]["title"], after[1]["title"])
+
+        self.assertEqual(3, len(presentation.slides))
+        self.assertEqual(
+            after[1]["title"], presentation.slides[1].shapes.title.text
+        )
+        self.assertEqual(
+            before[2]["title"], presentation.slides[2].shapes.title.text
+        )
+
+    def test_regenerate_serialized_deck(self):
+        _, slide_deck = self.schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous", save_ppt=False
+        )
+        loaded = SlideDeck.from_json(
+            slide_deck.to_json(), self.schema.get_slide_generator
+        )
+        self.assertEqual({"title": 3}, loaded.get_used_tags())
+
+        self.schema.regenerate_slide(loaded, 2)
+        self.assertEqual(
+            slide_deck.to_slide_deck_dictionary()[0],
+            loaded.to_slide_deck_dictionary()[0],
+        )
+        self.assertNotEqual(
+            slide_deck.to_slide_deck_dictionary()[2],
+            loaded.to_slide_deck_dictionary()[2],
+        )
+
+    def test_deck_with_missing_slide(self):
+        _, slide_deck = self.schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous", save_ppt=False
+        )
+        partial_deck = SlideDeck(3, slide_deck.get_presentation_context())
+        for i in (0, 2):
+            partial_deck.add_slide(
+                i,
+                slide_deck.get_slide(i),
+                slide_deck.get_generated_elements(i),
+                slide_deck.get_slide_generator(i),
+                "seed " + str(i),
+            )
+        presentation = self.schema.render_presentation(partial_deck)
+        self.assertEqual(2, len(partial_deck.get_structured_data()))
+        self.assertTrue(partial_deck.has_slide_nr(2))
+
+        loaded = SlideDeck.from_json(
+            partial_deck.to_json(), self.schema.get_slide_generator
+        )
+        self.assertFalse(loaded.has_slide_nr(1))
+        self.assertEqual(["seed 0", None, "seed 2"], [loaded.get_seed(i) for i in range(3)])
+        self.assertEqual(
+            partial_deck.to_slide_deck_dictionary(), loaded.to_slide_deck_dictionary()
+        )
+        self.assertIsNotNone(loaded.get_slide_generator(2))
+
+        self.schema.regenerate_slide(partial_deck, 1)
+        partial_deck.save_slide_to_powerpoint(presentation, 1)
+        self.assertTrue(partial_deck.is_complete())
+        self.assertEqual(
+            [partial_deck.get_slide(i).to_slide_dictionary()["title"] for i in range(3)],
+            [ppt_slide.shapes.title.text for ppt_slide in presentation.slides],
+        )
+
+    def test_regenerate_slide_attempts(self):
+        _, slide_deck = self.schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous", save_ppt=False
+        )
+        before = slide_deck.to_slide_deck_dictionary()
+        with unittest.mock.patch.object(
+            self.schema, "generate_slide", return_value=None
+        ) as generate_slide:
+            self.assertRaises(
+                ValueError, self.schema.regenerate_slide, slide_deck, 1, attempts=3
+            )
+        self.assertEqual(3, generate_slide.call_count)
+        self.assertEqual(before, slide_deck.to_slide_deck_dictionary())
+
+    def test_slide_generator_metrics(self):
+        metrics_util.registry.reset()
+        self.schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous", save_ppt=False
+        )
+        registry = metrics_util.registry
+        self.assertEqual(
+            3,
+            registry.get_counter(
+                metrics_util.GENERATOR_SUCCESSES, generator="Counting title"
+            ),
+        )
+        self.assertEqual(
+            3,
+            registry.get_histogram_count(
+                metrics_util.GENERATOR_SECONDS, generator="Counting title"
+            ),
+        )
+
+    def test_external_calls_of_deck(self):
+        schema = create_offline_schema()
+        schema._title_generator = _search_title
+        _, slide_deck = schema.generate_presentation(
+            ["cat"], 3, presenter="A. Nonymous", save_ppt=False
+        )
+        self.assertEqual(1, slide_deck.get_source_usage().get_total_calls())
+
+        loaded = SlideDeck.from_json(slide_deck.to_json())
+        self.assertEqual(
+            {"_search_title": {"calls": 1, "bytes": 0, "seconds": unittest.mock.ANY}},
+            {
+                source.rsplit(".", 1)[-1]: usage
+                for source, usage in loaded.get_source_usage()
+                .to_dictionary()["sources"]
+                .items()
+            },
+        )
+
+    def test_external_call_budget_stops_retries(self):
+        # Always generates an already used title, so it keeps retrying
+        slide_generator = SlideGeneratorData(
+            slide_generator_types.TitleSlideGenerator.of(
+                _search_title, generator_util.StaticGenerator("subtitle")
+            ),
+            retries=5,
+            name="Searching title",
+        )
+        used_elements = {"About cat", "subtitle"}
+
+        unlimited = metrics_util.SourceUsage()
+        with metrics_util.using_source_usage(unlimited):
+            self.assertIsNone(slide_generator.generate({"seed": "cat"}, used_elements))
+        budget = metrics_util.SourceUsage(max_calls=2)
+        with metrics_util.using_source_usage(budget):
+            self.assertIsNone(slide_generator.generate({"seed": "cat"}, used_elements))
+
+        self.assertEqual(5, unlimited.get_total_calls())
+        self.assertEqual(2, budget.get_total_calls())
+
+    def test_external_call_budget_stops_deck(self):
+        schema = create_offline_schema()
+        schema._slide_generators[0] = SlideGeneratorData(
+            slide_generator_types.TitleSlideGenerator.of(
+                _search_title, generator_util.StaticGenerator("subtitle")
+            ),
+            retries=5,
+            name="Searching title",
+        )
+        _, slide_deck = schema.generate_presentation(
+            ["cat"], 3, save_ppt=False, max_external_calls=1
+        )
+        self.assertEqual(1, slide_deck.get_source_usage().get_total_calls())
+        self.assertFalse(slide_deck.is_complete())
+        self.assertEqual("cat", slide_deck.get_seed(2))
+
+        # Each parallel slide worker may start its first attempt before the budget is used up
+        _, slide_deck = schema.generate_presentation(
+            ["cat"], 3, save_ppt=False, parallel=True, max_external_calls=1
+        )
+        self.assertLessEqual(slide_deck.get_source_usage().get_total_calls(), 3)
+        self.assertFalse(slide_deck.is_complete())
+
+        schema.regenerate_slide(slide_deck, 2)
+        self.assertFalse(slide_deck.has_slide_nr(2))
+
+    def test_used_tags_prohibit_generators(self):
+        title = SlideGeneratorData(
+            generator_util.IdentityGenerator("title"), tags=["title"], name="title"
+        )
+        quote = SlideGeneratorData(
+            generator_util.IdentityGenerator("quote"),
+            tags=["quote", "statement"],
+            name="quote",
+        )
+        schema = PresentationSchema(
+            powerpoint_creator=powerpoint_slide_creator.create_new_powerpoint,
+            seed_generator=IdentityTopicGenerator,
+            title_generator=None,
+            slide_generators=[title, quote],
+            max_allowed_tags={"title": 1, "statement": 0.2},
+        )
+
+        used_tags = schema._create_used_tags(10)
+        self.assertEqual(set(), used_tags.get_prohibited_generators())
+        used_tags.add_tags(title.get_tags())
+        self.assertEqual({title}, used_tags.get_prohibited_generators())
+        used_tags.add_tags(quote.get_tags())
+        self.assertFalse(used_tags.is_prohibited(quote))
+        used_tags.add_tags(quote.get_tags())
+        self.assertTrue(used_tags.is_prohibited(quote))
+        self.assertEqual(
+            {"title": 1, "quote": 2, "statement": 2}, used_tags.to_dictionary()
+        )
+
+        regenerated_tags = schema._create_used_tags(10, {"statement": 2})
+        self.assertEqual({quote}, regenerated_tags.get_prohibited_generators())
+        self.assertEqual(
+            [(1, title)],
+            schema._get_weighted_generators_for_slide_nr(
+                0, 10, regenerated_tags.get_prohibited_generators()
+            ),
+        )
+
+    def test_registered_schema_created_on_first_use(self):
+        created = []
+
+        def create_schema():
+            created.append(True)
+            return create_offline_schema()
+
+        presentation_schema_types.register_schema("test_lazy", create_schema)
+        self.assertEqual([], created)
+        schema = presentation_schema_types.get_schema("test_lazy")
+        self.assertIs(schema, presentation_schema_types.get_schema("test_lazy"))
+        self.assertEqual([True], created)
+
+    def test_schema_module_attributes(self):
+        schema = create_offline_schema()
+        with unittest.mock.patch.dict(presentation_schema_types.schemas, {"ted": schema}):
+            self.assertIs(schema, presentation_schema_types.ted_schema)
+        self.assertRaises(
+            AttributeError, getattr, presentation_schema_types, "unknown_schema"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from talkgenerator import pipeline
+from talkgenerator.util import phase_util
+from talkgenerator.util import profile_util
+
+
+def _work_in_thread():
+    def work():
+        sum(range(10000))
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+
+
+def _sleep_in_thread():
+    thread = threading.Thread(target=time.sleep, args=(0.1,), name="sleeper")
+    thread.start()
+    thread.join()
+
+
+class ProfileUtilTest(unittest.TestCase):
+    def test_no_profiling_without_mode(self):
+        with profile_util.profiling(None, "unused") as profiler:
+            self.assertIsNone(profiler)
+
+    def test_cprofile_includes_new_threads(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with profile_util.profiling(profile_util.CPROFILE, folder):
+                with phase_util.phase(phase_util.SLIDE_GENERATION):
+                    _work_in_thread()
+
+            file_name = os.path.join(folder, phase_util.SLIDE_GENERATION + ".pstats")
+            stats = pstats.Stats(file_name)
+            function_names = {function[2] for function in stats.stats}
+            self.assertIn("_work_in_thread", function_names)
+            self.assertIn("work", function_names)
+
+    def test_cprofile_multi_threaded_pipeline(self):
+        # Both generation workers are in their phase at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def generate_slide_deck(topic, **_):
+            with phase_util.phase(phase_util.SLIDE_GENERATION):
+                barrier.wait()
+                _work_in_thread()
+            return topic
+
+        with tempfile.TemporaryDirectory() as folder, mock.patch.object(
+            pipeline.generator, "generate_slide_deck", generate_slide_deck
+        ), mock.patch.object(
+            pipeline.generator, "render_slide_deck", lambda deck, **_: (None, deck)
+        ), mock.patch.object(
+            pipeline.language_util, "preload"
+        ):
+            with profile_util.profiling(profile_util.CPROFILE, folder):
+                results = pipeline.generate_presentations(
+                    [{"topic": topic, "schema": "default"} for topic in "ab"],
+                    generation_workers=2,
+                )
+
+            self.assertEqual([("a", "a"), ("b", "b")], results)
+            file_name = os.path.join(folder, phase_util.SLIDE_GENERATION + ".pstats")
+            function_names = {function[2] for function in pstats.Stats(file_name).stats}
+            self.assertIn("_work_in_thread", function_names)
+            self.assertIn("work", function_names)
+
+    def test_sampling_writes_collapsed_stacks(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with profile_util.profiling(profile_util.SAMPLING, folder):
+                with phase_util.phase(phase_util.SAVE):
+                    _sleep_in_thread()
+
+            with open(os.path.join(folder, phase_util.SAVE + ".collapsed")) as file:
+                lines = file.read().splitlines()
+            self.assertTrue(any(line.startswith("sleeper;") for line in lines))
+            self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, profile_util.PhaseProfiler, "unused", "perf")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import json
+import unittest
+
+from pptx.chart.data import ChartData
+from pptx.chart.data import XyChartData
+from pptx.enum.chart import XL_CHART_TYPE
+
+from talkgenerator.datastructures.image_data import ImageData
+from talkgenerator.slide import powerpoint_slide_creator
+from talkgenerator.slide import slides
+from talkgenerator.slide.slide_deck import SlideDeck
+from talkgenerator.sources import chart
+from talkgenerator.util import os_util
+
+IMAGE_FILE = os_util.to_actual_file("data/images/error_placeholder.png")
+
+
+def create_chart_data():
+    chart_data = ChartData()
+    chart_data.categories = ["Yes", "No"]
+    chart_data.add_series("", [0.25, 0.75])
+    return chart_data
+
+
+def create_test_slide_deck():
+    slide_deck = SlideDeck(3, {"title": "About cats"})
+    slide_deck.add_slide(0, slides.TitleSlide("About cats", "A. Nonymous"))
+    image = ImageData(IMAGE_FILE, "u/cat (on r/cats)")
+    image_slide = slides.ImageSlide("A cat", image)
+    image_slide.add_source(image.get_source())
+    slide_deck.add_slide(1, image_slide)
+    slide_deck.add_slide(
+        2,
+        slides.ChartSlide(
+            "Cats?", XL_CHART_TYPE.PIE, create_chart_data(), chart.set_pie_properties
+        ),
+    )
+    return slide_deck
+
+
+class SlideDeckTest(unittest.TestCase):
+    def test_image_slide_dictionary(self):
+        slide_dict = create_test_slide_deck().to_slide_deck_dictionary()[1]
+        self.assertEqual("image", slide_dict["type"])
+        self.assertEqual(
+            {"image_url": IMAGE_FILE, "source": "u/cat (on r/cats)"},
+            slide_dict["image_url"],
+        )
+
+    def test_chart_slide_dictionary(self):
+        slide_dict = create_test_slide_deck().to_slide_deck_dictionary()[2]
+        self.assertEqual("PIE", slide_dict["chart_type"])
+        self.assertEqual(
+            {"categories": ["Yes", "No"], "series": [{"name": "", "values": [0.25, 0.75]}]},
+            slide_dict["chart_data"],
+        )
+        self.assertEqual({"name": "pie"}, slide_dict["chart_modifier"])
+
+    def test_chart_modifier_with_arguments(self):
+        chart_modifier_dict = slides.chart_modifier_to_dictionary(
+            chart.ScatterPropertiesSetter("x", "y")
+        )
+        self.assertEqual({"name": "scatter", "arguments": ["x", "y"]}, chart_modifier_dict)
+        loaded = slides.chart_modifier_from_dictionary(chart_modifier_dict)
+        self.assertIsInstance(loaded, chart.ScatterPropertiesSetter)
+        self.assertEqual(["x", "y"], loaded.get_arguments())
+
+    def test_unknown_chart_modifier(self):
+        with self.assertRaises(ValueError):
+            slides.chart_modifier_to_dictionary(print)
+        slide_dict = create_test_slide_deck().to_slide_deck_dictionary()[2]
+        for chart_modifier in (
+            {"name": "system", "arguments": ["echo"]},
+            {"reference": "os:system", "arguments": ["echo"]},
+        ):
+            slide_dict["chart_modifier"] = chart_modifier
+            with self.assertRaises(ValueError):
+                slides.slide_from_dictionary(slide_dict)
+
+    def test_xy_chart_slide_dictionary(self):
+        chart_data = XyChartData()
+        chart_data.add_series("Model").add_data_point(1, 2)
+        slide = slides.ChartSlide("Correlation", XL_CHART_TYPE.XY_SCATTER, chart_data)
+        self.assertEqual(
+            {
+                "categories": None,
+                "series": [{"name": "Model", "x_values": [1], "y_values": [2]}],
+            },
+            slide.to_slide_dictionary()["chart_data"],
+        )
+
+    def test_to_json(self):
+        deck = json.loads(create_test_slide_deck().to_json())
+        self.assertEqual("About cats", deck["title"])
+        self.assertEqual(3, len(deck["slides"]))
+
+    def test_to_html(self):
+        html = create_test_slide_deck().to_html()
+        self.assertEqual(3, html.count('<section class="slide'))
+        self.assertIn('src="{}"'.format(IMAGE_FILE), html)
+        self.assertIn("[Image sources: u/cat (on r/cats)]", html)
+
+    def test_chart_html_values(self):
+        fractions_html = create_test_slide_deck().to_html()
+        self.assertIn('<span class="bar-value">25%</span>', fractions_html)
+
+        chart_data = ChartData()
+        chart_data.categories = ["Cats", "Dogs"]
+        chart_data.add_series("", [300, 12.5])
+        slide_deck = SlideDeck(1, {"title": "About cats"})
+        slide_deck.add_slide(
+            0, slides.ChartSlide("Pets", XL_CHART_TYPE.BAR_CLUSTERED, chart_data)
+        )
+        counts_html = slide_deck.to_html()
+        self.assertIn('<span class="bar-value">300</span>', counts_html)
+        self.assertIn('<span class="bar-value">12.5</span>', counts_html)
+        self.assertNotIn("300%", counts_html)
+
+    def test_json_round_trip(self):
+        slide_deck = create_test_slide_deck()
+        loaded = SlideDeck.from_json(slide_deck.to_json())
+        self.assertEqual(
+            slide_deck.to_slide_deck_dictionary(), loaded.to_slide_deck_dictionary()
+        )
+        self.assertEqual("About cats", loaded.get_title())
+        self.assertIs(
+            chart.set_pie_properties, loaded.get_slide(2)._arguments["chart_modifier"]
+        )
+
+        presentation = powerpoint_slide_creator.create_new_powerpoint()
+        loaded.save_to_powerpoint(presentation)
+        self.assertEqual(3, len(presentation.slides))
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            SlideDeck.from_json('{"version": 1000}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import time
+import unittest
+
+import requests
+
+from talkgenerator import settings
+from talkgenerator.sources import conceptnet, goodreads, inspirobot
+from tests.stub_servers import StubServerConfig, StubServerFleet, constant_latency
+
+
+class StubServersTest(unittest.TestCase):
+    def setUp(self):
+        conceptnet._get_data.cache_clear()
+        goodreads._search_quotes_page.cache_clear()
+
+    def tearDown(self):
+        conceptnet._get_data.cache_clear()
+        goodreads._search_quotes_page.cache_clear()
+
+    def test_sources_use_stub_servers(self):
+        with StubServerFleet(default_config=StubServerConfig(results=5)) as fleet:
+            related_words = conceptnet.get_weighted_related_words("cat")
+            quotes = goodreads._search_quotes_page("cat", 1)
+            self.assertTrue(
+                settings.service_url("conceptnet", conceptnet.URL).startswith(
+                    fleet.get_url("conceptnet")
+                )
+            )
+        self.assertEqual(5, len(related_words))
+        self.assertEqual(5, len(quotes))
+        self.assertEqual(1, fleet.get_request_counts()["conceptnet"])
+        self.assertEqual(conceptnet.URL, settings.service_url("conceptnet", conceptnet.URL))
+
+    def test_error_rate(self):
+        with StubServerFleet({"goodreads": StubServerConfig(error_rate=1)}):
+            self.assertIsNone(goodreads._search_quotes_page("dog", 1))
+
+    def test_latency_and_payload_size(self):
+        config = StubServerConfig(latency=constant_latency(0.1), payload_size=5000)
+        with StubServerFleet({"inspirobot": config}):
+            start = time.perf_counter()
+            response = requests.get(
+                inspirobot.get_random_inspirobot_image().get_image_url()
+            )
+            duration = time.perf_counter() - start
+        self.assertGreaterEqual(duration, 0.1)
+        self.assertEqual("image/png", response.headers["Content-Type"])
+        self.assertAlmostEqual(5000, len(response.content), delta=500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,15 @@
+import os
 import random
 import logging
+import tempfile
 import unittest
 from unittest import mock
 
 from talkgenerator.schema import slide_schemas
 from talkgenerator import generator
 from talkgenerator.slide import powerpoint_slide_creator
+from talkgenerator.slide import slides
+from talkgenerator.slide.slide_deck import SlideDeck
 from talkgenerator.util import os_util
 
 
@@ -21,6 +25,13 @@ class TestTalkGenerator(unittest.TestCase):
         self.default_args.configure_mock(
             output_folder=os_util.to_actual_file("../output/test/")
         )
+        self.default_args.configure_mock(output_shard_levels=0)
+        self.default_args.configure_mock(format="pptx")
+        self.default_args.configure_mock(metrics_file=None)
+        self.default_args.configure_mock(trace_file=None)
+        self.default_args.configure_mock(profile=None)
+        self.default_args.configure_mock(profile_folder=None)
+        self.default_args.configure_mock(max_external_calls=None)
         self.default_args.configure_mock(open_ppt=False)
         self.default_args.configure_mock(save_ppt=True)
         self.default_args.configure_mock(int_seed=123)
@@ -69,5 +80,31 @@ class TestTalkGenerator(unittest.TestCase):
             slide.create_powerpoint_slide(presentation)
 
 
+class TestRenderSlideDeckFile(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.mkdtemp()
+        self.deck_file = os.path.join(folder, "cat.json")
+        self.output_file = os.path.join(folder, "cat.pptx")
+
+    def _save_deck(self, schema_name):
+        slide_deck = SlideDeck(1, {"title": "About cats"}, schema_name=schema_name)
+        slide_deck.add_slide(0, slides.TitleSlide("About cats", "A. Nonymous"))
+        generator.save_slide_deck(slide_deck, self.deck_file)
+
+    def test_renders_with_powerpoint_of_schema(self):
+        self._save_deck("test")
+        with mock.patch.object(generator, "get_schema") as get_schema:
+            generator.render_slide_deck_file(self.deck_file, self.output_file)
+        get_schema.assert_called_once_with("test")
+        get_schema.return_value.render_presentation.return_value.save.assert_called_once_with(
+            self.output_file
+        )
+
+    def test_renders_without_schema(self):
+        self._save_deck(None)
+        generator.render_slide_deck_file(self.deck_file, self.output_file)
+        self.assertTrue(os.path.isfile(self.output_file))
+
+
 if __name__ == "__main__":
     unittest.main()
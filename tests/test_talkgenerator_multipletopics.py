@@ -20,6 +20,13 @@ class TestTalkGenerator(unittest.TestCase):
         self.default_args.configure_mock(
             output_folder=os_util.to_actual_file("../output/test/")
         )
+        self.default_args.configure_mock(output_shard_levels=0)
+        self.default_args.configure_mock(format="pptx")
+        self.default_args.configure_mock(metrics_file=None)
+        self.default_args.configure_mock(trace_file=None)
+        self.default_args.configure_mock(profile=None)
+        self.default_args.configure_mock(profile_folder=None)
+        self.default_args.configure_mock(max_external_calls=None)
         self.default_args.configure_mock(open_ppt=False)
         self.default_args.configure_mock(save_ppt=True)
         self.default_args.configure_mock(int_seed=123)
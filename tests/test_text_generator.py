@@ -1,5 +1,9 @@
+import json
+import os
 import random
+import tempfile
 import unittest
+from unittest import mock
 
 from talkgenerator.sources import text_generator
 from talkgenerator.util import os_util
@@ -68,6 +72,21 @@ class TextGeneratorTest(unittest.TestCase):
                 "This is a test", templated_text_generator.generate({"noun": "a test"})
             )
 
+    def test_falling_back_on_other_template(self):
+        possible_templates = [
+            "This is {noun.last_letter_is_vowel}",
+            "This is {noun}",
+            "This is {adjective}",
+        ]
+        templated_text_generator = text_generator.TemplatedTextGenerator(
+            templates_list=possible_templates
+        )
+        for _ in range(100):
+            self.assertEqual(
+                "This is cat", templated_text_generator.generate({"noun": "cat"})
+            )
+        self.assertIsNone(templated_text_generator.generate({"verb": "see"}))
+
     def test_all_possible_outcomes(self):
         possible_templates = ["This is {adjective}", "This is {noun}"]
         templated_text_generator = text_generator.TemplatedTextGenerator(
@@ -113,6 +132,75 @@ class TextGeneratorTest(unittest.TestCase):
         )
         self.assertEqual("this is a Something using multiple Instances", result)
 
+    def test_pruned_tracery_grammar(self):
+        grammar = {
+            "origin": ["#with_x#", "#with_y#"],
+            "with_x": ["with {x}"],
+            "with_y": ["with {y.title}", "#endless#"],
+            "endless": ["#endless# and more"],
+        }
+        with tempfile.TemporaryDirectory() as folder:
+            grammar_file = os.path.join(folder, "grammar.json")
+            with open(grammar_file, "w") as f:
+                json.dump(grammar, f)
+            tracery = text_generator.TraceryTextGenerator(grammar_file)
+            with_x = text_generator.TraceryTextGenerator(grammar_file, "with_x")
+            self.assertEqual("with X", with_x.generate({"x": "X"}))
+            # Shared with the other generators of the grammar
+            self.assertIs(
+                text_generator.get_tracery_grammar(grammar_file),
+                text_generator.get_tracery_grammar(
+                    os.path.join(folder, ".", "grammar.json")
+                ),
+            )
+
+        self.assertEqual(
+            {"origin": ["#with_y#"], "with_y": ["with {y.title}"]},
+            text_generator.prune_tracery_rules(
+                text_generator.analyse_tracery_rules(grammar), frozenset({"y"})
+            ),
+        )
+        for i in range(20):
+            self.assertEqual("with Test", tracery.generate({"y": "test"}))
+        self.assertIsNone(tracery.generate({"z": "test"}))
+
+    def test_compiled_template(self):
+        template = text_generator.compile_template(
+            "{seed.title} and {seed.title}, {{literal}} {number:03d} {seed!r}"
+        )
+        self.assertEqual(frozenset({"seed", "number"}), template.variables)
+        self.assertEqual(
+            "Cat and Cat, {literal} 007 'cat'", template({"seed": "cat", "number": 7})
+        )
+        self.assertRaises(ValueError, text_generator.compile_template, "{seed[0]}")
+
+    def test_memoizing_functions(self):
+        lookups = []
+
+        def get_weighted_related_words(word):
+            lookups.append(word)
+            return [(1, "dog"), (1, "mouse")]
+
+        template = text_generator.compile_template(
+            "{seed.conceptnet_related} and {seed.conceptnet_related.1}"
+        )
+        with mock.patch.object(
+            text_generator.conceptnet,
+            "get_weighted_related_words",
+            get_weighted_related_words,
+        ):
+            template({"seed": "cat"})
+            self.assertEqual(["cat", "cat"], lookups)
+            lookups.clear()
+
+            random.seed(1)
+            with text_generator.memoizing_functions():
+                generated = {template({"seed": "cat"}) for _ in range(20)}
+            # Only looked up once, but still choosing at random every time
+            self.assertEqual(["cat"], lookups)
+            self.assertIn("dog and mouse", generated)
+            self.assertIn("mouse and mouse", generated)
+
     def test_tracery_grammar(self):
         tracery = text_generator.TraceryTextGenerator("data/text-templates/name.json")
         for i in range(5):
@@ -0,0 +1,73 @@
+import unittest
+
+from talkgenerator.util import generator_util
+from talkgenerator.util import phase_util
+from talkgenerator.util import trace_util
+
+
+class TraceUtilTest(unittest.TestCase):
+    def test_no_spans_without_tracing(self):
+        tracer = trace_util.Tracer()
+        generator_util.StaticGenerator("cat")({"seed": "cat"})
+        self.assertFalse(trace_util.is_tracing())
+        self.assertEqual([], tracer.get_events())
+
+    def test_nested_generator_spans(self):
+        generator = generator_util.CombinedGenerator(
+            (1, generator_util.SeededGenerator(generator_util.NoneGenerator())),
+        )
+        backup = generator_util.BackupGenerator(
+            generator, generator_util.StaticGenerator("dog")
+        )
+
+        tracer = trace_util.Tracer()
+        with trace_util.tracing(tracer):
+            self.assertEqual("dog", backup({"seed": "cat"}))
+        events = {event["name"]: event for event in tracer.get_events()}
+
+        self.assertEqual(
+            {
+                "BackupGenerator",
+                "CombinedGenerator",
+                "SeededGenerator",
+                "NoneGenerator",
+                "StaticGenerator",
+            },
+            set(events),
+        )
+        self.assertIsNone(events["BackupGenerator"]["args"]["parent"])
+        self.assertEqual(
+            events["BackupGenerator"]["args"]["id"],
+            events["CombinedGenerator"]["args"]["parent"],
+        )
+        self.assertEqual(
+            events["SeededGenerator"]["args"]["id"],
+            events["NoneGenerator"]["args"]["parent"],
+        )
+        self.assertEqual("cat", events["SeededGenerator"]["args"]["seed"])
+        self.assertEqual("nothing", events["CombinedGenerator"]["args"]["outcome"])
+        self.assertEqual("generated", events["BackupGenerator"]["args"]["outcome"])
+
+    def test_errors_and_phases_in_chrome_trace(self):
+        @trace_util.traced("source")
+        def failing_source(seed):
+            raise ValueError(seed)
+
+        tracer = trace_util.Tracer()
+        with trace_util.tracing(tracer):
+            self.assertRaises(ValueError, failing_source, "cat")
+            with phase_util.phase(phase_util.SAVE):
+                pass
+
+        trace = tracer.to_chrome_trace()
+        events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual(
+            "error: ValueError", events[0]["args"]["outcome"],
+        )
+        self.assertEqual(phase_util.SAVE, events[1]["name"])
+        self.assertIn("M", [event["ph"] for event in trace["traceEvents"]])
+        self.assertFalse(trace_util.is_tracing())
+
+
+if __name__ == "__main__":
+    unittest.main()